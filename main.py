@@ -1,56 +1,66 @@
+# First, so its clock starts before the other imports
+from modules.startup import timer
+
 import sys
+import threading
 import time
-import random
-import json
-import os
+from contextlib import nullcontext
 
 import glfw
 from OpenGL.GL import *
-from OpenGL.GLU import *
-from OpenGL.GLUT import *
-
-# Local modules
-from modules.maze import Maze
-from modules.collectible import Collectible
-from modules.enemy import Enemy
-from modules.patrolling_enemy import PatrollingEnemy
-from modules.player import Player
-from modules.powerup import PowerUp
+
+# Local modules. Only what the menu needs is imported here; the world and its
+# renderers (numpy and friends) are imported by build_world, in the background.
+from modules import assets
+from modules.input_queue import InputQueue, LatencyTracker, apply_input
 from modules.button import Button
-from modules.utils import render_text
+from modules.persistence import SaveManager
+from modules.text import render_text, HELVETICA_18, HELVETICA_12
+
+timer.mark("imports")
 
 MENU_STATE = 0
 INSTRUCTIONS_STATE = 1
 GAME_STATE = 2
 GAME_OVER_STATE = 3
 menu_options = ["Start Game", "Instructions", "Exit"]
-
-def load_progress():
-    """
-    Loads highest level from savegame.json if it exists, else returns 1.
-    """
-    if os.path.exists("savegame.json"):
-        try:
-            with open("savegame.json","r") as f:
-                data = json.load(f)
-                return data.get("highest_level",1)
-        except:
-            return 1
-    return 1
-
-def save_progress(level):
-    """
-    Saves the highest level to savegame.json.
-    """
-    data = {"highest_level": level}
-    with open("savegame.json","w") as f:
-        json.dump(data,f)
+# Gameplay keys, fed through the input queue
+KEY_ACTIONS = {glfw.KEY_UP: "up", glfw.KEY_DOWN: "down", glfw.KEY_LEFT: "left",
+               glfw.KEY_RIGHT: "right", glfw.KEY_I: "invisible"}
 
 class Game:
-    def __init__(self, width=800, height=600, maze_rows=21, maze_cols=21):
+    def __init__(self, width=800, height=600, maze_rows=21, maze_cols=21, remote=None, software=False,
+                 maze_file=None, pack=None, pack_level=1, darkness=False, tick_rate=60,
+                 repeat_delay=0.3, repeat_rate=8.0, report_startup=False, exit_after_first_frame=False,
+                 memory_profile=False, cooperative=False):
+        """
+        :param remote: Server address ((host, port) or a Unix socket path) to play on
+                       as a thin client; the game runs locally if None
+        :param software: Rasterize the play area on the CPU (modules.damage) and only
+                         upload the regions that changed, instead of drawing GL points
+        :param maze_file: Binary maze file (modules.maze_file) to play instead of a generated maze;
+                          maze_rows/maze_cols should match its size
+        :param pack: LevelPack (modules.level_pack) to take every level from, starting at
+                     pack_level; levels past the end of the pack wrap around
+        :param darkness: Fog of war: only what the player can see is drawn (local games only)
+        :param tick_rate: Simulation ticks per second of a local game, independent of the frame rate
+        :param repeat_delay: Seconds a move key is held before it starts repeating
+        :param repeat_rate: Moves per second while a move key is held
+        :param report_startup: Print the startup timing breakdown once the world is ready
+        :param exit_after_first_frame: Quit right after the first menu frame (startup benchmark)
+        :param memory_profile: Track memory at level boundaries and per-frame allocation of
+                               the sim tick and render (modules.memory_profile), and
+                               print the report on exit (local games only)
+        :param cooperative: Enemies plan their chases together (modules.cooperative)
+                            instead of each running its own A* (local games only)
+        """
         self.width = width
         self.height = height
 
+        self.maze_file = maze_file
+        self.pack = pack
+        self.pack_level = pack_level
+
         # Force odd dims
         self.maze_rows = maze_rows if maze_rows % 2 != 0 else maze_rows + 1
         self.maze_cols = maze_cols if maze_cols % 2 != 0 else maze_cols + 1
@@ -73,62 +83,104 @@ class Game:
 
         glfw.make_context_current(self.window)
         self.init_gl()
+        timer.mark("window")
+        # Prebuilt glyphs and sprite shapes; without the cache they are built on first use
+        self.assets_cached = assets.load_cache()
+        timer.mark("asset cache")
+
+        self.remote = remote is not None
+        self.remote_address = remote
+        self.saves = None if self.remote else SaveManager("savegame.json")
+        self.darkness = darkness
+        self.software = software
+        self.tick_rate = tick_rate
+        self.report_startup = report_startup
+        self.exit_after_first_frame = exit_after_first_frame
+        self.memory_profile = memory_profile
+        self.cooperative = cooperative
+        self.memory = None
 
-        # Load saved progress
-        self.current_level = load_progress()
-        print(f"Starting from level: {self.current_level}")
-
-        self.score = 0
         self.is_paused = False
         self.current_state = MENU_STATE
         self.selected_option = 0
-
-        # Timed level
-        self.level_time = 60.0
         self.last_time_update = time.time()
 
-        # Maze: uses generate_maze() + optional extra paths for loops
-        self.maze = Maze(self.maze_rows, self.maze_cols, extra_passages=2)
-        self.maze.scale_x = self.scale_x
-        self.maze.scale_y = self.scale_y
-
-        # Player
-        self.player = Player(x=1, y=1)
-
-        # Entities
-        self.enemies = []
-        self.collectibles = []
-        self.powerups = []
-
-        # Exit position
-        self.exit_x = self.maze.cols - 2
-        self.exit_y = self.maze.rows - 2
-
-        # Invisibility states
-        self.is_invisible = False
-        self.invisible_until = 0.0
-
-        # Speed boost states
-        self.speed_boost_active = False
-        self.speed_boost_until = 0.0
-
-        # Initialize spawns
-        self.initialize_entities()
+        # A local world runs on the sim thread; from here on only commands reach it,
+        # and rendering reads self.view, the state published for the current frame
+        self.inputs = InputQueue(repeat_delay, repeat_rate)
+        self.latency = LatencyTracker()
 
         # UI Buttons
         self.buttons = self.initialize_buttons()
 
-        self.last_enemy_move_time = 0.0
-        self.enemy_move_interval = 0.5
+        # World: maze, player, enemies, pickups, exit and timers. The game opens on the
+        # menu, so it is built in the background and only waited for on Start Game.
+        self.world = None
+        self.sim = None
+        self.view = None
+        self.damage = None
+        self.frame_texture = None
+        self.world_error = None
+        self.world_loader = threading.Thread(target=self.build_world, name="world-loader", daemon=True)
+        self.world_loader.start()
 
         # Register callbacks
         glfw.set_key_callback(self.window, self.key_callback)
         glfw.set_mouse_button_callback(self.window, self.mouse_button_callback)
 
+    def build_world(self):
+        """
+        Imports the simulation and renderers and builds the world, sim thread and
+        (software) damage renderer. Runs on the world-loader thread.
+        """
+        start = time.perf_counter()
+        try:
+            if self.remote:
+                from modules.remote_world import RemoteWorld
+                world = RemoteWorld(self.remote_address)
+            else:
+                from modules.world import World
+                from modules.sim_thread import SimThread
+                # Load saved progress (a remote session is the server's to keep)
+                saved = self.saves.load()
+                start_level = saved.get("highest_level", 1) if saved else 1
+                print(f"Starting from level: {start_level}")
+                world = World(self.maze_rows, self.maze_cols, level=start_level, darkness=self.darkness,
+                              cooperative=self.cooperative)
+            world.maze.scale_x = self.scale_x
+            world.maze.scale_y = self.scale_y
+            # Software rendering keeps a CPU frame and only repaints the damaged cells
+            if self.software:
+                from modules.damage import DamageRenderer
+                self.damage = DamageRenderer(self.width, self.height, self.scale_x, self.scale_y,
+                                             self.reserved_ui_height, self.buttons)
+            if not self.remote:
+                if self.memory_profile:
+                    from modules.memory_profile import MemoryMonitor
+                    self.memory = MemoryMonitor()
+                self.sim = SimThread(world, self.tick_rate, on_events=self.handle_world_events,
+                                     inputs=self.inputs, latency=self.latency, memory=self.memory)
+                self.sim.start()
+            self.world = world
+        except Exception as e:
+            self.world_error = e
+        timer.record("world", time.perf_counter() - start)
+        if not self.assets_cached:
+            # Next start loads what this one had to compute
+            assets.build_cache()
+
+    def ensure_world(self):
+        """
+        Waits for build_world to finish; re-raises anything it failed with.
+        """
+        self.world_loader.join()
+        if self.world_error is not None:
+            raise self.world_error
+
     def init_gl(self):
         glMatrixMode(GL_PROJECTION)
         glLoadIdentity()
-        gluOrtho2D(-self.width/2, self.width/2, -self.height/2, self.height/2)
+        glOrtho(-self.width/2, self.width/2, -self.height/2, self.height/2, -1, 1)
         glMatrixMode(GL_MODELVIEW)
         glLoadIdentity()
 
@@ -165,113 +217,21 @@ class Game:
 
         return btns
 
-    def random_path_cell(self):
-        """
-        Returns a (x, y) that is a valid path cell (grid[y][x]==0),
-        in the interior (1..cols-2, 1..rows-2).
-        """
-        while True:
-            x = random.randint(1, self.maze.cols - 2)
-            y = random.randint(1, self.maze.rows - 2)
-            if self.maze.grid[y][x] == 0:
-                return (x, y)
-
-    def initialize_entities(self):
-        """
-        Resets the level timer, spawns enemies, collectibles, power-ups, and exit.
-        """
-        self.level_time = 60.0
-        self.last_time_update = time.time()
-
-        # Reset player
-        self.player.x = 1
-        self.player.y = 1
-
-        self.enemies = []
-        self.collectibles = []
-        self.powerups = []
-
-        # Normal enemies on valid path cells
-        num_normal_enemies = 1
-        for _ in range(num_normal_enemies):
-            x, y = self.random_path_cell()
-            e = Enemy(x, y, self.maze)
-            self.enemies.append(e)
-
-        # Patrolling enemy with random route
-        route = []
-        route_size = 4
-        for _ in range(route_size):
-            rx, ry = self.random_path_cell()
-            route.append((rx, ry))
-        patroller = PatrollingEnemy(route[0][0], route[0][1],
-                                    self.maze,
-                                    waypoints=route,
-                                    wait_time=1.0)
-        self.enemies.append(patroller)
-
-        # spawn some collectibles (avoid border, walls)
-        self.spawn_collectibles(num=4)
-
-        # spawn powerups on valid path
-        px, py = self.random_path_cell()
-        self.powerups.append(PowerUp(px, py, "speed"))
-        px2, py2 = self.random_path_cell()
-        self.powerups.append(PowerUp(px2, py2, "invincibility"))
-
-        # place exit far from enemies
-        self.place_exit_far_from_enemies()
-
-    def place_exit_far_from_enemies(self):
-        max_tries = 500
-        dist_thresh = 8
-        tries = 0
-
-        while tries < max_tries:
-            tries += 1
-            ex = random.randint(1, self.maze.cols - 2)
-            ey = random.randint(1, self.maze.rows - 2)
-            if self.maze.grid[ey][ex] == 0:
-                too_close = False
-                for en in self.enemies:
-                    dist = abs(en.x - ex) + abs(en.y - ey)
-                    if dist < dist_thresh:
-                        too_close = True
-                        break
-                if not too_close:
-                    self.exit_x = ex
-                    self.exit_y = ey
-                    return
-
-        # fallback
-        self.exit_x = self.maze.cols - 2
-        self.exit_y = self.maze.rows - 2
-
-    def spawn_collectibles(self, num=4):
-        spawned = 0
-        while spawned < num:
-            x, y = self.random_path_cell()
-            # ensure no overlap
-            already = any((c.x==x and c.y==y) for c in self.collectibles)
-            if not already:
-                self.collectibles.append(Collectible(x,y))
-                spawned += 1
-
     # -------------- RENDERING --------------
 
     def render_main_menu(self):
         glClearColor(0,0,0,1)
         glClear(GL_COLOR_BUFFER_BIT)
-        render_text(-200,150,"PIXEL ADVENTURE MAZE",GLUT_BITMAP_HELVETICA_18,(1,1,1))
+        render_text(-200,150,"PIXEL ADVENTURE MAZE",HELVETICA_18,(1,1,1))
         sy=50.0
         for idx,opt in enumerate(menu_options):
             color = (1,0,0) if idx==self.selected_option else (1,1,1)
-            render_text(-50, sy-idx*40, opt, GLUT_BITMAP_HELVETICA_18, color)
+            render_text(-50, sy-idx*40, opt, HELVETICA_18, color)
 
     def render_instructions(self):
         glClearColor(0,0,0,1)
         glClear(GL_COLOR_BUFFER_BIT)
-        render_text(-100,150,"INSTRUCTIONS",GLUT_BITMAP_HELVETICA_18,(1,1,1))
+        render_text(-100,150,"INSTRUCTIONS",HELVETICA_18,(1,1,1))
         lines = [
             "Arrow Keys: Move Player",
             "I: Invisibility for 3s (turns gold, can't be killed)",
@@ -283,36 +243,48 @@ class Game:
         ]
         yy=100
         for line in lines:
-            render_text(-300, yy, line, GLUT_BITMAP_HELVETICA_18,(1,1,1))
+            render_text(-300, yy, line, HELVETICA_18,(1,1,1))
             yy-=30
 
     def render_maze(self):
-        self.maze.render(self.scale_x,self.scale_y)
+        self.view.maze.render(self.scale_x,self.scale_y,fog=self.view.fog)
 
     def render_player(self):
         # Pass is_invisible so the player is drawn gold if invisible
-        self.player.render(self.scale_x,
+        self.view.player.render(self.scale_x,
                            self.scale_y,
-                           self.maze.cols,
-                           self.maze.rows,
+                           self.view.maze.cols,
+                           self.view.maze.rows,
                            radius=10,
-                           is_invisible=self.is_invisible)
+                           is_invisible=self.view.is_invisible)
 
     def render_enemies(self):
-        for en in self.enemies:
-            en.render(self.scale_x,self.scale_y,self.maze.cols,self.maze.rows)
+        fog=self.view.fog
+        for en in self.view.enemies:
+            if fog is not None and not fog.is_visible(en.x,en.y):
+                continue
+            en.render(self.scale_x,self.scale_y,self.view.maze.cols,self.view.maze.rows)
 
     def render_collectibles(self):
-        for c in self.collectibles:
-            c.render(self.scale_x,self.scale_y,self.maze.cols,self.maze.rows)
+        from modules.collectible import Collectible
+        Collectible.render_batch(self.view.entities,self.scale_x,self.scale_y,
+                                 self.view.maze.cols,self.view.maze.rows,fog=self.view.fog)
 
     def render_powerups(self):
-        for p in self.powerups:
-            p.render(self.scale_x,self.scale_y,self.maze.cols,self.maze.rows)
+        from modules.powerup import PowerUp
+        PowerUp.render_batch(self.view.entities,self.scale_x,self.scale_y,
+                             self.view.maze.cols,self.view.maze.rows,fog=self.view.fog)
+
+    def exit_hidden(self):
+        # In darkness the exit shows once it has been seen
+        fog=self.view.fog
+        return fog is not None and not fog.explored[self.view.exit_y,self.view.exit_x]
 
     def render_exit(self):
-        gl_x = (self.exit_x - self.maze.cols/2)*self.scale_x
-        gl_y = (self.maze.rows/2 - self.exit_y)*self.scale_y
+        if self.exit_hidden():
+            return
+        gl_x = (self.view.exit_x - self.view.maze.cols/2)*self.scale_x
+        gl_y = (self.view.maze.rows/2 - self.view.exit_y)*self.scale_y
         size=8
         left=int(gl_x-size)
         right=int(gl_x+size)
@@ -324,29 +296,88 @@ class Game:
             for py in range(bottom,top+1):
                 glVertex2f(px,py)
         glEnd()
-        render_text(gl_x-15,gl_y+size+5,"Exit",GLUT_BITMAP_HELVETICA_12,(1,1,1))
+        self.render_exit_label()
+
+    def render_exit_label(self, size=8):
+        if self.exit_hidden():
+            return
+        gl_x = (self.view.exit_x - self.view.maze.cols/2)*self.scale_x
+        gl_y = (self.view.maze.rows/2 - self.view.exit_y)*self.scale_y
+        render_text(gl_x-15,gl_y+size+5,"Exit",HELVETICA_12,(1,1,1))
+
+    def render_software(self):
+        """
+        Draws the play area into the CPU framebuffer and copies it to the window;
+        only the text is left to GL.
+        """
+        boxes=self.damage.render(self.view,self.is_paused)
+        self.upload_frame(boxes)
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D,self.frame_texture)
+        glColor3f(1,1,1)
+        w,h=self.width/2,self.height/2
+        # Image row 0 is the top of the window
+        glBegin(GL_QUADS)
+        glTexCoord2f(0,1); glVertex2f(-w,-h)
+        glTexCoord2f(1,1); glVertex2f(w,-h)
+        glTexCoord2f(1,0); glVertex2f(w,h)
+        glTexCoord2f(0,0); glVertex2f(-w,h)
+        glEnd()
+        glDisable(GL_TEXTURE_2D)
+        glPushMatrix()
+        glTranslatef(0, -self.reserved_ui_height/2, 0)
+        self.render_exit_label()
+        glPopMatrix()
+
+    def upload_frame(self, boxes):
+        """
+        Copies the changed boxes of the CPU frame into a texture that persists
+        between frames, so unchanged pixels are never sent again.
+        """
+        import numpy as np
+        pixels=self.damage.fb.pixels
+        glPixelStorei(GL_UNPACK_ALIGNMENT,1)
+        if self.frame_texture is None:
+            self.frame_texture=glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D,self.frame_texture)
+            glTexParameteri(GL_TEXTURE_2D,GL_TEXTURE_MIN_FILTER,GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D,GL_TEXTURE_MAG_FILTER,GL_NEAREST)
+            glTexImage2D(GL_TEXTURE_2D,0,GL_RGB,self.width,self.height,0,GL_RGB,GL_UNSIGNED_BYTE,pixels)
+            return
+        glBindTexture(GL_TEXTURE_2D,self.frame_texture)
+        for c0,r0,c1,r1 in boxes:
+            glTexSubImage2D(GL_TEXTURE_2D,0,c0,r0,c1-c0,r1-r0,GL_RGB,GL_UNSIGNED_BYTE,
+                            np.ascontiguousarray(pixels[r0:r1,c0:c1]))
 
     def render_score(self):
         glColor3f(1,1,1)
-        s_text = f"Score: {self.score}"
+        s_text = f"Score: {self.view.score}"
         sx=-350
         sy=self.height/2 - (self.reserved_ui_height/2) - 20
-        render_text(sx,sy,s_text,GLUT_BITMAP_HELVETICA_18,(1,1,1))
+        render_text(sx,sy,s_text,HELVETICA_18,(1,1,1))
 
-        time_text=f"Time: {int(self.level_time)}s"
-        render_text(sx,sy-30,time_text,GLUT_BITMAP_HELVETICA_18,(1,1,1))
+        time_text=f"Time: {int(self.view.level_time)}s"
+        render_text(sx,sy-30,time_text,HELVETICA_18,(1,1,1))
 
     def render_level(self):
-        lvl_text=f"Level: {self.current_level}"
+        lvl_text=f"Level: {self.view.current_level}"
         lx=250
         ly=self.height/2 - (self.reserved_ui_height/2) -20
-        render_text(lx,ly,lvl_text,GLUT_BITMAP_HELVETICA_18,(1,1,1))
+        render_text(lx,ly,lvl_text,HELVETICA_18,(1,1,1))
 
     def render_buttons(self):
         for b in self.buttons:
-            b.render()
+            if self.damage is not None:
+                # The button itself is part of the software frame
+                b.render_label()
+            else:
+                b.render()
 
     def render_paused_overlay(self):
+        if self.damage is not None:
+            # Already darkened in the software frame
+            render_text(-30,0,"Paused",HELVETICA_18,(1,1,1))
+            return
         glEnable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA,GL_ONE_MINUS_SRC_ALPHA)
         left=-int(self.width/2)
@@ -360,33 +391,36 @@ class Game:
                 glVertex2f(px,py)
         glEnd()
         glDisable(GL_BLEND)
-        render_text(-30,0,"Paused",GLUT_BITMAP_HELVETICA_18,(1,1,1))
+        render_text(-30,0,"Paused",HELVETICA_18,(1,1,1))
 
     def render_game_over_screen(self):
         glClearColor(0,0,0,1)
         glClear(GL_COLOR_BUFFER_BIT)
-        render_text(-100,100,"GAME OVER",GLUT_BITMAP_HELVETICA_18,(1,0,0))
-        fin_sc=f"Final Score: {self.score}"
-        render_text(-70,50,fin_sc,GLUT_BITMAP_HELVETICA_18,(1,1,1))
-        ops=["Restart (R)","Exit (E)"]
+        render_text(-100,100,"GAME OVER",HELVETICA_18,(1,0,0))
+        fin_sc=f"Final Score: {self.view.score}"
+        render_text(-70,50,fin_sc,HELVETICA_18,(1,1,1))
+        ops=["Restart (R)","Retry Level (L)","Rewind 3s (W)","Exit (E)"]
         ox=-100
         oy=-50
         for op in ops:
-            render_text(ox,oy,op,GLUT_BITMAP_HELVETICA_18,(1,1,1))
+            render_text(ox,oy,op,HELVETICA_18,(1,1,1))
             oy-=30
 
     def render_game(self):
         glClearColor(0,0,0,1)
         glClear(GL_COLOR_BUFFER_BIT)
-        glPushMatrix()
-        glTranslatef(0, -self.reserved_ui_height/2, 0)
-        self.render_maze()
-        self.render_player()
-        self.render_enemies()
-        self.render_collectibles()
-        self.render_powerups()
-        self.render_exit()
-        glPopMatrix()
+        if self.damage is not None:
+            self.render_software()
+        else:
+            glPushMatrix()
+            glTranslatef(0, -self.reserved_ui_height/2, 0)
+            self.render_maze()
+            self.render_player()
+            self.render_enemies()
+            self.render_collectibles()
+            self.render_powerups()
+            self.render_exit()
+            glPopMatrix()
         self.render_score()
         self.render_level()
         self.render_buttons()
@@ -395,6 +429,10 @@ class Game:
             self.render_paused_overlay()
 
     def render(self):
+        # One consistent state per frame, whatever the sim thread does meanwhile.
+        # The menus don't draw the world, which may still be being built.
+        if self.current_state in (GAME_STATE,GAME_OVER_STATE):
+            self.view=self.sim.view() if self.sim else self.world
         if self.current_state==MENU_STATE:
             self.render_main_menu()
         elif self.current_state==INSTRUCTIONS_STATE:
@@ -406,128 +444,108 @@ class Game:
 
     # -------------- LOGIC --------------
 
-    def update_enemies(self):
-        now=time.time()
-        for en in self.enemies:
-            if now - en.last_move_time>=en.speed:
-                en.update_path(self.player.x,self.player.y)
-                if hasattr(en,"move_towards_player"):
-                    en.move_towards_player()
-                en.last_move_time=now
-
-            # If the player is NOT invisible, we can kill them
-            if not self.is_invisible:
-                if en.x== self.player.x and en.y== self.player.y:
-                    self.current_state= GAME_OVER_STATE
-                    print("Collision with enemy! Game Over.")
-
     def update_game_logic(self):
-        if self.is_paused or self.current_state!=GAME_STATE:
-            return
         now=time.time()
         delta= now- self.last_time_update
         self.last_time_update= now
-        self.level_time-= delta
-        if self.level_time<=0:
-            print("Time ran out!")
-            self.current_state=GAME_OVER_STATE
+        running=not self.is_paused and self.current_state==GAME_STATE
+        if self.sim:
+            # The sim thread keeps its own clock; just tell it whether time runs
+            self.sim.active=running
+            self.sim.dispatch()
             return
+        if not running:
+            return
+        for action,origin in self.inputs.drain():
+            apply_input(self.world,action)
+            self.latency.applied(origin)
+        self.world.update(delta)
+        self.handle_world_events(self.world.drain_events())
 
-        # End invisibility if time is up
-        if self.is_invisible and now>= self.invisible_until:
-            self.is_invisible= False
-            print("Invisibility ended!")
-
-        # speed boost check
-        if self.speed_boost_active and now>= self.speed_boost_until:
-            self.speed_boost_active= False
-            print("Speed boost ended!")
-
-        # update enemies
-        if now-self.last_enemy_move_time>= self.enemy_move_interval:
-            self.update_enemies()
-            self.last_enemy_move_time= now
-
-    def move_player(self,dx,dy):
-        steps= 2 if self.speed_boost_active else 1
-        for _ in range(steps):
-            nx= self.player.x+ dx
-            ny= self.player.y+ dy
-            # Bound checks
-            if nx<0 or nx>= self.maze.cols or ny<0 or ny>= self.maze.rows:
-                return
-            # Wall checks
-            if self.maze.grid[ny][nx]== 1:
-                return
-
-            self.player.x= nx
-            self.player.y= ny
-
-            # Collect collectibles
-            for c in self.collectibles:
-                if not c.collected and c.x== self.player.x and c.y== self.player.y:
-                    c.collected= True
-                    self.score+= 10
-                    print(f"Collected gem: ({c.x},{c.y}), Score={self.score}")
-
-            # Collect powerups
-            for p in self.powerups:
-                if not p.collected and p.x==self.player.x and p.y==self.player.y:
-                    p.collected= True
-                    print(f"Power-up: {p.power_type}")
-                    if p.power_type=="speed":
-                        self.speed_boost_active= True
-                        self.speed_boost_until= time.time()+5
-                    elif p.power_type=="invincibility":
-                        self.is_invincible= True
-                        self.invisible_until= time.time()+5
-                        print("Invincibility power-up! Invisible for 5s")
-
-            # Check exit
-            if self.player.x== self.exit_x and self.player.y== self.exit_y:
-                self.current_level+=1
-                print(f"Level complete! Now level {self.current_level}")
-                save_progress(self.current_level)
-                self.maze.generate_maze()
-                self.maze.carve_extra_paths(2)
-                self.initialize_entities()
-                break
+    def command(self, name, *args, then=None):
+        """
+        Calls World method name: queued to the sim thread for a local game, directly
+        on a remote one. then(result) runs on this thread once it is done.
+        """
+        self.ensure_world()
+        if self.sim:
+            self.sim.post(getattr(type(self.world),name),*args,then=then)
+            return
+        result=getattr(self.world,name)(*args)
+        self.handle_world_events(self.world.drain_events())
+        if then:
+            then(result)
 
-            # If not invisible, check collision with enemies
-            if not self.is_invisible:
-                for en in self.enemies:
-                    if en.x== self.player.x and en.y== self.player.y:
-                        self.current_state= GAME_OVER_STATE
-                        print("Collision with enemy! Game Over.")
-                        break
+    def handle_world_events(self, events):
+        """
+        Reacts to what happened in the world: saves progress and switches to game over.
+        """
+        for event in events:
+            if event[0]=="game_over":
+                self.current_state= GAME_OVER_STATE
+                self.inputs.clear()
+                self.end_session()
+                return
+        if events:
+            self.save_session()
 
     # -------------- GAME STATES --------------
 
     def pause_game(self):
         self.is_paused= True
+        self.inputs.clear()
+        if self.remote:
+            self.command("pause")
+        self.save_session()
         print("Game Paused.")
 
     def resume_game(self):
         self.is_paused= False
+        if self.remote:
+            self.command("resume")
         print("Game Resumed.")
 
     def restart_game(self):
-        self.score= 0
-        self.current_level= 1
-        save_progress(self.current_level)
-        self.maze.generate_maze()
-        self.maze.carve_extra_paths(2)
-        self.initialize_entities()
+        self.inputs.clear()
+        self.command("restart")
+        self.save_session()
         self.current_state= GAME_STATE
         self.is_paused= False
         print("Game Restarted, progress set to level 1.")
 
+    def retry_level(self):
+        self.inputs.clear()
+        self.command("retry_level")
+        self.current_state= GAME_STATE
+        self.is_paused= False
+        print(f"Retrying level {self.view.current_level}.")
+
+    def rewind(self, seconds=3.0):
+        ticks=max(1,int(seconds/self.view.enemy_move_interval))
+        self.inputs.clear()
+
+        def rewound(ok):
+            if ok:
+                self.current_state= GAME_STATE
+                self.is_paused= False
+                print(f"Rewound {seconds:g}s.")
+        self.command("rewind",ticks,then=rewound)
+
     def exit_game(self):
         glfw.set_window_should_close(self.window,True)
 
     # -------------- INPUTS --------------
 
     def key_callback(self,window,key,scancode,action,mods):
+        if key in KEY_ACTIONS and action==glfw.RELEASE:
+            # Always forwarded, or a key let go on another screen would stay held
+            self.inputs.push(KEY_ACTIONS[key],False)
+        if self.current_state==GAME_STATE and key in KEY_ACTIONS:
+            # Queued with a timestamp and applied on the next tick; key repeat is
+            # the queue's own, so GLFW's REPEAT events are ignored
+            if action==glfw.PRESS and not self.is_paused:
+                self.inputs.push(KEY_ACTIONS[key],True)
+            return
         if action!=glfw.PRESS:
             return
 
@@ -556,25 +574,14 @@ class Game:
                     self.resume_game()
                 else:
                     self.pause_game()
-            elif not self.is_paused:
-                # Movement
-                if key==glfw.KEY_UP:
-                    self.move_player(0,-1)
-                elif key==glfw.KEY_DOWN:
-                    self.move_player(0,1)
-                elif key==glfw.KEY_LEFT:
-                    self.move_player(-1,0)
-                elif key==glfw.KEY_RIGHT:
-                    self.move_player(1,0)
-                # Invisibility by pressing I
-                elif key==glfw.KEY_I:
-                    self.is_invisible= True
-                    self.invisible_until= time.time()+3
-                    print("Invisibility activated for 3s!")
 
         elif self.current_state==GAME_OVER_STATE:
             if key==glfw.KEY_R:
                 self.restart_game()
+            elif key==glfw.KEY_L:
+                self.retry_level()
+            elif key==glfw.KEY_W:
+                self.rewind()
             elif key==glfw.KEY_E:
                 glfw.set_window_should_close(self.window,True)
 
@@ -591,24 +598,134 @@ class Game:
                 break
 
     def load_progress_and_start(self):
-        lvl=load_progress()
-        self.current_level=lvl
+        self.ensure_world()
+        if self.remote:
+            return
+        self.sim.post(self.start_world)
+
+    def start_world(self, world):
+        """
+        Sets up the first level of a local game. Runs on the sim thread.
+        """
+        if self.maze_file:
+            from modules.maze_file import read_maze
+            world.load_level(read_maze(self.maze_file))
+            print(f"Loaded maze {self.maze_file}")
+            return
+        if self.pack:
+            world.level_source=lambda n:self.pack.load((n-1)%len(self.pack)+1)
+            world.current_level=self.pack_level
+            world.start_level()
+            print(f"Loaded level {self.pack_level} of {self.pack.path}")
+            return
+        saved=self.saves.load()
+        if saved and saved.get("session"):
+            world.load_dict(saved["session"])
+            print(f"Resumed session, level={world.current_level}")
+            return
+        lvl=saved.get("highest_level",1) if saved else 1
+        world.current_level=lvl
         print(f"Loaded progress, level={lvl}")
-        self.maze.generate_maze()
-        self.maze.carve_extra_paths(2)
-        self.initialize_entities()
+        world.start_level()
+
+    # -------------- PERSISTENCE --------------
+
+    def save_session(self):
+        """
+        Queues a save of the current session; the write happens off the main thread.
+        """
+        self.ensure_world()
+        if self.remote:
+            return
+        self.sim.post(lambda world:self.saves.save({"highest_level":world.current_level,
+                                                    "session":world.to_dict()}))
+
+    def end_session(self):
+        """
+        Drops the resumable session (e.g. on game over) but keeps the level progress.
+        """
+        self.ensure_world()
+        if self.remote:
+            return
+        self.sim.post(lambda world:self.saves.save({"highest_level":world.current_level,"session":None}))
 
     def run(self):
+        first_frame=True
         while not glfw.window_should_close(self.window):
-            self.render()
+            with self.memory.measure("render") if self.memory is not None else nullcontext():
+                self.render()
+            if self.memory is not None:
+                self.memory.frame()
             self.update_game_logic()
             glfw.swap_buffers(self.window)
+            # Every input included in the frame just presented is now on screen
+            self.latency.presented(self.sim.view_frame.inputs if self.sim else self.latency.applied_count)
+            if first_frame:
+                first_frame=False
+                timer.mark("first menu frame")
+                if self.exit_after_first_frame:
+                    print(timer.report())
+                    break
             glfw.poll_events()
+        self.ensure_world()
+        if self.report_startup:
+            print(timer.report())
+        if self.current_state==GAME_STATE:
+            self.save_session()
+        if self.remote:
+            self.world.close()
+        else:
+            # Applies the final save before the writer shuts down
+            self.sim.close()
+            self.saves.close()
+        print(self.latency.summary())
+        if self.memory is not None:
+            print(self.memory.report())
         glfw.terminate()
 
-def main():
-    glutInit(sys.argv)
-    game=Game(800,600,21,21)
+def parse_address(text):
+    """
+    "host:port" -> (host, port); anything else is taken as a Unix socket path.
+    """
+    host,sep,port=text.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1",int(port))
+    return text
+
+def parse_args(argv=None):
+    # Imported here, not at the top, to keep it off the cold-start path
+    import argparse
+    parser=argparse.ArgumentParser(description="Pixel Adventure Maze.")
+    parser.add_argument("--connect",metavar="ADDRESS",type=parse_address,default=None,
+                        help="play a session on a game server (host:port or a Unix socket path)")
+    parser.add_argument("--maze",metavar="FILE",default=None,help="play a maze file")
+    parser.add_argument("--pack",metavar="FILE",default=None,help="play the levels of a level pack")
+    parser.add_argument("--level",type=int,default=1,help="first level of --pack")
+    parser.add_argument("--software",action="store_true",help="draw frames with the software renderer")
+    parser.add_argument("--dark",action="store_true",help="darkness mode (fog of war)")
+    parser.add_argument("--tick-rate",type=int,default=60,help="simulation ticks per second")
+    parser.add_argument("--timings",action="store_true",help="print startup phase timings")
+    parser.add_argument("--first-frame-exit",action="store_true",help="quit after the first frame (startup benchmark)")
+    parser.add_argument("--memory",action="store_true",help="profile memory and print a report on exit")
+    parser.add_argument("--coop",action="store_true",help="enemies chase with the cooperative planner")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args=parse_args(argv)
+    rows,cols=21,21
+    if args.maze:
+        from modules.maze_file import read_header
+        header=read_header(args.maze)
+        rows,cols=header.rows,header.cols
+    pack=None
+    if args.pack:
+        from modules.level_pack import LevelPack
+        pack=LevelPack(args.pack)
+        rows,cols=pack.header.rows,pack.header.cols
+    game=Game(800,600,rows,cols,remote=args.connect,software=args.software,maze_file=args.maze,
+              pack=pack,pack_level=args.level,darkness=args.dark,tick_rate=args.tick_rate,
+              report_startup=args.timings,exit_after_first_frame=args.first_frame_exit,
+              memory_profile=args.memory,cooperative=args.coop)
     game.run()
 
 if __name__=="__main__":
@@ -0,0 +1,221 @@
+# modules/analytics.py
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from modules.maze_passes import open_neighbour_counts
+from modules.pathfinding import distance_field
+
+# Per-maze columns, in output order. Distances are BFS steps; -1 = unreachable / none.
+COLUMNS = [
+    "seed", "extra_carved", "open_cells", "solution_length", "dead_ends", "junctions",
+    "branching_factor", "loops", "corridors", "corridor_mean", "corridor_max",
+    "enemies", "enemy_exit_min", "enemy_exit_mean",
+]
+# The corridor length distribution, one row per corridor
+CORRIDOR_COLUMNS = ["corridor_maze", "corridor_length"]
+
+
+def label_components(mask):
+    """
+    4-connected components of a (B, rows, cols) bool batch, all mazes at once.
+    Every cell starts labelled with its own flat index; each round takes the
+    smallest label among the neighbours, then pointer-jumps (label of the label)
+    so labels travel far along long corridors in few rounds.
+    Returns flat labels (-1 outside mask), each the smallest flat index of its component.
+    """
+    flat = mask.reshape(-1)
+    index = np.arange(mask.size).reshape(mask.shape)
+    cells = np.flatnonzero(flat)
+    # Both directions of every open horizontal and vertical neighbour pair
+    a, b = [], []
+    for p, q in ((index[:, :, 1:], index[:, :, :-1]), (index[:, 1:, :], index[:, :-1, :])):
+        p, q = p.reshape(-1), q.reshape(-1)
+        both = flat[p] & flat[q]
+        a += [p[both], q[both]]
+        b += [q[both], p[both]]
+    a, b = np.concatenate(a), np.concatenate(b)
+
+    labels = index.reshape(-1).copy()
+    while True:
+        low = labels.copy()
+        np.minimum.at(low, a, labels[b])
+        # Hook each cell's old label onto the smaller one too, then jump
+        np.minimum.at(low, labels[cells], low[cells])
+        low[cells] = low[low[cells]]
+        if np.array_equal(low, labels):
+            break
+        labels = low
+    return np.where(flat, labels, -1)
+
+
+def analyze_batch(grids, spawns, exits, enemies):
+    """
+    Difficulty metrics of a batch of mazes of the same size.
+    :param grids: (B, rows, cols) array, 1 = wall, 0 = path
+    :param spawns: B (x, y) player spawns
+    :param exits: B (x, y) exits
+    :param enemies: B lists of enemy (x, y) cells
+    Returns (dict of per-maze columns, dict of corridor columns). The grid-wide
+    counts are vectorized over the whole batch; distances are one flat-array BFS
+    from each exit, which also gives the solution length.
+    """
+    grids = np.asarray(grids, dtype=np.uint8)
+    count, rows, cols = grids.shape
+    open_cells = grids == 0
+    degree = open_neighbour_counts(grids)
+    columns = {}
+
+    columns["open_cells"] = open_cells.sum(axis=(1, 2))
+    columns["dead_ends"] = (open_cells & (degree == 1)).sum(axis=(1, 2))
+    junction = open_cells & (degree >= 3)
+    columns["junctions"] = junction.sum(axis=(1, 2))
+    # Mean number of ways on (besides back) at a junction
+    choices = np.where(junction, degree.astype(np.int64) - 1, 0).sum(axis=(1, 2))
+    columns["branching_factor"] = np.divide(choices, columns["junctions"],
+                                            out=np.zeros(count), where=columns["junctions"] > 0)
+
+    # Independent cycles of the open-cell graph: edges - vertices + components
+    edges = ((open_cells[:, :, 1:] & open_cells[:, :, :-1]).sum(axis=(1, 2)) +
+             (open_cells[:, 1:, :] & open_cells[:, :-1, :]).sum(axis=(1, 2)))
+    labels = label_components(open_cells)
+    roots = np.flatnonzero(labels == np.arange(labels.size))
+    components = np.bincount(roots // (rows*cols), minlength=count)
+    columns["loops"] = edges - columns["open_cells"] + components
+
+    # Corridors: components of degree-2 cells; their sizes are the length distribution
+    corridor_labels = label_components(open_cells & (degree == 2))
+    ids, lengths = np.unique(corridor_labels[corridor_labels >= 0], return_counts=True)
+    corridor_maze = ids // (rows*cols)
+    columns["corridors"] = np.bincount(corridor_maze, minlength=count)
+    total = np.bincount(corridor_maze, weights=lengths, minlength=count)
+    columns["corridor_mean"] = np.divide(total, columns["corridors"], out=np.zeros(count),
+                                         where=columns["corridors"] > 0)
+    longest = np.zeros(count, dtype=np.int64)
+    np.maximum.at(longest, corridor_maze, lengths)
+    columns["corridor_max"] = longest
+
+    solution = np.full(count, -1, dtype=np.int64)
+    enemy_count = np.zeros(count, dtype=np.int64)
+    enemy_min = np.full(count, -1, dtype=np.int64)
+    enemy_mean = np.full(count, -1.0)
+    for i in range(count):
+        walls = grids[i].tobytes()
+        dist = np.frombuffer(distance_field(walls, cols, exits[i][1]*cols + exits[i][0]), dtype=np.int32)
+        solution[i] = dist[spawns[i][1]*cols + spawns[i][0]]
+        cells = np.array([y*cols + x for x, y in enemies[i]], dtype=np.intp)
+        enemy_count[i] = len(cells)
+        reachable = dist[cells][dist[cells] >= 0]
+        if len(reachable):
+            enemy_min[i] = reachable.min()
+            enemy_mean[i] = reachable.mean()
+    columns["solution_length"] = solution
+    columns["enemies"] = enemy_count
+    columns["enemy_exit_min"] = enemy_min
+    columns["enemy_exit_mean"] = enemy_mean
+    return columns, {"corridor_maze": corridor_maze, "corridor_length": lengths}
+
+
+def analyze_seeds(seeds, rows=21, cols=21, extra_passages=2):
+    """
+    Generates the level of every seed and analyzes them as one batch. Runs in a pool worker.
+    """
+    from modules.world import World
+    world = World(rows, cols, seed=seeds[0], history_size=0, verbose=False)
+    grids = np.empty((len(seeds), world.maze.rows, world.maze.cols), dtype=np.uint8)
+    spawns, exits, enemies, carved = [], [], [], []
+    for i, seed in enumerate(seeds):
+        # World.start_level, with a configurable number of loops
+        world.maze.generate_maze(seed)
+        world.maze.carve_extra_paths(extra_passages)
+        world.setup_level()
+        grids[i] = world.maze.grid
+        spawns.append((world.player.x, world.player.y))
+        exits.append((world.exit_x, world.exit_y))
+        enemies.append([(en.x, en.y) for en in world.enemies])
+        carved.append(world.maze.extra_carved)
+    columns, corridors = analyze_batch(grids, spawns, exits, enemies)
+    columns["seed"] = np.asarray(seeds, dtype=np.int64)
+    columns["extra_carved"] = np.asarray(carved, dtype=np.int64)
+    return columns, corridors
+
+
+def analyze_many(seeds, rows=21, cols=21, extra_passages=2, workers=None, batch_size=256):
+    """
+    Runs analyze_seeds over seeds in batches across a process pool.
+    Returns the concatenated columns in seed order.
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = list(seeds)
+    batches = [seeds[i:i + batch_size] for i in range(0, len(seeds), batch_size)]
+    columns = {name: [] for name in COLUMNS}
+    corridors = {name: [] for name in CORRIDOR_COLUMNS}
+    offset = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(analyze_seeds, batches, [rows]*len(batches), [cols]*len(batches),
+                           [extra_passages]*len(batches))
+        for batch, (batch_columns, corr) in zip(batches, results):
+            for name in COLUMNS:
+                columns[name].append(batch_columns[name])
+            # Corridor rows point at the maze's row in the combined table
+            corridors["corridor_maze"].append(corr["corridor_maze"] + offset)
+            corridors["corridor_length"].append(corr["corridor_length"])
+            offset += len(batch)
+    columns = {name: np.concatenate(parts) for name, parts in columns.items()}
+    corridors = {name: np.concatenate(parts) for name, parts in corridors.items()}
+    return columns, corridors
+
+
+def write_columns(path, columns, corridors):
+    """
+    Writes the results column by column: an .npz holds one array per column
+    (both tables), a .csv holds the per-maze table and a <name>.corridors.csv
+    next to it holds the corridor lengths.
+    """
+    if path.endswith(".csv"):
+        base = path[:-len(".csv")]
+        for out, table in ((path, columns), (base + ".corridors.csv", corridors)):
+            names = list(table)
+            data = np.column_stack([table[name] for name in names]).astype(object)
+            np.savetxt(out, data, delimiter=",", header=",".join(names), comments="",
+                       fmt=["%.4f" if table[name].dtype.kind == "f" else "%d" for name in names])
+        return
+    np.savez(path, **columns, **corridors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute difficulty metrics over many generated mazes.")
+    parser.add_argument("dst", nargs="?", default=None, help=".npz or .csv to write the columns to")
+    parser.add_argument("--seeds", type=int, default=1000, help="number of seeds to analyze")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=21)
+    parser.add_argument("--cols", type=int, default=21)
+    parser.add_argument("--extra-passages", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    columns, corridors = analyze_many(range(args.first_seed, args.first_seed + args.seeds),
+                                      args.rows, args.cols, args.extra_passages,
+                                      args.workers, args.batch_size)
+    print(f"Analyzed {len(columns['seed'])} mazes in {time.perf_counter() - start:.2f}s")
+    for name in COLUMNS[1:]:
+        values = columns[name]
+        print(f"{name:>16}: mean {values.mean():8.2f}  min {values.min():8.2f}  max {values.max():8.2f}")
+    lengths = corridors["corridor_length"]
+    if len(lengths):
+        print("corridor lengths: " + "  ".join(f"p{p} {np.percentile(lengths, p):.0f}"
+                                               for p in (10, 50, 90, 99)))
+    if args.dst:
+        write_columns(args.dst, columns, corridors)
+        print(f"Wrote {args.dst}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+# modules/assets.py
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import pickle
+import sys
+import time
+
+from modules.utils import midpoint_circle, midpoint_line, spike_points
+
+# Bitmap fonts used by the UI. The glyphs are freeglut's, read out of libglut once
+# and kept in the startup cache, so text needs neither the GLUT module nor glutInit.
+HELVETICA_18 = "helvetica18"
+HELVETICA_12 = "helvetica12"
+GLUT_FONT_SYMBOLS = {HELVETICA_18: "fgFontHelvetica18", HELVETICA_12: "fgFontHelvetica12"}
+GLYPH_RANGE = range(32, 127)
+
+CACHE_VERSION = 1
+
+
+def user_cache_dir(app="pixel-adventure-maze"):
+    """
+    The per-user cache directory for app: %LOCALAPPDATA% on Windows,
+    ~/Library/Caches on macOS and $XDG_CACHE_HOME (default ~/.cache) elsewhere.
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, app)
+
+
+# The cache is unpickled at startup, so it lives where only this user can write,
+# never in the source tree
+CACHE_PATH = os.path.join(user_cache_dir(), "startup_cache.pickle")
+
+
+# Sprite shapes in sprite units (a tenth of a cell), by (name, radius)
+SHAPE_BUILDERS = {
+    "circle": lambda r: midpoint_circle(0, 0, r),
+    "spikes": spike_points,
+    "visor": lambda r: midpoint_line(-r + 2, 0, r - 2, 0),
+}
+# What the renderers ask for: player (10, 8, visor), enemy (8, spikes, eye), pickups (5)
+PREBUILT_SHAPES = [("circle", 10), ("circle", 8), ("circle", 5), ("circle", 2),
+                   ("spikes", 8), ("visor", 10)]
+
+
+class Font:
+    """
+    A bitmap font as glBitmap wants it: per character (width, rows of bytes
+    bottom row first), plus the shared height and origin.
+    """
+
+    def __init__(self, height, xorig, yorig, glyphs):
+        self.height = height
+        self.xorig = xorig
+        self.yorig = yorig
+        self.glyphs = glyphs
+
+    def width(self, text):
+        return sum(self.glyphs[ord(ch)][0] for ch in text if ord(ch) in self.glyphs)
+
+
+class SFGFont(ctypes.Structure):
+    # freeglut's internal font record (fg_internal.h)
+    _fields_ = [("name", ctypes.c_char_p),
+                ("quantity", ctypes.c_int),
+                ("height", ctypes.c_int),
+                ("characters", ctypes.POINTER(ctypes.POINTER(ctypes.c_ubyte))),
+                ("xorig", ctypes.c_float),
+                ("yorig", ctypes.c_float)]
+
+
+def read_glut_font(name):
+    """
+    Copies a font out of the freeglut shared library, or returns None if that
+    isn't possible here (no freeglut, or a GLUT that keeps fonts differently).
+    """
+    path = ctypes.util.find_library("glut")
+    if path is None:
+        return None
+    try:
+        record = SFGFont.in_dll(ctypes.CDLL(path), GLUT_FONT_SYMBOLS[name])
+    except (OSError, ValueError):
+        return None
+    glyphs = {}
+    for code in GLYPH_RANGE:
+        face = record.characters[code]
+        width = face[0]
+        size = ((width + 7) // 8) * record.height
+        glyphs[code] = (width, bytes(face[1:1 + size]))
+    return Font(record.height, record.xorig, record.yorig, glyphs)
+
+
+_fonts = {}
+_shapes = {}
+
+
+def font(name):
+    """
+    The Font called name, from the cache or libglut; None means fall back to GLUT.
+    """
+    if name not in _fonts:
+        _fonts[name] = read_glut_font(name)
+    return _fonts[name]
+
+
+def shape(name, radius):
+    """
+    Points of sprite shape name at radius, as a list of (x, y); computed once.
+    """
+    key = (name, radius)
+    points = _shapes.get(key)
+    if points is None:
+        points = _shapes[key] = SHAPE_BUILDERS[name](radius)
+    return points
+
+
+def load_cache(path=CACHE_PATH):
+    """
+    Fills the font and shape tables from a cache built by build_cache.
+    Returns False (leaving everything to be computed on demand) if there is
+    no usable cache.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return False
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return False
+    for name, fields in data["fonts"].items():
+        _fonts[name] = Font(*fields)
+    _shapes.update(data["shapes"])
+    return True
+
+
+def build_cache(path=CACHE_PATH):
+    """
+    Precomputes every UI font and prebuilt sprite shape and writes them to path.
+    Fonts that can't be read from libglut are left out (they fall back to GLUT).
+    """
+    fonts = {}
+    for name in GLUT_FONT_SYMBOLS:
+        f = font(name)
+        if f is not None:
+            fonts[name] = (f.height, f.xorig, f.yorig, f.glyphs)
+    shapes = {key: shape(*key) for key in PREBUILT_SHAPES}
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": CACHE_VERSION, "fonts": fonts, "shapes": shapes}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return sorted(fonts), len(shapes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or check the startup asset cache.")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--path", default=CACHE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        fonts, shapes = build_cache(args.path)
+        print(f"Wrote {args.path}: fonts {fonts}, {shapes} shapes")
+        return 0
+    start = time.perf_counter()
+    ok = load_cache(args.path)
+    print(f"{'Loaded' if ok else 'No usable cache at'} {args.path} "
+          f"in {(time.perf_counter() - start)*1000:.2f} ms")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
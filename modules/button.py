@@ -1,10 +1,8 @@
 # modules/button.py
 
-import ctypes
 from OpenGL.GL import *
-from OpenGL.GLUT import *
-from OpenGL.GLU import *
-from modules.utils import render_text, midpoint_line
+from modules.utils import midpoint_lines, draw_points
+from modules.text import render_text, text_width, HELVETICA_18
 
 class Button:
     """
@@ -35,24 +33,18 @@ class Button:
 
         # Border with midpoint_line
         glColor3f(1.0, 1.0, 1.0)
-        top_line = midpoint_line(x_min, y_max, x_max, y_max)
-        bottom_line = midpoint_line(x_min, y_min, x_max, y_min)
-        left_line = midpoint_line(x_min, y_min, x_min, y_max)
-        right_line = midpoint_line(x_max, y_min, x_max, y_max)
+        draw_points(midpoint_lines([(x_min, y_max, x_max, y_max),    # top
+                                    (x_min, y_min, x_max, y_min),    # bottom
+                                    (x_min, y_min, x_min, y_max),    # left
+                                    (x_max, y_min, x_max, y_max)]))  # right
 
-        glBegin(GL_POINTS)
-        for pt in (top_line + bottom_line + left_line + right_line):
-            glVertex2f(pt[0], pt[1])
-        glEnd()
+        self.render_label()
 
-        # Label
-        label_bytes = self.label.encode('utf-8')
-        label_buffer = ctypes.create_string_buffer(label_bytes)
-        label_ptr = ctypes.cast(label_buffer, ctypes.POINTER(ctypes.c_ubyte))
-        label_w = glutBitmapLength(GLUT_BITMAP_HELVETICA_18, label_ptr)
+    def render_label(self):
+        label_w = text_width(self.label, HELVETICA_18)
         label_x = self.x + (self.width - label_w) / 2
         label_y = self.y - self.height/2 - 5
-        render_text(label_x, label_y, self.label, GLUT_BITMAP_HELVETICA_18, (1,1,1))
+        render_text(label_x, label_y, self.label, HELVETICA_18, (1,1,1))
 
     def is_clicked(self, cx, cy):
         return (self.x <= cx <= self.x + self.width) and (self.y - self.height <= cy <= self.y)
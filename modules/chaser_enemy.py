@@ -7,13 +7,22 @@ class ChaserEnemy(Enemy):
     An enemy that ALWAYS chases the player with A* every move (no random moves).
     """
 
-    def __init__(self, x, y, maze):
-        super().__init__(x, y, maze)
+    __slots__ = ()
+    type_name = "chaser"
+
+    def __init__(self, x, y, maze, rng=None, store=None):
+        super().__init__(x, y, maze, rng, store)
         # Could set different speed or color if desired
 
-    def update_path(self, target_x, target_y):
+    def update_path(self, target_x, target_y, sight_radius=None):
+        # Out of sight it keeps heading for where it last saw the player, then wanders
+        if not self.sees(target_x, target_y, sight_radius):
+            if self.path_index >= len(self.path):
+                self.path = []
+                self.random_move()
+            return
         # Always recalc path to the player
-        self.path = self.a_star_search(self.x, self.y, target_x, target_y)
+        self.path = self.plan_path(target_x, target_y)
         self.path_index = 0
 
     def move_towards_player(self):
@@ -1,19 +1,35 @@
 # modules/collectible.py
 
-from OpenGL.GL import *
-from modules.utils import midpoint_circle
+from modules.utils import draw_points, sprite_points
+from modules.assets import shape
+from modules.entity_store import EntityStore, EntityHandle, KIND_GEM, FLAG_COLLECTED
 
-class Collectible:
+class Collectible(EntityHandle):
     """
     A collectible gem, never in the border, using fancy circle design.
+    Its data lives in an EntityStore slot; pass the level's store to share it.
     """
 
-    def __init__(self, x, y, collected=False):
-        self.x = x
-        self.y = y
-        self.collected = collected
+    __slots__ = ()
+
+    def __init__(self, x, y, collected=False, store=None):
+        self.store = store if store is not None else EntityStore()
+        self.slot = self.store.add(KIND_GEM, "gem", x, y,
+                                   FLAG_COLLECTED if collected else 0)
+
+    @property
+    def collected(self):
+        return bool(self.store.flags[self.slot] & FLAG_COLLECTED)
+
+    @collected.setter
+    def collected(self, value):
+        if value:
+            self.store.flags[self.slot] |= FLAG_COLLECTED
+        else:
+            self.store.flags[self.slot] &= ~FLAG_COLLECTED & 0xFF
 
     def render(self, scale_x, scale_y, maze_cols, maze_rows, radius=5):
+        from OpenGL.GL import glColor3f, glBegin, glEnd, glVertex2f, GL_POINTS
         if self.collected:
             return
 
@@ -22,10 +38,24 @@ class Collectible:
         gl_cy = (maze_rows/2 - self.y)*scale_y
 
         # Circle points
-        circle_pts = midpoint_circle(0, 0, radius)
+        circle_pts = shape("circle", radius)
         glColor3f(1.0, 1.0, 0.0)  # Yellow
 
         glBegin(GL_POINTS)
         for px, py in circle_pts:
             glVertex2f(gl_cx + px*scale_x/10, gl_cy + py*scale_y/10)
         glEnd()
+
+    @staticmethod
+    def render_batch(store, scale_x, scale_y, maze_cols, maze_rows, radius=5, fog=None):
+        """
+        Draws every uncollected gem in store with one draw call
+        (only those in view if a FogOfWar is given).
+        """
+        from OpenGL.GL import glColor3f
+        centers = store.positions(KIND_GEM, skip_flags=FLAG_COLLECTED)
+        if fog is not None:
+            centers = fog.filter(centers)
+        glColor3f(1.0, 1.0, 0.0)  # Yellow
+        draw_points(sprite_points(centers, shape("circle", radius),
+                                  scale_x, scale_y, maze_cols, maze_rows))
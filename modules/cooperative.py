@@ -0,0 +1,363 @@
+# modules/cooperative.py
+
+import argparse
+import heapq
+import random
+import time
+
+from modules.pathfinding import flatten_grid, distance_field
+
+
+class CooperativePlanner:
+    """
+    WHCA*-style planning for enemies chasing the same player. Enemies plan one
+    after another in priority order with a space-time A* over (cell, step) for
+    the next `window` steps, and reserve the cells (and moves) of their plan in a
+    shared reservation table; later enemies route around those reservations,
+    so no two planned enemies share a cell or swap places.
+    - Time is counted in enemy move rounds (begin_tick calls); World only starts
+      a round when an enemy is due to move.
+    - An enemy parks on the last cell of its plan until it plans again, and an
+      enemy without a plan parks where it stands; parked cells are blocked for
+      good, and a plan may only end on a cell nobody claims later.
+    - Plans and their reservations carry over between rounds; an enemy only
+      replans when its plan runs short, it left the plan (e.g. wandered), or
+      the player has moved more than goal_slack cells from the planned goal.
+    - All searches of a round share node_budget expanded nodes. Enemies past
+      the budget keep their old plan if it is still valid, otherwise take one
+      greedy step down the distance field into a free cell.
+    - The heuristic is the true BFS distance to the player, one field per round
+      shared by every enemy.
+    """
+
+    def __init__(self, window=8, node_budget=2000, goal_slack=2):
+        self.window = window
+        self.node_budget = node_budget
+        self.goal_slack = goal_slack
+        self.maze = None
+        self.layout = None
+        self.round = 0
+        self.nodes = 0
+        # Lifetime counters, for benchmarks
+        self.total_nodes = 0
+        self.searches = 0
+        self.reused = 0
+        self.fallbacks = 0
+        self.reset()
+
+    def reset(self):
+        # step -> {cell: owner}; (step, from, to) -> owner for the move from step to step+1
+        self.cells = {}
+        self.moves = {}
+        # cell -> (owner, first step): blocked from that step on
+        self.parked = {}
+        # owner -> (first step, [cell at that step, next step, ...], goal cell)
+        self.plans = {}
+        self.dist_goal = None
+        self.dist = None
+
+    # -------------- PER ROUND --------------
+
+    def begin_tick(self, maze, enemies, px, py):
+        """
+        Starts an enemy move round with the player at (px, py): drops what is in
+        the past or no longer true, and parks every enemy left without a plan.
+        """
+        if maze is not self.maze or maze.layout_key() != self.layout:
+            self.maze = maze
+            self.layout = maze.layout_key()
+            self.walls = flatten_grid(maze)
+            self.reset()
+        self.round += 1
+        self.nodes = 0
+        now = self.round
+        for step in [s for s in self.cells if s < now]:
+            del self.cells[step]
+        for key in [k for k in self.moves if k[0] < now]:
+            del self.moves[key]
+
+        cols = maze.cols
+        goal = py*cols + px
+        if goal != self.dist_goal:
+            self.dist = distance_field(self.walls, cols, goal)
+            self.dist_goal = goal
+
+        live = {en.slot for en in enemies}
+        for owner in [o for o in self.plans if o not in live]:
+            self.release(owner)
+        for owner in [o for o, _ in self.parked.values() if o not in live]:
+            self.release(owner)
+        where = {en.slot: en.y*cols + en.x for en in enemies}
+        stale = [owner for owner, cell in where.items()
+                 if owner not in self.plans or self.cell_at(self.plans[owner], now) != cell]
+        while stale:
+            owner = stale.pop()
+            self.release(owner)
+            cell = where[owner]
+            self.park(owner, cell, now)
+            # Plans that would walk into the parked enemy have to be made again
+            for other, (first, path, _) in list(self.plans.items()):
+                if other != owner and cell in path[max(0, now - first):]:
+                    self.release(other)
+                    stale.append(other)
+
+    def order(self, enemies):
+        """
+        enemies in planning priority order: closest to the player first, so the
+        enemy with the best shot at the player gets the best route.
+        """
+        dist = self.dist
+        cols = self.maze.cols
+
+        def key(en):
+            d = dist[en.y*cols + en.x]
+            return d if d >= 0 else len(dist)
+        return sorted(enemies, key=key)
+
+    # -------------- PLANNING --------------
+
+    def path_for(self, en, gx, gy):
+        """
+        The cells en should walk from the next step on, as a list of (x, y);
+        [] if it should stay (or the goal is unreachable). Call after begin_tick.
+        """
+        cols = self.maze.cols
+        owner = en.slot
+        now = self.round
+        start = en.y*cols + en.x
+        goal = gy*cols + gx
+        plan = self.plans.get(owner)
+        due = (plan is None or plan[0] + len(plan[1]) - 1 - now < self.window // 2 or
+               self.manhattan(plan[2], goal) > self.goal_slack)
+        if not due:
+            self.reused += 1
+            return self.remaining(plan, now)
+
+        if self.nodes < self.node_budget:
+            cells = self.search(owner, start, goal, now)
+            if cells is not None:
+                self.release(owner)
+                self.reserve(owner, now, cells, goal)
+                return self.remaining(self.plans[owner], now)
+        self.fallbacks += 1
+        if plan is not None:
+            return self.remaining(plan, now)
+        return self.greedy_step(owner, start, goal, now)
+
+    def search(self, owner, start, goal, now):
+        """
+        Space-time A* from start at step now, up to window steps ahead, avoiding
+        other owners' reservations. Returns the cells from start on, or None
+        when the budget ran out before any useful plan was found.
+        """
+        walls = self.walls
+        cols = self.maze.cols
+        size = len(walls)
+        dist = self.dist if goal == self.dist_goal else distance_field(walls, cols, goal)
+        if dist[start] < 0:
+            return [start]
+        window = self.window
+        moves = self.moves
+        self.searches += 1
+
+        # Entries are (f, -g, tie, cell, step offset); parents keyed by (cell, offset)
+        frontier = [(dist[start], 0, 0, start, 0)]
+        parent = {(start, 0): None}
+        tie = 0
+        best = None
+        budget = self.node_budget - self.nodes
+        expanded = 0
+        while frontier and expanded < budget:
+            f, neg_g, _, cell, k = heapq.heappop(frontier)
+            expanded += 1
+            if (cell == goal or k == window) and self.can_park(owner, cell, now + k):
+                best = (cell, k)
+                break
+            if (best is None or dist[cell] < dist[best[0]]) and self.can_park(owner, cell, now + k):
+                best = (cell, k)
+            if k == window:
+                continue
+            step = now + k + 1
+            cx = cell % cols
+            for n in (cell, cell - 1 if cx > 0 else -1, cell + 1 if cx < cols - 1 else -1,
+                      cell - cols, cell + cols):
+                if n < 0 or n >= size or walls[n] or dist[n] < 0:
+                    continue
+                if not self.free(owner, n, step) or moves.get((now + k, n, cell), owner) != owner:
+                    continue
+                node = (n, k + 1)
+                if node in parent:
+                    continue
+                parent[node] = (cell, k)
+                tie += 1
+                heapq.heappush(frontier, (k + 1 + dist[n], neg_g - 1, tie, n, k + 1))
+        self.nodes += expanded
+        self.total_nodes += expanded
+        if best is None:
+            return None
+        path = []
+        node = best
+        while node is not None:
+            path.append(node[0])
+            node = parent[node]
+        path.reverse()
+        return path
+
+    def greedy_step(self, owner, start, goal, now):
+        """
+        One step to the free neighbour closest to the goal, or none if no
+        neighbour is closer; reserved like a one-step plan.
+        """
+        cols = self.maze.cols
+        dist = self.dist if goal == self.dist_goal else distance_field(self.walls, cols, goal)
+        best = start
+        cx = start % cols
+        for n in (start - 1 if cx > 0 else -1, start + 1 if cx < cols - 1 else -1,
+                  start - cols, start + cols):
+            if (0 <= n < len(self.walls) and 0 <= dist[n] < dist[best] and
+                    self.free(owner, n, now + 1) and self.can_park(owner, n, now + 1) and
+                    self.moves.get((now, n, start), owner) == owner):
+                best = n
+        self.release(owner)
+        self.reserve(owner, now, [start, best], goal)
+        return self.remaining(self.plans[owner], now)
+
+    # -------------- RESERVATIONS --------------
+
+    def free(self, owner, cell, step):
+        """
+        Whether owner may be on cell at step.
+        """
+        holder = self.cells.get(step, {}).get(cell, owner)
+        if holder != owner:
+            return False
+        parked = self.parked.get(cell)
+        return parked is None or parked[0] == owner or parked[1] > step
+
+    def can_park(self, owner, cell, step):
+        """
+        Whether owner can stay on cell from step on: nobody else claims it later.
+        """
+        parked = self.parked.get(cell)
+        if parked is not None and parked[0] != owner:
+            return False
+        return all(taken.get(cell, owner) == owner for s, taken in self.cells.items() if s >= step)
+
+    def park(self, owner, cell, step):
+        self.parked[cell] = (owner, step)
+
+    def reserve(self, owner, first, path, goal):
+        for k, cell in enumerate(path):
+            self.cells.setdefault(first + k, {})[cell] = owner
+            if k:
+                self.moves[(first + k - 1, path[k - 1], cell)] = owner
+        self.park(owner, path[-1], first + len(path) - 1)
+        self.plans[owner] = (first, path, goal)
+
+    def release(self, owner):
+        """
+        Drops owner's plan and every reservation it holds.
+        """
+        plan = self.plans.pop(owner, None)
+        if plan is not None:
+            first, path, _ = plan
+            for k, cell in enumerate(path):
+                taken = self.cells.get(first + k)
+                if taken is not None and taken.get(cell) == owner:
+                    del taken[cell]
+                if k:
+                    self.moves.pop((first + k - 1, path[k - 1], cell), None)
+        for cell in [c for c, (o, _) in self.parked.items() if o == owner]:
+            del self.parked[cell]
+
+    # -------------- HELPERS --------------
+
+    @staticmethod
+    def cell_at(plan, step):
+        """
+        Where a plan has its owner at step; past the end it stays parked on the last cell.
+        """
+        first, path, _ = plan
+        k = step - first
+        if k < 0:
+            return None
+        return path[min(k, len(path) - 1)]
+
+    def remaining(self, plan, now):
+        first, path, _ = plan
+        cols = self.maze.cols
+        return [(cell % cols, cell // cols) for cell in path[now - first + 1:]]
+
+    def manhattan(self, a, b):
+        cols = self.maze.cols
+        return abs(a % cols - b % cols) + abs(a // cols - b // cols)
+
+
+# -------------- BENCHMARK --------------
+
+def run_chase(size, enemies, rounds, cooperative, seed=0, window=8, node_budget=2000, tick_rate=60):
+    """
+    size x size maze with `enemies` chasers and a player doing a random walk (a
+    step every 0.25 s), run through World.update at tick_rate until the enemies
+    have moved `rounds` times. Returns (ms of update per enemy move round, cell
+    collisions per round, the planner or None). Collisions count enemies sharing
+    a cell with another enemy after a round.
+    """
+    from modules.world import World
+    world = World(size, size, seed=seed, history_size=0, verbose=False, cooperative=cooperative)
+    if cooperative:
+        world.planner.window = window
+        world.planner.node_budget = node_budget
+    world.maze.carve_extra_paths(size)
+    world.setup_level()
+    rng = random.Random(seed)
+    open_cells = [(x, y) for y in range(size) for x in range(size) if world.maze.grid[y, x] == 0]
+    world.enemies = [world.make_enemy("chaser", *rng.choice(open_cells)) for _ in range(enemies)]
+    world.is_invisible = True
+    world.invisible_until = float("inf")
+    world.level_time = float("inf")
+
+    dt = 1 / tick_rate
+    next_step = 0.0
+    done = 0
+    collisions = 0
+    spent = 0.0
+    while done < rounds:
+        if world.time >= next_step:
+            dx, dy = rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+            world.move_player(dx, dy)
+            next_step += 0.25
+        start = time.perf_counter()
+        world.update(dt)
+        spent += time.perf_counter() - start
+        if not world.enemies or any(en.last_move_time == world.time for en in world.enemies):
+            done += 1
+            collisions += len(world.enemies) - len({(en.x, en.y) for en in world.enemies})
+    return spent / rounds * 1000, collisions / rounds, world.planner
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cooperative enemy planning against independent A*.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[101, 201])
+    parser.add_argument("--enemies", type=int, nargs="+", default=[2, 4, 8, 16, 32])
+    parser.add_argument("--rounds", type=int, default=60, help="enemy move rounds per run")
+    parser.add_argument("--tick-rate", type=int, default=60)
+    parser.add_argument("--window", type=int, default=8)
+    parser.add_argument("--node-budget", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for size in args.sizes:
+        print(f"{size}x{size}, {args.rounds} rounds at {args.tick_rate} Hz, window {args.window}, budget {args.node_budget} nodes/round")
+        print("enemies   independent ms  stacked   cooperative ms  stacked  nodes/round  reused  fallbacks")
+        for count in args.enemies:
+            solo_ms, solo_stacked, _ = run_chase(size, count, args.rounds, False, args.seed,
+                                                 tick_rate=args.tick_rate)
+            coop_ms, coop_stacked, planner = run_chase(size, count, args.rounds, True, args.seed,
+                                                       args.window, args.node_budget, args.tick_rate)
+            print(f"{count:7d}  {solo_ms:15.3f}  {solo_stacked:7.2f}  {coop_ms:15.3f}  {coop_stacked:7.2f}  "
+                  f"{planner.total_nodes / args.rounds:11.1f}  {planner.reused:6d}  {planner.fallbacks:9d}")
+
+
+if __name__ == "__main__":
+    main()
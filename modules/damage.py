@@ -0,0 +1,163 @@
+# modules/damage.py
+
+import math
+
+import numpy as np
+
+from modules.raster import Framebuffer, draw_maze, draw_button, draw_sprite, exit_points
+from modules.entity_store import KIND_ENEMY, KIND_GEM, KIND_POWERUP, FLAG_COLLECTED
+
+
+def scene_sprites(world):
+    """
+    Every sprite of the play area as (sprite, variant, x, y, slot), in the order
+    render_world draws them. slot is the entity slot (-1 for the player and exit),
+    so two enemies swapping cells still count as changed. In darkness only what
+    is in view is listed (the exit once explored).
+    """
+    store = world.entities
+    fog = world.fog
+
+    def entities(sprite, kind, type_name=None, skip_flags=FLAG_COLLECTED):
+        return [(sprite, type_name, store.xs[slot], store.ys[slot], slot)
+                for slot in store.match_kind(kind, type_name, skip_flags)]
+
+    sprites = [("player", bool(world.is_invisible), world.player.x, world.player.y, -1)]
+    sprites += entities("enemy", KIND_ENEMY, skip_flags=0)
+    sprites += entities("gem", KIND_GEM)
+    for type_name in sorted({store.type_name(slot) for slot, kind in enumerate(store.kinds)
+                             if kind == KIND_POWERUP}):
+        sprites += entities("powerup", KIND_POWERUP, type_name)
+    if fog is None or fog.explored[world.exit_y, world.exit_x]:
+        sprites.append(("exit", None, world.exit_x, world.exit_y, -1))
+    if fog is not None:
+        sprites = [s for s in sprites if s[4] < 0 or fog.is_visible(s[2], s[3])]
+    return sprites
+
+
+class DamageRenderer:
+    """
+    Keeps the software framebuffer between frames and only repaints what changed.
+    The walls and buttons are rasterized once into a background image. Each frame
+    the sprites are compared with the previous frame's, and only the cells of sprites
+    that appeared, moved or disappeared are repainted. Those cells are restored from
+    the background, then every sprite overlapping them is redrawn, clipped to the damage.
+    A level change, pause toggle or resize repaints everything.
+    """
+
+    def __init__(self, width, height, scale_x, scale_y, reserved_ui_height=60.0,
+                 buttons=(), max_damage=0.25):
+        """
+        :param buttons: Buttons to rasterize into the background (labels stay with GL)
+        :param max_damage: Fraction of the frame above which a full repaint is cheaper
+        """
+        self.fb = Framebuffer(width, height)
+        self.buttons = list(buttons)
+        self.reserved_ui_height = reserved_ui_height
+        self.max_damage = max_damage
+        self.resize(width, height, scale_x, scale_y)
+        self.full_repaints = 0
+        self.damaged_pixels = 0
+
+    def resize(self, width, height, scale_x, scale_y):
+        if (width, height) != (self.fb.width, self.fb.height):
+            self.fb = Framebuffer(width, height)
+        self.scale_x = scale_x
+        self.scale_y = scale_y
+        self.clip = np.zeros((height, width), dtype=bool)
+        # Half size in pixels of the box that holds any sprite drawn at a cell
+        # (player radius 10 + 1 for spike thickness, in tenths of a cell; the exit is 8px)
+        self.extent = int(math.ceil(max(11*scale_x/10, 11*scale_y/10, 9))) + 1
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Forces a full repaint on the next frame.
+        """
+        self.background = None
+        self.layout = None
+        self.sprites = None
+        self.paused = None
+
+    def cell_box(self, x, y, cols, rows):
+        """
+        (col0, row0, col1, row1) pixel box, end-exclusive and clamped to the frame,
+        covering whatever a sprite at grid cell (x, y) can draw.
+        """
+        fb = self.fb
+        col = math.floor((x - cols/2)*self.scale_x + fb.width/2)
+        row = fb.height - 1 - math.floor((rows/2 - y)*self.scale_y - self.reserved_ui_height/2 + fb.height/2)
+        e = self.extent
+        return (max(0, col - e), max(0, row - e), min(fb.width, col + e + 1), min(fb.height, row + e + 1))
+
+    def draw_sprites(self, sprites, cols, rows):
+        fb = self.fb
+        fb.offset = (0.0, -self.reserved_ui_height/2)
+        for sprite, variant, x, y, _ in sprites:
+            if sprite == "exit":
+                fb.points(exit_points(x, y, self.scale_x, self.scale_y, cols, rows), (0.0, 0.0, 1.0))
+            else:
+                draw_sprite(fb, sprite, variant, (x, y), self.scale_x, self.scale_y, cols, rows)
+        fb.offset = (0.0, 0.0)
+
+    def repaint(self, world, sprites, paused):
+        fb = self.fb
+        cols, rows = world.maze.cols, world.maze.rows
+        fb.clear()
+        fb.offset = (0.0, -self.reserved_ui_height/2)
+        draw_maze(fb, world.maze, self.scale_x, self.scale_y, world.fog)
+        fb.offset = (0.0, 0.0)
+        for button in self.buttons:
+            draw_button(fb, button)
+        self.background = fb.pixels.copy()
+        self.draw_sprites(sprites, cols, rows)
+        if paused:
+            # The 50% black overlay of render_paused_overlay
+            fb.pixels >>= 1
+        self.full_repaints += 1
+        self.damaged_pixels = fb.width * fb.height
+        return [(0, 0, fb.width, fb.height)]
+
+    def render(self, world, paused=False):
+        """
+        Brings the framebuffer up to date with world. Returns the list of
+        (col0, row0, col1, row1) boxes that changed (image rows, top first), so the
+        caller only uploads those; [] when nothing changed.
+        """
+        fb = self.fb
+        sprites = scene_sprites(world)
+        # The lit walls move with the player in darkness, so each view is a new background
+        fog = world.fog
+        layout = (world.maze.layout_key(), id(world.maze.grid), fog.version if fog is not None else None)
+        if self.background is None or layout != self.layout or paused != self.paused:
+            self.layout, self.sprites, self.paused = layout, sprites, paused
+            return self.repaint(world, sprites, paused)
+        if paused:
+            return []
+
+        changed = set(sprites).symmetric_difference(self.sprites)
+        self.sprites = sprites
+        if not changed:
+            self.damaged_pixels = 0
+            return []
+        cols, rows = world.maze.cols, world.maze.rows
+        boxes = [self.cell_box(x, y, cols, rows) for x, y in {(s[2], s[3]) for s in changed}]
+        area = sum((c1 - c0) * (r1 - r0) for c0, r0, c1, r1 in boxes)
+        if area > self.max_damage * fb.width * fb.height:
+            return self.repaint(world, sprites, paused)
+
+        for c0, r0, c1, r1 in boxes:
+            fb.pixels[r0:r1, c0:c1] = self.background[r0:r1, c0:c1]
+            self.clip[r0:r1, c0:c1] = True
+
+        def overlaps(box):
+            c0, r0, c1, r1 = box
+            return any(c0 < d1 and d0 < c1 and r0 < e1 and e0 < r1 for d0, e0, d1, e1 in boxes)
+        redraw = [s for s in sprites if overlaps(self.cell_box(s[2], s[3], cols, rows))]
+        fb.clip = self.clip
+        self.draw_sprites(redraw, cols, rows)
+        fb.clip = None
+        for c0, r0, c1, r1 in boxes:
+            self.clip[r0:r1, c0:c1] = False
+        self.damaged_pixels = area
+        return boxes
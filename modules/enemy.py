@@ -1,66 +1,76 @@
 # modules/enemy.py
 
 import random
-import heapq
-from OpenGL.GL import *
-from modules.utils import midpoint_circle
+from modules.assets import shape
+from modules.entity_store import EntityStore, EntityHandle, KIND_ENEMY
+from modules.junction_graph import junction_graph_for
+from modules.visibility import visibility_for
 
-class Enemy:
+class Enemy(EntityHandle):
     """
     Normal enemy with fancy design: multi-circle body + spikes
     Uses BFS or random moves.
+    Position and last move time live in an EntityStore slot; the path stays on the handle.
     """
 
-    def __init__(self, x, y, maze):
-        self.x = x
-        self.y = y
+    __slots__ = ("maze", "rng", "path", "path_index", "speed", "planner")
+    type_name = "enemy"
+
+    def __init__(self, x, y, maze, rng=None, store=None):
+        self.store = store if store is not None else EntityStore()
+        self.slot = self.store.add(KIND_ENEMY, self.type_name, x, y)
         self.maze = maze
+        self.rng = rng if rng is not None else random
         self.path = []
         self.path_index = 0
         self.speed = 1
-        self.last_move_time = 0.0
+        # CooperativePlanner shared with the other enemies, set by the World each round
+        self.planner = None
+
+    @property
+    def last_move_time(self):
+        return self.store.timers[self.slot]
+
+    @last_move_time.setter
+    def last_move_time(self, value):
+        self.store.timers[self.slot] = value
 
     def a_star_search(self, sx, sy, gx, gy):
-        frontier = []
-        heapq.heappush(frontier, (0, (sx, sy)))
-        came_from = {}
-        cost_so_far = {}
-        came_from[(sx, sy)] = None
-        cost_so_far[(sx, sy)] = 0
-
-        while frontier:
-            _, current = heapq.heappop(frontier)
-            cx, cy = current
-            if cx == gx and cy == gy:
-                break
-
-            for dx, dy in [(-1,0),(1,0),(0,-1),(0,1)]:
-                nx, ny = cx+dx, cy+dy
-                if 0 <= nx < self.maze.cols and 0 <= ny < self.maze.rows:
-                    if self.maze.grid[ny][nx] == 1:
-                        continue
-                    new_cost = cost_so_far[current] + 1
-                    if (nx, ny) not in cost_so_far or new_cost < cost_so_far[(nx, ny)]:
-                        cost_so_far[(nx, ny)] = new_cost
-                        priority = new_cost + abs(gx - nx) + abs(gy - ny)
-                        heapq.heappush(frontier, (priority, (nx, ny)))
-                        came_from[(nx, ny)] = current
-
-        # reconstruct
-        path = []
-        current = (gx, gy)
-        while current != (sx, sy):
-            if current not in came_from:
-                return []
-            path.append(current)
-            current = came_from[current]
-        path.reverse()
-        return path
-
-    def update_path(self, px, py):
+        """
+        A* over the maze's junction graph: each corridor is a single weighted edge,
+        so only junctions and dead ends are expanded. Returns the cells after
+        (sx, sy) up to (gx, gy), or [] if the goal is unreachable.
+        """
+        cols = self.maze.cols
+        path, _ = junction_graph_for(self.maze).find_path(sy*cols + sx, gy*cols + gx)
+        if not path:
+            return []
+        return [(cell % cols, cell // cols) for cell in path]
+
+    def plan_path(self, gx, gy):
+        """
+        Path to (gx, gy): from the cooperative planner when there is one (it steers
+        clear of the other enemies), otherwise this enemy's own A*.
+        """
+        if self.planner is not None:
+            return self.planner.path_for(self, gx, gy)
+        return self.a_star_search(self.x, self.y, gx, gy)
+
+    def sees(self, px, py, sight_radius):
+        """
+        Whether the player at (px, py) is in view; always True without a sight_radius
+        (no darkness).
+        """
+        return sight_radius is None or visibility_for(self.maze).can_see(self.x, self.y, px, py, sight_radius)
+
+    def update_path(self, px, py, sight_radius=None):
+        # In darkness an enemy that can't see the player just wanders
+        if not self.sees(px, py, sight_radius):
+            self.path = []
+            self.random_move()
         # 50% BFS, 50% random
-        if random.random() < 0.5:
-            self.path = self.a_star_search(self.x, self.y, px, py)
+        elif self.rng.random() < 0.5:
+            self.path = self.plan_path(px, py)
             self.path_index = 0
         else:
             self.path = []
@@ -68,12 +78,12 @@ class Enemy:
 
     def random_move(self):
         directions = [(-1,0),(1,0),(0,-1),(0,1)]
-        random.shuffle(directions)
+        self.rng.shuffle(directions)
         for dx, dy in directions:
             nx = self.x + dx
             ny = self.y + dy
             if 0<=nx<self.maze.cols and 0<=ny<self.maze.rows:
-                if self.maze.grid[ny][nx] == 0:
+                if self.maze.grid[ny, nx] == 0:
                     self.x = nx
                     self.y = ny
                     break
@@ -85,13 +95,24 @@ class Enemy:
             self.y = ny
             self.path_index += 1
 
+    def get_state(self):
+        """
+        Returns the mutable state as a tuple, for snapshots.
+        The path list is shared, not copied: it is only ever replaced, never edited.
+        """
+        return (self.x, self.y, self.path, self.path_index, self.last_move_time)
+
+    def set_state(self, state):
+        self.x, self.y, self.path, self.path_index, self.last_move_time = state
+
     def render(self, scale_x, scale_y, maze_cols, maze_rows, radius=8):
+        from OpenGL.GL import glColor3f, glBegin, glEnd, glVertex2f, GL_POINTS
         # center in OpenGL
         gl_cx = (self.x - maze_cols/2)*scale_x
         gl_cy = (maze_rows/2 - self.y)*scale_y
 
         # main circle
-        body_pts = midpoint_circle(0, 0, radius)
+        body_pts = shape("circle", radius)
         glColor3f(1.0, 0.0, 0.0)  # Red
         glBegin(GL_POINTS)
         for px, py in body_pts:
@@ -99,22 +120,14 @@ class Enemy:
         glEnd()
 
         # spikes
-        import math
-        spike_angles = [i*45 for i in range(8)]
         glColor3f(1.0, 1.0, 0.0)  # Yellow
         glBegin(GL_POINTS)
-        for angle_deg in spike_angles:
-            rad = math.radians(angle_deg)
-            ex = int(radius*math.cos(rad))
-            ey = int(radius*math.sin(rad))
-            # We'll do a small line from (0,0) to (ex,ey). Let's just do a circle for thickness
-            spike_pts = self.line_with_thickness(0,0,ex,ey,1)
-            for sx, sy in spike_pts:
-                glVertex2f(gl_cx + sx*scale_x/10, gl_cy + sy*scale_y/10)
+        for sx, sy in shape("spikes", radius):
+            glVertex2f(gl_cx + sx*scale_x/10, gl_cy + sy*scale_y/10)
         glEnd()
 
         # smaller circle = "eye"
-        eye_pts = midpoint_circle(0,0,radius//3)
+        eye_pts = shape("circle", radius//3)
         glColor3f(0.0, 0.0, 0.0)
         glBegin(GL_POINTS)
         for px, py in eye_pts:
@@ -123,13 +136,10 @@ class Enemy:
 
     def line_with_thickness(self, x0, y0, x1, y1, thickness=1):
         """
-        For spike, we want a small circle around each line point for thickness, or simpler approach.
-        But let's just do midpoint_line and then midpoint_circle for each point (thickness=1).
+        Points of a thick line: the midpoint line from (x0, y0) to (x1, y1), with a
+        circle of radius thickness around each of its points. Both steps are single
+        batch calls (midpoint_lines, midpoint_circles), not a loop over points.
         """
-        from modules.utils import midpoint_line, midpoint_circle
-        line_pts = midpoint_line(x0,y0,x1,y1)
-        thick_pts = []
-        for (lx, ly) in line_pts:
-            circ = midpoint_circle(lx, ly, thickness)
-            thick_pts.extend(circ)
-        return thick_pts
+        from modules.utils import midpoint_lines, midpoint_circles
+        line_pts = midpoint_lines([(x0, y0, x1, y1)])
+        return [tuple(p) for p in midpoint_circles(line_pts, thickness).tolist()]
@@ -0,0 +1,251 @@
+# modules/env.py
+
+import argparse
+import multiprocessing as mp
+import random
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from modules.world import World
+from modules.entity_store import KIND_ENEMY, KIND_GEM, KIND_POWERUP, FLAG_COLLECTED
+
+# Discrete actions: index -> (dx, dy), or None for the invisibility key
+ACTIONS = [(0, 0), (0, -1), (0, 1), (-1, 0), (1, 0), None]
+ACTION_NAMES = ["stay", "up", "down", "left", "right", "invisible"]
+
+# Observation channels
+WALLS, PLAYER, ENEMIES, GEMS, POWERUPS, EXIT = range(6)
+NUM_CHANNELS = 6
+KIND_CHANNELS = np.zeros(max(KIND_ENEMY, KIND_GEM, KIND_POWERUP) + 1, dtype=np.intp)
+KIND_CHANNELS[[KIND_ENEMY, KIND_GEM, KIND_POWERUP]] = [ENEMIES, GEMS, POWERUPS]
+
+# Rewards, in units of one gem
+GEM_REWARD = 1.0
+LEVEL_REWARD = 10.0
+DEATH_PENALTY = -10.0
+STEP_PENALTY = -0.01
+
+
+class MazeEnv:
+    """
+    Gym-style wrapper around World. One episode is one level: it ends when the
+    player reaches the exit, dies or runs out of time. Each step is one player
+    action followed by seconds_per_step of simulated time.
+    Observations are uint8 arrays of shape (NUM_CHANNELS, rows, cols) with 1
+    where a channel's thing is present.
+    """
+
+    def __init__(self, rows=21, cols=21, seconds_per_step=0.25, seed=None):
+        self.world = World(rows, cols, seed=seed, history_size=0, verbose=False)
+        self.seconds_per_step = seconds_per_step
+        self.seed_rng = random.Random(seed)
+        self.observation_shape = (NUM_CHANNELS, self.world.maze.rows, self.world.maze.cols)
+        self.num_actions = len(ACTIONS)
+        self.done = False
+
+    def reset(self, seed=None, out=None):
+        """
+        Starts a fresh level 1 from seed (a new random seed if None) and returns
+        the first observation.
+        """
+        if seed is None:
+            seed = self.seed_rng.getrandbits(32)
+        world = self.world
+        world.score = 0
+        world.current_level = 1
+        world.start_level(seed)
+        world.drain_events()
+        self.done = False
+        return self.observe(out)
+
+    def step(self, action, out=None):
+        """
+        Applies one action and advances time. Returns (observation, reward, done, info).
+        If out is given the observation is written into it instead of a new array.
+        """
+        if self.done:
+            raise RuntimeError("step() called on a finished episode; call reset()")
+        world = self.world
+        score = world.score
+        level = world.current_level
+        move = ACTIONS[action]
+        if move is None:
+            world.activate_invisibility(3)
+        elif move != (0, 0):
+            world.move_player(*move)
+        # Reaching the exit already set up the next level; don't run its clock
+        if world.current_level == level:
+            world.update(self.seconds_per_step)
+
+        reward = STEP_PENALTY + GEM_REWARD * (world.score - score) / 10
+        info = {}
+        for event in world.drain_events():
+            if event[0] == "level_complete":
+                reward += LEVEL_REWARD
+                self.done = True
+                info["outcome"] = "exit"
+            elif event[0] == "game_over":
+                reward += DEATH_PENALTY
+                self.done = True
+                info["outcome"] = event[1]
+        return self.observe(out), reward, self.done, info
+
+    def observe(self, out=None):
+        if out is None:
+            out = np.empty(self.observation_shape, dtype=np.uint8)
+        world = self.world
+        out.fill(0)
+        out[WALLS] = world.maze.grid
+        out[PLAYER, world.player.y, world.player.x] = 1
+        out[EXIT, world.exit_y, world.exit_x] = 1
+        # All entities in one scatter: channel from kind, skipping collected pickups
+        store = world.entities
+        live = (store.view(store.flags, np.uint8) & FLAG_COLLECTED) == 0
+        out[KIND_CHANNELS[store.view(store.kinds, np.uint8)[live]],
+            store.view(store.ys, np.int32)[live],
+            store.view(store.xs, np.int32)[live]] = 1
+        return out
+
+
+# -------------- VECTORIZED RUNNER --------------
+
+class SharedBuffers:
+    """
+    Observation, action, reward and done arrays for K environments, laid out in
+    one shared-memory block so workers write results where the trainer reads them.
+    """
+
+    def __init__(self, k, obs_shape, name=None):
+        self.shapes = [("obs", (k, *obs_shape), np.uint8),
+                       ("actions", (k,), np.int32),
+                       ("rewards", (k,), np.float32),
+                       ("dones", (k,), np.uint8)]
+        size = sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in self.shapes)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        offset = 0
+        for field, shape, dtype in self.shapes:
+            array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            setattr(self, field, array)
+            offset += array.nbytes
+
+    def close(self, unlink=False):
+        # Views must go before the mapping can be closed
+        for field, _, _ in self.shapes:
+            setattr(self, field, None)
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def worker(conn, shm_name, k, indices, rows, cols, seconds_per_step, seed):
+    envs = {i: MazeEnv(rows, cols, seconds_per_step, seed=None if seed is None else seed + i)
+            for i in indices}
+    buffers = SharedBuffers(k, next(iter(envs.values())).observation_shape, shm_name)
+    try:
+        while True:
+            command = conn.recv()
+            if command == "step":
+                for i, env in envs.items():
+                    _, reward, done, _ = env.step(int(buffers.actions[i]), out=buffers.obs[i])
+                    buffers.rewards[i] = reward
+                    buffers.dones[i] = done
+                    if done:
+                        # Auto-reset: the next observation starts the next episode
+                        env.reset(out=buffers.obs[i])
+            elif command == "reset":
+                for i, env in envs.items():
+                    env.reset(out=buffers.obs[i])
+                    buffers.rewards[i] = 0.0
+                    buffers.dones[i] = 0
+            elif command == "close":
+                break
+            conn.send(None)
+    finally:
+        buffers.close()
+        conn.close()
+
+
+class VectorEnv:
+    """
+    Steps K MazeEnvs split across worker processes. Only a one-word command goes
+    through each pipe per step; actions, observations, rewards and dones all live
+    in a SharedBuffers block, so obs is a (K, C, rows, cols) array updated in place.
+    Finished environments reset automatically.
+    """
+
+    def __init__(self, k, workers=None, rows=21, cols=21, seconds_per_step=0.25, seed=None):
+        workers = min(k, workers or mp.cpu_count())
+        probe = MazeEnv(rows, cols, seconds_per_step)
+        self.k = k
+        self.num_actions = probe.num_actions
+        self.buffers = SharedBuffers(k, probe.observation_shape)
+        self.conns = []
+        self.processes = []
+        for w in range(workers):
+            parent, child = mp.Pipe()
+            process = mp.Process(target=worker, daemon=True,
+                                 args=(child, self.buffers.shm.name, k, range(w, k, workers),
+                                       rows, cols, seconds_per_step, seed))
+            process.start()
+            child.close()
+            self.conns.append(parent)
+            self.processes.append(process)
+
+    def broadcast(self, command):
+        for conn in self.conns:
+            conn.send(command)
+        for conn in self.conns:
+            conn.recv()
+
+    def reset(self):
+        self.broadcast("reset")
+        return self.buffers.obs
+
+    def step(self, actions):
+        """
+        Returns (obs, rewards, dones); the arrays are the shared buffers themselves
+        and are overwritten by the next step.
+        """
+        self.buffers.actions[:] = actions
+        self.broadcast("step")
+        return self.buffers.obs, self.buffers.rewards, self.buffers.dones
+
+    def close(self):
+        for conn in self.conns:
+            conn.send("close")
+        for process in self.processes:
+            process.join()
+        self.buffers.close(unlink=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark env-steps per second.")
+    parser.add_argument("--envs", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--steps", type=int, default=500, help="vector steps to run")
+    parser.add_argument("--rows", type=int, default=21)
+    parser.add_argument("--cols", type=int, default=21)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    envs = VectorEnv(args.envs, args.workers, args.rows, args.cols, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    envs.reset()
+    episodes = 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        _, _, dones = envs.step(rng.integers(0, envs.num_actions, size=args.envs))
+        episodes += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    envs.close()
+    print(f"{args.envs} envs x {args.steps} steps in {elapsed:.2f}s: "
+          f"{args.envs * args.steps / elapsed:.0f} env-steps/s, {episodes} episodes")
+
+
+if __name__ == "__main__":
+    main()
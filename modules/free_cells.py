@@ -0,0 +1,143 @@
+# modules/free_cells.py
+
+import random
+from array import array
+import numpy as np
+
+
+class FreeCellIndex:
+    """
+    Index of the open (path) cells of a maze that are still free to spawn on.
+    cells[:count] holds the flat indices (y*cols + x) of free cells in no particular
+    order and pos[cell] is where each one sits, so sampling, taking and releasing
+    a cell are all O(1) (taking swaps the cell past the end of the free region).
+    """
+
+    def __init__(self, maze, rng=None):
+        self.cols = maze.cols
+        self.rows = maze.rows
+        self.rng = rng if rng is not None else random
+        interior = np.zeros(maze.grid.shape, dtype=bool)
+        interior[1:-1, 1:-1] = maze.grid[1:-1, 1:-1] == 0
+        open_cells = np.flatnonzero(interior).astype(np.int32)
+        pos = np.full(maze.rows * maze.cols, -1, dtype=np.int32)
+        pos[open_cells] = np.arange(len(open_cells), dtype=np.int32)
+        self.cells = array('i', open_cells.tobytes())
+        self.pos = array('i', pos.tobytes())
+        self.count = len(self.cells)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, xy):
+        x, y = xy
+        p = self.pos[y*self.cols + x]
+        return 0 <= p < self.count
+
+    def to_xy(self, cell):
+        return (cell % self.cols, cell // self.cols)
+
+    def _swap(self, i, j):
+        a, b = self.cells[i], self.cells[j]
+        self.cells[i], self.cells[j] = b, a
+        self.pos[a], self.pos[b] = j, i
+
+    # -------------- SAMPLING --------------
+
+    def sample(self):
+        """
+        Returns a uniformly random free cell as (x, y), leaving it free.
+        """
+        if self.count == 0:
+            raise IndexError("no free cells left")
+        return self.to_xy(self.cells[self.rng.randrange(self.count)])
+
+    def take(self):
+        """
+        Returns a uniformly random free cell as (x, y) and marks it occupied
+        (sampling without replacement).
+        """
+        if self.count == 0:
+            raise IndexError("no free cells left")
+        i = self.rng.randrange(self.count)
+        self.count -= 1
+        self._swap(i, self.count)
+        return self.to_xy(self.cells[self.count])
+
+    def take_where(self, accept, tries=16):
+        """
+        Takes a random free cell for which accept(cell) is true, or returns None.
+        A few random probes are tried first; if they all miss, the free cells are
+        filtered once, so the cost is bounded by the number of free cells.
+        """
+        if self.count == 0:
+            return None
+        for _ in range(tries):
+            cell = self.cells[self.rng.randrange(self.count)]
+            if accept(cell):
+                self.occupy(*self.to_xy(cell))
+                return self.to_xy(cell)
+        candidates = [cell for cell in self.cells[:self.count] if accept(cell)]
+        if not candidates:
+            return None
+        cell = self.rng.choice(candidates)
+        self.occupy(*self.to_xy(cell))
+        return self.to_xy(cell)
+
+    def take_in_band(self, dist, lo, hi=None):
+        """
+        Takes a free cell whose distance lies in [lo, hi], where dist is a per-cell
+        distance array (e.g. pathfinding.distance_field). Returns None if there is none.
+        """
+        return self.take_where(lambda cell: dist[cell] >= lo and (hi is None or dist[cell] <= hi))
+
+    def take_far_from(self, points, min_dist):
+        """
+        Takes a free cell at Manhattan distance >= min_dist from every (x, y) in points.
+        Returns None if there is none.
+        """
+        cols = self.cols
+        points = list(points)
+
+        def far(cell):
+            cx, cy = cell % cols, cell // cols
+            return all(abs(px - cx) + abs(py - cy) >= min_dist for px, py in points)
+        return self.take_where(far)
+
+    # -------------- UPDATES --------------
+
+    def occupy(self, x, y):
+        """
+        Marks a free cell as occupied. Cells that are walls or already occupied are ignored.
+        """
+        p = self.pos[y*self.cols + x]
+        if 0 <= p < self.count:
+            self.count -= 1
+            self._swap(p, self.count)
+
+    def release(self, x, y):
+        """
+        Marks an occupied open cell as free again.
+        """
+        p = self.pos[y*self.cols + x]
+        if p >= self.count:
+            self._swap(p, self.count)
+            self.count += 1
+
+    def set_open(self, x, y, is_open):
+        """
+        Keeps the index in step when a maze cell turns into a path (is_open) or a wall.
+        New path cells start out free.
+        """
+        cell = y*self.cols + x
+        p = self.pos[cell]
+        if is_open and p < 0:
+            self.cells.append(cell)
+            self.pos[cell] = len(self.cells) - 1
+            self.release(x, y)
+        elif not is_open and p >= 0:
+            self.occupy(x, y)
+            last = len(self.cells) - 1
+            self._swap(self.pos[cell], last)
+            self.cells.pop()
+            self.pos[cell] = -1
@@ -0,0 +1,207 @@
+# modules/input_queue.py
+
+import argparse
+import random
+import threading
+import time
+from collections import deque, namedtuple
+
+# Gameplay actions fed through the queue, and what each does to a World
+MOVES = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0)}
+TOGGLES = ("invisible",)
+
+InputEvent = namedtuple("InputEvent", ["action", "pressed", "time"])
+# Queued by clear(): drain() drops everything before it, on the draining thread
+CLEAR = InputEvent(None, False, 0.0)
+
+
+def apply_input(world, action):
+    if action in MOVES:
+        world.move_player(*MOVES[action])
+    elif action == "invisible":
+        world.activate_invisibility(3)
+
+
+class InputQueue:
+    """
+    Timestamped key events from the window thread, turned into gameplay actions
+    once per sim tick by drain().
+    - Presses become one action each, stamped with the time of the key event.
+    - A held move key repeats after repeat_delay at repeat_rate per second;
+      only the most recently pressed held key repeats, as on a keyboard.
+    - Coalescing: a toggle pressed several times in one tick acts once, and
+      at most max_moves moves go through per tick (the newest ones), so a
+      stall never turns into a burst of queued moves.
+    """
+
+    def __init__(self, repeat_delay=0.3, repeat_rate=8.0, max_moves=2):
+        self.repeat_delay = repeat_delay
+        self.repeat_interval = 1.0 / repeat_rate if repeat_rate else None
+        self.max_moves = max_moves
+        # append/popleft on a deque are thread-safe, so push needs no lock
+        self.events = deque()
+        self.held = {}
+        self.repeat_key = None
+        self.next_repeat = 0.0
+        self.dropped = 0
+
+    def push(self, action, pressed, t=None):
+        """
+        Records a key going down (pressed) or up. Call from the input callback.
+        """
+        self.events.append(InputEvent(action, pressed, time.perf_counter() if t is None else t))
+
+    def clear(self):
+        """
+        Forgets queued events and held keys (e.g. on pause). Safe to call from the
+        input thread: held/repeat state belongs to drain(), so this only queues a
+        marker and drain() does the reset when it reaches it.
+        """
+        self.events.append(CLEAR)
+
+    def drain(self, now=None):
+        """
+        Actions to apply this tick, as (action, origin time) in order.
+        """
+        now = time.perf_counter() if now is None else now
+        out = []
+        while self.events:
+            event = self.events.popleft()
+            if event is CLEAR:
+                out.clear()
+                self.held.clear()
+                self.repeat_key = None
+                continue
+            action, pressed, t = event
+            if not pressed:
+                self.held.pop(action, None)
+                if action == self.repeat_key:
+                    # Fall back to another key still held, if any
+                    self.repeat_key = max(self.held, key=self.held.get, default=None)
+                    self.next_repeat = t + (self.repeat_interval or 0.0)
+                continue
+            out.append((action, t))
+            if action in MOVES:
+                self.held[action] = t
+                self.repeat_key = action
+                self.next_repeat = t + self.repeat_delay
+
+        if self.repeat_key is not None and self.repeat_interval and self.next_repeat <= now:
+            out.append((self.repeat_key, self.next_repeat))
+            # One repeat per tick at most: after a stall, resync instead of catching up
+            self.next_repeat = max(self.next_repeat + self.repeat_interval, now)
+
+        return self.coalesce(out)
+
+    def coalesce(self, actions):
+        seen = set()
+        kept = []
+        moves = sum(1 for action, _ in actions if action in MOVES)
+        skip_moves = max(0, moves - self.max_moves)
+        for action, t in actions:
+            if action in MOVES:
+                if skip_moves:
+                    skip_moves -= 1
+                    self.dropped += 1
+                    continue
+            elif action in seen:
+                self.dropped += 1
+                continue
+            seen.add(action)
+            kept.append((action, t))
+        return kept
+
+
+class LatencyTracker:
+    """
+    Input-to-present latency. The sim thread calls applied() for every action it
+    applies and publishes applied_count with each frame; the render thread calls
+    presented() with that count right after the frame is on screen, which closes
+    every action the frame includes.
+    """
+
+    def __init__(self, window=2000):
+        self.pending = deque()
+        self.samples = deque(maxlen=window)
+        self.applied_count = 0
+
+    def applied(self, origin):
+        self.applied_count += 1
+        self.pending.append((self.applied_count, origin))
+
+    def presented(self, applied_count, now=None):
+        now = time.perf_counter() if now is None else now
+        while self.pending and self.pending[0][0] <= applied_count:
+            _, origin = self.pending.popleft()
+            self.samples.append(now - origin)
+
+    def percentiles(self, *ps):
+        """
+        Latency percentiles in seconds over the recent window, or None without samples.
+        """
+        samples = sorted(self.samples)
+        if not samples:
+            return None
+        return tuple(samples[min(len(samples) - 1, int(p / 100 * len(samples)))] for p in ps)
+
+    def summary(self):
+        result = self.percentiles(50, 99)
+        if result is None:
+            return "no input latency samples"
+        p50, p99 = result
+        return f"input latency p50 {p50*1000:.1f} ms, p99 {p99*1000:.1f} ms ({len(self.samples)} samples)"
+
+
+def main(argv=None):
+    from modules.world import World
+    from modules.sim_thread import SimThread
+    from modules.raster import Framebuffer, render_world
+    parser = argparse.ArgumentParser(description="Measure input-to-present latency under load.")
+    parser.add_argument("--tick-rate", type=int, default=60)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--frame-ms", type=float, default=0.0,
+                        help="extra render work per frame, to simulate a slow renderer")
+    parser.add_argument("--size", type=int, default=21)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    world = World(args.size, args.size, seed=args.seed, verbose=False)
+    inputs = InputQueue()
+    latency = LatencyTracker()
+    sim = SimThread(world, args.tick_rate, on_events=lambda events: None, inputs=inputs, latency=latency)
+    sim.active = True
+    sim.start()
+
+    # A "keyboard" thread taps and holds keys at random moments
+    stop = threading.Event()
+
+    def keyboard():
+        rng = random.Random(args.seed)
+        while not stop.is_set():
+            action = rng.choice(list(MOVES))
+            inputs.push(action, True)
+            time.sleep(rng.choice([0.02, 0.05, 0.6]))
+            inputs.push(action, False)
+            time.sleep(rng.uniform(0.02, 0.1))
+    thread = threading.Thread(target=keyboard, daemon=True)
+    thread.start()
+
+    fb = Framebuffer(800, 600)
+    scale_x, scale_y = 800 / args.size, 540 / args.size
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        frame_start = time.perf_counter()
+        render_world(fb, sim.view(), scale_x, scale_y)
+        while time.perf_counter() - frame_start < args.frame_ms / 1000:
+            pass
+        latency.presented(sim.view_frame.inputs)
+        sim.dispatch()
+        time.sleep(max(0.0, 1 / args.fps - (time.perf_counter() - frame_start)))
+    stop.set()
+    sim.close()
+    print(latency.summary() + f", {inputs.dropped} coalesced away")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+# modules/junction_graph.py
+
+import argparse
+import heapq
+import random
+import time
+import weakref
+from array import array
+from collections import deque
+
+import numpy as np
+
+from modules.maze_passes import open_neighbour_counts
+from modules.pathfinding import flatten_grid
+
+
+class JunctionGraph:
+    """
+    Abstraction of a maze where every corridor (a run of degree-2 cells) collapses
+    into one weighted edge between its end nodes (junctions and dead ends).
+    Each corridor cell knows its corridor and its offset along it, so a search
+    only has to visit nodes and can rebuild the cell path afterwards.
+    """
+
+    def __init__(self, maze):
+        self.cols = maze.cols
+        self.rows = maze.rows
+        size = maze.rows * maze.cols
+        walls = flatten_grid(maze)
+        self.walls = walls
+
+        degree = open_neighbour_counts(maze.grid).reshape(-1)
+        open_cells = np.frombuffer(bytes(walls), dtype=np.uint8) == 0
+        node_cells = np.flatnonzero(open_cells & (degree != 2))
+
+        self.node_of = array('i', [-1]) * size
+        self.node_cells = array('i')
+        # adj[n]: list of (neighbour node, cost, corridor id or -1, forward)
+        self.adj = []
+        for cell in node_cells.tolist():
+            self.add_node(cell)
+        self.corridor_of = array('i', [-1]) * size
+        self.offset = array('i', [0]) * size
+        # Corridor c runs from node corridor_ends[c][0] to [1] through corridor_cells[c]
+        self.corridor_cells = []
+        self.corridor_ends = []
+
+        n = 0
+        while n < len(self.node_cells):
+            self.walk_corridors(n)
+            n += 1
+
+        # Loops made only of corridor cells have no node yet: promote one cell per loop
+        for cell in np.flatnonzero(open_cells & (degree == 2)).tolist():
+            if self.corridor_of[cell] < 0 and self.node_of[cell] < 0:
+                self.walk_corridors(self.add_node(cell))
+
+    def add_node(self, cell):
+        self.node_of[cell] = len(self.node_cells)
+        self.node_cells.append(cell)
+        self.adj.append([])
+        return len(self.node_cells) - 1
+
+    def open_neighbours(self, cell):
+        cols = self.cols
+        cx = cell % cols
+        for n in (cell - 1 if cx > 0 else -1, cell + 1 if cx < cols - 1 else -1,
+                  cell - cols, cell + cols):
+            if 0 <= n < len(self.walls) and not self.walls[n]:
+                yield n
+
+    def walk_corridors(self, node):
+        start = self.node_cells[node]
+        for first in self.open_neighbours(start):
+            other = self.node_of[first]
+            if other >= 0:
+                # Two nodes side by side: a corridor of length 1 with no cells
+                if node < other:
+                    self.adj[node].append((other, 1, -1, True))
+                    self.adj[other].append((node, 1, -1, True))
+                continue
+            if self.corridor_of[first] >= 0:
+                continue
+
+            corridor = len(self.corridor_cells)
+            cells = array('i')
+            prev, cur = start, first
+            while self.node_of[cur] < 0:
+                self.corridor_of[cur] = corridor
+                self.offset[cur] = len(cells)
+                cells.append(cur)
+                nxt = [n for n in self.open_neighbours(cur) if n != prev]
+                prev, cur = cur, nxt[0]
+            end = self.node_of[cur]
+            self.corridor_cells.append(cells)
+            self.corridor_ends.append((node, end))
+            cost = len(cells) + 1
+            self.adj[node].append((end, cost, corridor, True))
+            self.adj[end].append((node, cost, corridor, False))
+
+    @property
+    def node_count(self):
+        return len(self.node_cells)
+
+    # -------------- QUERIES --------------
+
+    def attachments(self, cell):
+        """
+        How a cell connects to the node graph: list of (node, cost, cells walked
+        from the cell to the node, excluding the cell itself, including the node).
+        """
+        node = self.node_of[cell]
+        if node >= 0:
+            return [(node, 0, [])]
+        c = self.corridor_of[cell]
+        k = self.offset[cell]
+        cells = self.corridor_cells[c]
+        a, b = self.corridor_ends[c]
+        to_a = list(reversed(cells[:k])) + [self.node_cells[a]]
+        to_b = list(cells[k + 1:]) + [self.node_cells[b]]
+        return [(a, k + 1, to_a), (b, len(cells) - k, to_b)]
+
+    def edge_cells(self, corridor, forward, target):
+        if corridor < 0:
+            return [self.node_cells[target]]
+        cells = self.corridor_cells[corridor]
+        return (list(cells) if forward else list(reversed(cells))) + [self.node_cells[target]]
+
+    def find_path(self, start, goal):
+        """
+        Shortest path between two flat cell indices.
+        Returns (list of flat cells after start up to goal, or None; nodes expanded).
+        """
+        if start == goal:
+            return [], 0
+        if self.walls[start] or self.walls[goal]:
+            return None, 0
+        cols = self.cols
+        gx, gy = goal % cols, goal // cols
+
+        best_cost = float("inf")
+        best = None
+        # Same corridor: walk straight along it (a route via the end nodes is found below)
+        c = self.corridor_of[start]
+        if c >= 0 and c == self.corridor_of[goal]:
+            ks, kg = self.offset[start], self.offset[goal]
+            cells = self.corridor_cells[c]
+            best_cost = abs(ks - kg)
+            best = list(cells[ks + 1:kg + 1]) if kg > ks else list(reversed(cells[kg:ks]))
+
+        goal_links = {}
+        for node, cost, cells in self.attachments(goal):
+            if node not in goal_links or cost < goal_links[node][0]:
+                goal_links[node] = (cost, cells)
+
+        def h(node):
+            # Manhattan distance never overestimates, and corridor costs are walk lengths
+            cell = self.node_cells[node]
+            return abs(gx - cell % cols) + abs(gy - cell // cols)
+
+        dist = {}
+        came_from = {}
+        frontier = []
+        for node, cost, cells in self.attachments(start):
+            if cost < dist.get(node, float("inf")):
+                dist[node] = cost
+                came_from[node] = (None, cells)
+                heapq.heappush(frontier, (cost + h(node), node))
+
+        expanded = 0
+        end_node = None
+        while frontier:
+            f, node = heapq.heappop(frontier)
+            if f >= best_cost:
+                break
+            d = dist[node]
+            if f > d + h(node):
+                # Stale entry, the node was reached more cheaply since
+                continue
+            expanded += 1
+            if node in goal_links:
+                total = d + goal_links[node][0]
+                if total < best_cost:
+                    best_cost, end_node, best = total, node, None
+            for other, cost, corridor, forward in self.adj[node]:
+                nd = d + cost
+                if nd < dist.get(other, float("inf")):
+                    dist[other] = nd
+                    came_from[other] = (node, (corridor, forward))
+                    heapq.heappush(frontier, (nd + h(other), other))
+
+        if best is not None or end_node is None:
+            return best, expanded
+
+        # Rebuild: start link, corridors between nodes, goal link
+        segments = []
+        node = end_node
+        while True:
+            prev, link = came_from[node]
+            if prev is None:
+                segments.append(link)
+                break
+            segments.append(self.edge_cells(link[0], link[1], node))
+            node = prev
+        path = []
+        for seg in reversed(segments):
+            path.extend(seg)
+        goal_cells = goal_links[end_node][1]
+        if goal_cells:
+            # Walk back from the node to the goal (the node itself is already on the path)
+            path.extend(list(reversed(goal_cells[:-1])) + [goal])
+        return path, expanded
+
+
+class HierarchicalPlanner:
+    """
+    HPA*-style planner for large mazes. The grid is cut into square clusters;
+    the open cells on either side of every cluster border crossing become abstract
+    nodes, linked by a cost-1 edge across the border and by in-cluster BFS
+    distances inside each cluster. Queries search the small abstract graph and
+    then refine each hop with a BFS confined to one cluster.
+    """
+
+    def __init__(self, maze, cluster_size=16):
+        self.cols = maze.cols
+        self.rows = maze.rows
+        self.k = cluster_size
+        self.walls = flatten_grid(maze)
+        self.clusters_x = (maze.cols + cluster_size - 1) // cluster_size
+        grid = maze.grid
+        k = cluster_size
+
+        # Border crossings between horizontally and vertically adjacent clusters
+        pairs = []
+        ys, xs = np.nonzero((grid[:, k - 1:-1:k] == 0) & (grid[:, k::k] == 0))
+        pairs += [(y*self.cols + x*k + k - 1, y*self.cols + x*k + k)
+                  for y, x in zip(ys.tolist(), xs.tolist())]
+        ys, xs = np.nonzero((grid[k - 1:-1:k, :] == 0) & (grid[k::k, :] == 0))
+        pairs += [((y*k + k - 1)*self.cols + x, (y*k + k)*self.cols + x)
+                  for y, x in zip(ys.tolist(), xs.tolist())]
+
+        self.node_of = {}
+        self.node_cells = []
+        self.adj = []
+        self.cluster_nodes = {}
+        for a, b in pairs:
+            na, nb = self.add_node(a), self.add_node(b)
+            self.adj[na].append((nb, 1))
+            self.adj[nb].append((na, 1))
+
+        for cluster, nodes in self.cluster_nodes.items():
+            for n in nodes:
+                dist = self.cluster_bfs(self.node_cells[n], cluster)[0]
+                for m in nodes:
+                    if m != n and self.node_cells[m] in dist:
+                        self.adj[n].append((m, dist[self.node_cells[m]]))
+
+    def add_node(self, cell):
+        node = self.node_of.get(cell)
+        if node is None:
+            node = len(self.node_cells)
+            self.node_of[cell] = node
+            self.node_cells.append(cell)
+            self.adj.append([])
+            self.cluster_nodes.setdefault(self.cluster_of(cell), []).append(node)
+        return node
+
+    @property
+    def node_count(self):
+        return len(self.node_cells)
+
+    def cluster_of(self, cell):
+        return (cell // self.cols // self.k) * self.clusters_x + (cell % self.cols) // self.k
+
+    def cluster_bfs(self, start, cluster, goal=None):
+        """
+        BFS from start that never leaves cluster. Returns (distances, came_from).
+        Stops early once goal is reached.
+        """
+        cols = self.cols
+        dist = {start: 0}
+        came_from = {start: -1}
+        frontier = deque([start])
+        while frontier:
+            cur = frontier.popleft()
+            if cur == goal:
+                break
+            cx = cur % cols
+            for n in (cur - 1 if cx > 0 else -1, cur + 1 if cx < cols - 1 else -1,
+                      cur - cols, cur + cols):
+                if (0 <= n < len(self.walls) and not self.walls[n] and n not in dist
+                        and self.cluster_of(n) == cluster):
+                    dist[n] = dist[cur] + 1
+                    came_from[n] = cur
+                    frontier.append(n)
+        return dist, came_from
+
+    def local_path(self, a, b):
+        """
+        Cells from a (exclusive) to b (inclusive) within a's cluster, or None.
+        """
+        if a == b:
+            return []
+        _, came_from = self.cluster_bfs(a, self.cluster_of(a), b)
+        if b not in came_from:
+            return None
+        path = []
+        while b != a:
+            path.append(b)
+            b = came_from[b]
+        path.reverse()
+        return path
+
+    def find_path(self, start, goal):
+        """
+        Near-shortest path between two flat cell indices.
+        Returns (list of flat cells after start up to goal, or None; abstract nodes expanded).
+        """
+        if start == goal:
+            return [], 0
+        if self.walls[start] or self.walls[goal]:
+            return None, 0
+        cols = self.cols
+        gx, gy = goal % cols, goal // cols
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+
+        if start_cluster == goal_cluster:
+            local = self.local_path(start, goal)
+            if local is not None:
+                return local, 0
+
+        # Temporary links from start / to goal into their clusters' abstract nodes
+        start_dist = self.cluster_bfs(start, start_cluster)[0]
+        goal_dist = self.cluster_bfs(goal, goal_cluster)[0]
+        goal_links = {n: goal_dist[self.node_cells[n]]
+                      for n in self.cluster_nodes.get(goal_cluster, [])
+                      if self.node_cells[n] in goal_dist}
+
+        dist = {}
+        came_from = {}
+        frontier = []
+        for n in self.cluster_nodes.get(start_cluster, []):
+            cell = self.node_cells[n]
+            if cell in start_dist:
+                dist[n] = start_dist[cell]
+                came_from[n] = None
+                h = abs(gx - cell % cols) + abs(gy - cell // cols)
+                heapq.heappush(frontier, (dist[n] + h, n))
+
+        expanded = 0
+        end_node = None
+        best = float("inf")
+        while frontier:
+            f, n = heapq.heappop(frontier)
+            if f >= best:
+                break
+            d = dist[n]
+            expanded += 1
+            if n in goal_links and d + goal_links[n] < best:
+                best, end_node = d + goal_links[n], n
+            for m, cost in self.adj[n]:
+                nd = d + cost
+                if nd < dist.get(m, float("inf")):
+                    dist[m] = nd
+                    came_from[m] = n
+                    cell = self.node_cells[m]
+                    heapq.heappush(frontier, (nd + abs(gx - cell % cols) + abs(gy - cell // cols), m))
+
+        if end_node is None:
+            return None, expanded
+
+        hops = [goal]
+        n = end_node
+        while n is not None:
+            hops.append(self.node_cells[n])
+            n = came_from[n]
+        hops.append(start)
+        hops.reverse()
+
+        path = []
+        for a, b in zip(hops, hops[1:]):
+            if self.cluster_of(a) == self.cluster_of(b):
+                path.extend(self.local_path(a, b))
+            else:
+                path.append(b)
+        return path, expanded
+
+
+# One cached graph per live maze object, rebuilt when its layout changes
+_graphs = weakref.WeakKeyDictionary()
+
+
+def junction_graph_for(maze):
+    """
+    Returns the JunctionGraph of maze's current layout, building it on first use.
+    """
+    key = maze.layout_key()
+    cached = _graphs.get(maze)
+    if cached is None or cached[0] != key:
+        cached = (key, JunctionGraph(maze))
+        _graphs[maze] = cached
+    return cached[1]
+
+
+def grid_astar(walls, cols, start, goal):
+    """
+    Plain cell-level A*, the baseline the abstractions are measured against.
+    Returns (path or None, nodes expanded).
+    """
+    gx, gy = goal % cols, goal // cols
+    cost = {start: 0}
+    came_from = {start: -1}
+    frontier = [(0, start)]
+    expanded = 0
+    while frontier:
+        _, cur = heapq.heappop(frontier)
+        expanded += 1
+        if cur == goal:
+            path = []
+            while cur != start:
+                path.append(cur)
+                cur = came_from[cur]
+            return path[::-1], expanded
+        cx = cur % cols
+        for n in (cur - 1 if cx > 0 else -1, cur + 1 if cx < cols - 1 else -1,
+                  cur - cols, cur + cols):
+            if n < 0 or n >= len(walls) or walls[n]:
+                continue
+            nc = cost[cur] + 1
+            if nc < cost.get(n, float("inf")):
+                cost[n] = nc
+                came_from[n] = cur
+                heapq.heappush(frontier, (nc + abs(gx - n % cols) + abs(gy - n // cols), n))
+    return None, expanded
+
+
+def benchmark(maze, queries=20, seed=0):
+    """
+    Compares grid A*, the junction graph and the hierarchical planner on random
+    long-range queries. Returns {name: (mean nodes expanded, mean ms, mean path length)}.
+    """
+    rng = random.Random(seed)
+    walls = flatten_grid(maze)
+    open_cells = np.flatnonzero(maze.grid.reshape(-1) == 0).tolist()
+    pairs = [(rng.choice(open_cells), rng.choice(open_cells)) for _ in range(queries)]
+
+    build = {}
+    t = time.perf_counter()
+    graph = JunctionGraph(maze)
+    build["junction"] = time.perf_counter() - t
+    t = time.perf_counter()
+    hpa = HierarchicalPlanner(maze)
+    build["hpa"] = time.perf_counter() - t
+
+    results = {}
+    for name, search in (("astar", lambda s, g: grid_astar(walls, maze.cols, s, g)),
+                         ("junction", graph.find_path),
+                         ("hpa", hpa.find_path)):
+        nodes = seconds = length = 0
+        for s, g in pairs:
+            t = time.perf_counter()
+            path, expanded = search(s, g)
+            seconds += time.perf_counter() - t
+            nodes += expanded
+            length += len(path) if path else 0
+        results[name] = (nodes / queries, seconds / queries * 1000, length / queries)
+    return results, build, (graph.node_count, hpa.node_count)
+
+
+def main(argv=None):
+    from modules.maze import Maze
+    parser = argparse.ArgumentParser(description="Benchmark maze path abstractions.")
+    parser.add_argument("--size", type=int, default=201, help="maze rows and columns (odd)")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    maze = Maze(args.size, args.size, seed=args.seed)
+    results, build, (junctions, abstract) = benchmark(maze, args.queries, args.seed)
+    print(f"{args.size}x{args.size} maze: {junctions} junction nodes "
+          f"(built in {build['junction']*1000:.0f} ms), {abstract} HPA nodes "
+          f"(built in {build['hpa']*1000:.0f} ms)")
+    for name, (nodes, ms, length) in results.items():
+        print(f"{name:>9}: {nodes:10.1f} nodes  {ms:9.3f} ms  path {length:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# modules/level_pack.py
+
+import argparse
+import io
+import os
+import random
+import struct
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from modules.world import World
+from modules.pathfinding import flatten_grid, distance_field
+from modules.solver import plan_gems
+from modules.maze_passes import open_neighbour_counts
+from modules.maze_file import dump_maze, read_maze, world_entities, ENCODINGS
+
+# File layout (little-endian):
+#   header   HEADER below
+#   records  count maze_file records (header, entity table, body), back to back
+#            in level order; offsets inside a record are relative to its start.
+#            Records are not page padded: a level is a few hundred bytes and is
+#            read whole, so padding would only multiply the pack size.
+#   index    at index_offset: count INDEX entries, level 1 first
+# Records are streamed as the workers finish them and the index goes last, so the
+# header is written twice: a placeholder first, the real one once the index is out.
+# Loading level n reads the header, one index entry and that record only.
+MAGIC = b"MZPK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIQQ")
+INDEX = struct.Struct("<QQQIiiiiiif")
+
+# Attempts (seed variants) per level before the build gives up on it
+MAX_ATTEMPTS = 32
+
+# Per-level metrics kept in the index. Distances are BFS steps; -1 = unreachable.
+LevelInfo = namedtuple("LevelInfo", [
+    "seed", "offset", "size", "attempts",
+    "exit_distance", "gem_tour_length", "dead_ends", "junctions",
+    "enemy_exit_distance", "enemy_spawn_distance", "difficulty",
+])
+
+PackHeader = namedtuple("PackHeader", ["version", "count", "rows", "cols", "pack_seed", "index_offset"])
+
+
+class LevelPackError(ValueError):
+    pass
+
+
+def level_seed(pack_seed, number, attempt=0):
+    """
+    Maze seed of level number (1-based) of a pack. Depends only on its arguments
+    (str seeds hash deterministically), so any worker rebuilds any level identically.
+    """
+    return random.Random(f"{pack_seed}:{number}:{attempt}").getrandbits(32)
+
+
+def level_metrics(world, seconds_per_move=0.25):
+    """
+    Difficulty metrics of a freshly set up level. difficulty is the fraction of the
+    time limit the shortest gem tour needs at seconds_per_move per step.
+    """
+    maze = world.maze
+    cols = maze.cols
+    walls = flatten_grid(maze)
+    from_spawn = distance_field(walls, cols, world.player.y*cols + world.player.x)
+    from_exit = distance_field(walls, cols, world.exit_y*cols + world.exit_x)
+    enemies = [en.y*cols + en.x for en in world.enemies]
+
+    open_cells = np.asarray(maze.grid) == 0
+    neighbours = open_neighbour_counts(maze.grid)
+
+    tour = plan_gems(world).length
+    return {
+        "exit_distance": from_spawn[world.exit_y*cols + world.exit_x],
+        "gem_tour_length": tour,
+        "dead_ends": int((open_cells & (neighbours == 1)).sum()),
+        "junctions": int((open_cells & (neighbours >= 3)).sum()),
+        "enemy_exit_distance": min((from_exit[e] for e in enemies), default=-1),
+        "enemy_spawn_distance": min((from_spawn[e] for e in enemies), default=-1),
+        "difficulty": tour * seconds_per_move / world.level_time if tour >= 0 else -1.0,
+    }
+
+
+def validate_level(world, metrics, min_enemy_exit=8, min_enemy_spawn=4):
+    """
+    Reasons the level is unfit for a pack ([] if it is fine): the exit or a
+    pickup can't be reached, an enemy starts too close to the exit or spawn,
+    or the gem tour doesn't fit in the time limit.
+    """
+    problems = []
+    maze = world.maze
+    cols = maze.cols
+    from_spawn = distance_field(flatten_grid(maze), cols, world.player.y*cols + world.player.x)
+    if metrics["exit_distance"] < 0:
+        problems.append("exit unreachable")
+    pickups = [(c.x, c.y) for c in world.collectibles] + [(p.x, p.y) for p in world.powerups]
+    if any(from_spawn[y*cols + x] < 0 for x, y in pickups):
+        problems.append("pickup unreachable")
+    if 0 <= metrics["enemy_exit_distance"] < min_enemy_exit:
+        problems.append(f"enemy {metrics['enemy_exit_distance']} from exit")
+    if 0 <= metrics["enemy_spawn_distance"] < min_enemy_spawn:
+        problems.append(f"enemy {metrics['enemy_spawn_distance']} from spawn")
+    if not 0 <= metrics["difficulty"] <= 1:
+        problems.append("gem tour exceeds time limit")
+    return problems
+
+
+def build_level(pack_seed, number, rows=21, cols=21, encoding="bits",
+                min_enemy_exit=8, min_enemy_spawn=4):
+    """
+    Generates level number of a pack, trying seed variants until one validates.
+    Returns (record bytes, LevelInfo without offset/size). Runs in a pool worker.
+    """
+    world = World(rows, cols, seed=level_seed(pack_seed, number), history_size=0, verbose=False)
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            world.start_level(level_seed(pack_seed, number, attempt))
+        metrics = level_metrics(world)
+        if not validate_level(world, metrics, min_enemy_exit, min_enemy_spawn):
+            break
+    else:
+        raise LevelPackError(f"level {number}: no valid layout in {MAX_ATTEMPTS} attempts")
+    record = io.BytesIO()
+    dump_maze(record, world.maze, (world.player.x, world.player.y),
+              (world.exit_x, world.exit_y), world_entities(world), encoding, align=1)
+    return record.getvalue(), LevelInfo(world.maze.seed, 0, 0, attempt + 1, **metrics)
+
+
+def build_pack(path, count, pack_seed=0, rows=21, cols=21, workers=None, encoding="bits",
+               min_enemy_exit=8, min_enemy_spawn=4):
+    """
+    Builds count levels in a process pool and streams them into a level pack at path.
+    Levels come back in order and are written as they arrive, so memory stays bounded
+    by the pool's backlog rather than the pack size. Returns the index.
+    """
+    workers = workers or os.cpu_count() or 1
+    index = []
+    with open(path, "wb") as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0, rows, cols, 0, 0))
+        numbers = range(1, count + 1)
+        results = pool.map(build_level, [pack_seed]*count, numbers, [rows]*count, [cols]*count,
+                           [encoding]*count, [min_enemy_exit]*count, [min_enemy_spawn]*count,
+                           chunksize=max(1, count // (workers*8)))
+        for record, info in results:
+            index.append(info._replace(offset=f.tell(), size=len(record)))
+            f.write(record)
+        index_offset = f.tell()
+        for info in index:
+            f.write(INDEX.pack(*info))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, count, rows, cols,
+                            pack_seed & 0xFFFFFFFFFFFFFFFF, index_offset))
+    return index
+
+
+class LevelPack:
+    """
+    Random access to the levels of a pack. Opening reads only the header;
+    level n costs one index entry read plus read_maze on its record.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            data = f.read(HEADER.size)
+        if len(data) < HEADER.size or data[:4] != MAGIC:
+            raise LevelPackError(f"{path}: not a level pack")
+        _, version, _, count, rows, cols, pack_seed, index_offset = HEADER.unpack(data)
+        if version > VERSION:
+            raise LevelPackError(f"{path}: format version {version} is newer than {VERSION}")
+        if count and not index_offset:
+            raise LevelPackError(f"{path}: incomplete pack (no index)")
+        self.header = PackHeader(version, count, rows, cols, pack_seed, index_offset)
+
+    def __len__(self):
+        return self.header.count
+
+    def info(self, number):
+        """
+        LevelInfo of level number (1-based).
+        """
+        if not 1 <= number <= self.header.count:
+            raise IndexError(f"level {number} not in pack of {self.header.count}")
+        with open(self.path, "rb") as f:
+            f.seek(self.header.index_offset + (number - 1)*INDEX.size)
+            return LevelInfo(*INDEX.unpack(f.read(INDEX.size)))
+
+    def load(self, number):
+        """
+        Level number (1-based) as a MazeLevel, ready for World.load_level.
+        """
+        return read_maze(self.path, self.info(number).offset)
+
+    def infos(self):
+        with open(self.path, "rb") as f:
+            f.seek(self.header.index_offset)
+            data = f.read(self.header.count * INDEX.size)
+        return [LevelInfo(*fields) for fields in INDEX.iter_unpack(data)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and inspect level packs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="generate a pack of validated levels")
+    build.add_argument("dst")
+    build.add_argument("--levels", type=int, default=100)
+    build.add_argument("--seed", type=int, default=0, help="pack seed; level seeds derive from it")
+    build.add_argument("--rows", type=int, default=21)
+    build.add_argument("--cols", type=int, default=21)
+    build.add_argument("--workers", type=int, default=None)
+    build.add_argument("--encoding", choices=sorted(ENCODINGS), default="bits")
+    build.add_argument("--min-enemy-exit", type=int, default=8)
+    build.add_argument("--min-enemy-spawn", type=int, default=4)
+    info = sub.add_parser("info", help="print a pack's header and per-level metrics")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        index = build_pack(args.dst, args.levels, args.seed, args.rows, args.cols, args.workers,
+                           args.encoding, args.min_enemy_exit, args.min_enemy_spawn)
+        retried = sum(1 for info in index if info.attempts > 1)
+        print(f"Built {len(index)} levels in {time.perf_counter() - start:.2f}s "
+              f"({retried} needed more than one seed) -> {args.dst}")
+    else:
+        pack = LevelPack(args.path)
+        for field, value in pack.header._asdict().items():
+            print(f"{field}: {value}")
+        print("level  seed        exit  tour  dead  junc  e-exit  e-spawn  difficulty")
+        for number, info in enumerate(pack.infos(), 1):
+            print(f"{number:5d}  {info.seed:10d}  {info.exit_distance:4d}  {info.gem_tour_length:4d}  "
+                  f"{info.dead_ends:4d}  {info.junctions:4d}  {info.enemy_exit_distance:6d}  "
+                  f"{info.enemy_spawn_distance:7d}  {info.difficulty:10.3f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
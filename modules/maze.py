@@ -1,62 +1,105 @@
 # modules/maze.py
 
 import random
-from OpenGL.GL import *
-from OpenGL.GLU import *
-from OpenGL.GLUT import *
-from modules.utils import midpoint_line
+import numpy as np
+from modules.utils import draw_points, draw_lines
+from modules.wall_geometry import WallGeometry
+from modules import maze_passes
+
+# Colour of walls explored earlier but out of view in darkness mode
+REMEMBERED_COLOR = (0.35, 0.35, 0.35)
 
 class Maze:
     """
     Represents the maze in the Pixel Adventure Maze game.
     Each cell in 'grid' is either 1 (wall) or 0 (path).
+    'grid' is a (rows, cols) uint8 NumPy array. Read single cells as grid[y, x]:
+    grid[y][x] still works but builds a row view first, roughly twice as slow.
     """
 
-    def __init__(self, rows, cols, extra_passages=2):
+    def __init__(self, rows, cols, extra_passages=2, seed=None):
         """
         :param rows: Number of rows in the maze
         :param cols: Number of columns in the maze
         :param extra_passages: How many extra passages to carve after DFS
+        :param seed: Seed for the layout; a random one is drawn if None
         """
         self.rows = rows
         self.cols = cols
-        self.grid = [[1 for _ in range(cols)] for _ in range(rows)]
+        self.grid = np.ones((rows, cols), dtype=np.uint8)
         self.scale_x = 0.0
         self.scale_y = 0.0
+        self.seed = None
+        self.extra_carved = 0
+        # Post-processing passes applied since generation, part of the layout key
+        self.passes = []
+        self.rng = random.Random()
+        # Set while snapshots hold a reference to self.grid (copy-on-write)
+        self.grid_shared = False
+        # Merged wall runs for rendering, built on first use
+        self.walls = None
 
         # Primary generation via DFS
-        self.generate_maze()
+        self.generate_maze(seed)
 
         # Carve additional paths for loops
         if extra_passages > 0:
             self.carve_extra_paths(extra_passages)
 
-    def generate_maze(self):
+    @classmethod
+    def from_grid(cls, grid, seed=None):
+        """
+        Wraps an existing (rows, cols) grid of 1/0 cells without generating anything.
+        The array is used as-is, not copied.
+        """
+        maze = cls.__new__(cls)
+        maze.grid = grid if isinstance(grid, np.ndarray) else np.asarray(grid, dtype=np.uint8)
+        maze.rows, maze.cols = maze.grid.shape
+        maze.scale_x = 0.0
+        maze.scale_y = 0.0
+        maze.seed = seed
+        maze.extra_carved = 0
+        maze.passes = []
+        maze.rng = random.Random(seed)
+        maze.grid_shared = False
+        maze.walls = None
+        return maze
+
+    def generate_maze(self, seed=None):
         """
         Generates the maze using a Depth-First Search (DFS) approach.
         Creates a single connected path from start (1,1) to end (cols-2, rows-2).
+        The same seed always yields the same layout.
         """
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.rng = random.Random(self.seed)
+        self.extra_carved = 0
+        self.passes = []
+
+        # Carve into a flat buffer; per-element access is much cheaper there than on the array
+        cols = self.cols
+        cells = bytearray(b"\x01") * (self.rows * cols)
         stack = []
         start_x, start_y = 1, 1
-        self.grid[start_y][start_x] = 0
+        cells[start_y*cols + start_x] = 0
         stack.append((start_x, start_y))
 
         while stack:
             current_x, current_y = stack[-1]
             directions = [(-2, 0), (2, 0), (0, -2), (0, 2)]
-            random.shuffle(directions)
+            self.rng.shuffle(directions)
             carved = False
 
             for dx, dy in directions:
                 nx = current_x + dx
                 ny = current_y + dy
-                if 1 <= nx < self.cols - 1 and 1 <= ny < self.rows - 1 and self.grid[ny][nx] == 1:
+                if 1 <= nx < self.cols - 1 and 1 <= ny < self.rows - 1 and cells[ny*cols + nx] == 1:
                     # Carve path
-                    self.grid[ny][nx] = 0
+                    cells[ny*cols + nx] = 0
                     # Carve the wall in-between
                     mid_x = current_x + dx // 2
                     mid_y = current_y + dy // 2
-                    self.grid[mid_y][mid_x] = 0
+                    cells[mid_y*cols + mid_x] = 0
 
                     stack.append((nx, ny))
                     carved = True
@@ -65,52 +108,117 @@ class Maze:
             if not carved:
                 stack.pop()
 
+        self.grid = np.frombuffer(cells, dtype=np.uint8).reshape(self.rows, cols)
+        self.grid_shared = False
+
+    def np_rng(self):
+        # NumPy generator drawn from the layout RNG, so passes stay reproducible per seed
+        return np.random.default_rng(self.rng.getrandbits(64))
+
     def carve_extra_paths(self, num_extra):
         """
-        Randomly carve out additional passages to create loops/alternative routes.
+        Carve out additional passages to create loops/alternative routes.
+        Every wall with two or more open neighbours is a candidate; exactly
+        num_extra of them are opened whenever that many exist.
+        """
+        self.own_grid()
+        carved = maze_passes.carve_loops(self.grid, num_extra, self.np_rng())
+        self.extra_carved += carved
+        self.passes.append(("loops", num_extra))
+        return carved
+
+    def remove_dead_ends(self, fraction=1.0):
+        """
+        Braids the maze by opening a wall at roughly `fraction` of its dead ends.
+        """
+        self.own_grid()
+        self.passes.append(("braid", fraction))
+        return maze_passes.remove_dead_ends(self.grid, fraction, self.np_rng())
+
+    def insert_rooms(self, count, min_size=3, max_size=7):
+        """
+        Clears `count` open rectangular rooms.
+        """
+        self.own_grid()
+        self.passes.append(("rooms", count, min_size, max_size))
+        return maze_passes.insert_rooms(self.grid, count, self.np_rng(), min_size, max_size)
+
+    def share_grid(self):
+        """
+        Returns the grid for a snapshot to keep. The grid is copied before
+        the next in-place change, so the returned rows never change under the caller.
         """
-        attempts = 0
-        max_attempts = 500
+        self.grid_shared = True
+        return self.grid
 
-        while num_extra > 0 and attempts < max_attempts:
-            attempts += 1
-            wx = random.randint(1, self.cols - 2)
-            wy = random.randint(1, self.rows - 2)
+    def own_grid(self):
+        """
+        Copies the grid if a snapshot shares it; call before mutating cells in place.
+        """
+        if self.grid_shared or not self.grid.flags.writeable:
+            self.grid = self.grid.copy()
+            self.grid_shared = False
 
-            if self.grid[wy][wx] == 1:
-                # Count open neighbors
-                open_neighbors = 0
-                for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                    nx = wx + dx
-                    ny = wy + dy
-                    if 0 <= nx < self.cols and 0 <= ny < self.rows:
-                        if self.grid[ny][nx] == 0:
-                            open_neighbors += 1
+    def adopt_grid(self, grid, seed, extra_carved, passes=()):
+        """
+        Switches to a grid previously returned by share_grid() (used when restoring
+        snapshots). The grid may be a different size than the current one.
+        """
+        self.grid = grid
+        self.rows, self.cols = grid.shape
+        self.grid_shared = True
+        self.seed = seed
+        self.extra_carved = extra_carved
+        self.passes = list(passes)
+
+    def set_cell(self, x, y, value):
+        """
+        Turns one cell into a wall (1) or path (0), keeping the layout key and
+        the wall geometry up to date.
+        """
+        current = self.walls is not None and self.walls.key == self.layout_key()
+        self.own_grid()
+        self.grid[y, x] = value
+        self.passes.append(("cell", x, y, value))
+        if current:
+            self.walls.update_cell(x, y, self.grid)
+            self.walls.key = self.layout_key()
+
+    def wall_geometry(self):
+        """
+        Returns the WallGeometry of the current grid, rebuilding it only when the
+        layout has changed since it was built.
+        """
+        key = self.layout_key()
+        if self.walls is None or self.walls.grid is not self.grid or self.walls.key != key:
+            self.walls = WallGeometry(self.grid, key)
+        return self.walls
 
-                if open_neighbors >= 2:
-                    self.grid[wy][wx] = 0
-                    num_extra -= 1
+    def layout_key(self):
+        """
+        Identifies the current wall layout: (rows, cols, seed, post-processing passes).
+        Two mazes with the same key have identical grids.
+        """
+        return (self.rows, self.cols, self.seed, tuple(self.passes))
 
-    def render(self, scale_x, scale_y, reserved_ui_height=60.0):
+    def render(self, scale_x, scale_y, reserved_ui_height=60.0, mode="points", fog=None):
         """
-        Renders the maze walls using only GL_POINTS + the Midpoint Line Algorithm.
+        Renders the maze walls from merged wall runs in one draw call.
+        mode "points" draws the same GL_POINTS as a midpoint line between every pair
+        of adjacent walls, each point once; mode "lines" draws each run as a GL_LINES segment.
+        With a FogOfWar only walls in view are drawn, plus explored ones dimmed (points only).
         """
+        from OpenGL.GL import glColor3f
+        if fog is not None:
+            lit, remembered = fog.wall_vertices(scale_x, scale_y)
+            glColor3f(*REMEMBERED_COLOR)
+            draw_points(remembered)
+            glColor3f(1.0, 1.0, 1.0)
+            draw_points(lit)
+            return
         glColor3f(1.0, 1.0, 1.0)
-        glBegin(GL_POINTS)
-
-        for row in range(self.rows):
-            for col in range(self.cols):
-                if self.grid[row][col] == 1:
-                    # Horizontal neighbor
-                    if col < self.cols - 1 and self.grid[row][col + 1] == 1:
-                        line_points = midpoint_line(col, row, col + 1, row)
-                        for px, py in line_points:
-                            glVertex2f((px - self.cols / 2) * scale_x,
-                                       (self.rows / 2 - py) * scale_y)
-                    # Vertical neighbor
-                    if row < self.rows - 1 and self.grid[row + 1][col] == 1:
-                        line_points = midpoint_line(col, row, col, row + 1)
-                        for px, py in line_points:
-                            glVertex2f((px - self.cols / 2) * scale_x,
-                                       (self.rows / 2 - py) * scale_y)
-        glEnd()
+        verts = self.wall_geometry().vertices(scale_x, scale_y, mode)
+        if mode == "lines":
+            draw_lines(verts)
+        else:
+            draw_points(verts)
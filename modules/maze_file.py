@@ -0,0 +1,336 @@
+# modules/maze_file.py
+
+import argparse
+import struct
+import sys
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+from modules.maze import Maze
+from modules.entity_store import KIND_ENEMY, KIND_GEM, KIND_POWERUP, FLAG_COLLECTED, TYPE_CODES
+
+# File layout (little-endian):
+#   header        HEADER below
+#   entity table  entity_count ENTITY records
+#   body          at body_offset (page aligned in a standalone file): the grid, one of
+#                   ENCODING_BYTES: rows*cols uint8, 1 = wall, 0 = path
+#                   ENCODING_BITS:  rows rows of ceil(cols/8) bytes, bits MSB first
+# A bytes body is mapped straight into Maze.grid; a bits body is an eighth of
+# the size on disk but has to be unpacked on load.
+MAGIC = b"MAZB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIQIiiiiIQQ")
+ENTITY = struct.Struct("<B3xii16s")
+PAGE = 4096
+
+ENCODING_BYTES = 0
+ENCODING_BITS = 1
+ENCODINGS = {"bytes": ENCODING_BYTES, "bits": ENCODING_BITS}
+
+FLAG_HAS_SEED = 1
+
+# Entity table record that adds a waypoint to the closest preceding patrol enemy
+KIND_WAYPOINT = 255
+
+# Text format: one character per cell
+TEXT_CELLS = {"#": 1, ".": 0}
+TEXT_ENTITIES = {"X": (KIND_ENEMY, "enemy"), "C": (KIND_ENEMY, "chaser"), "T": (KIND_ENEMY, "patrol"),
+                 "G": (KIND_GEM, "gem"), "S": (KIND_POWERUP, "speed"), "I": (KIND_POWERUP, "invincibility")}
+TEXT_SPAWN = "P"
+TEXT_EXIT = "E"
+
+# A loaded level: entities are (kind, type_name, x, y, waypoints) tuples
+MazeLevel = namedtuple("MazeLevel", ["maze", "spawn", "exit", "entities"])
+
+MazeHeader = namedtuple("MazeHeader", [
+    "version", "encoding", "rows", "cols", "seed",
+    "spawn", "exit", "entity_count", "body_offset", "body_size",
+])
+
+
+class MazeFileError(ValueError):
+    pass
+
+
+def body_size(rows, cols, encoding):
+    if encoding == ENCODING_BITS:
+        return rows * ((cols + 7) // 8)
+    return rows * cols
+
+
+def write_maze(path, maze, spawn=None, exit=None, entities=(), encoding="bytes"):
+    """
+    Writes maze (and optionally spawn/exit cells and (kind, type_name, x, y, waypoints)
+    entities) to path in the binary maze format.
+    """
+    with open(path, "wb") as f:
+        dump_maze(f, maze, spawn, exit, entities, encoding)
+
+
+def dump_maze(f, maze, spawn=None, exit=None, entities=(), encoding="bytes", align=PAGE):
+    """
+    Like write_maze, but into an open binary file at its current position.
+    Offsets inside the record are relative to where it starts, and the body is
+    padded to a multiple of align from there (1 = no padding).
+    """
+    encoding = ENCODINGS[encoding]
+    records = []
+    for kind, type_name, x, y, waypoints in entities:
+        records.append(ENTITY.pack(kind, x, y, type_name.encode()[:16]))
+        for wx, wy in waypoints or ():
+            records.append(ENTITY.pack(KIND_WAYPOINT, wx, wy, b""))
+    table = b"".join(records)
+    body_offset = -(-(HEADER.size + len(table)) // align) * align
+    size = body_size(maze.rows, maze.cols, encoding)
+    spawn = spawn if spawn is not None else (-1, -1)
+    exit = exit if exit is not None else (-1, -1)
+    header = HEADER.pack(MAGIC, VERSION, encoding, maze.rows, maze.cols,
+                         maze.seed if maze.seed is not None else 0,
+                         FLAG_HAS_SEED if maze.seed is not None else 0,
+                         spawn[0], spawn[1], exit[0], exit[1],
+                         len(records), body_offset, size)
+    f.write(header)
+    f.write(table)
+    f.write(b"\0" * (body_offset - len(header) - len(table)))
+    # Write row blocks so a huge grid is never converted in one piece
+    step = max(1, (1 << 24) // max(1, maze.cols))
+    for y in range(0, maze.rows, step):
+        block = np.asarray(maze.grid[y:y + step], dtype=np.uint8)
+        if encoding == ENCODING_BITS:
+            block = np.packbits(block, axis=1)
+        f.write(block.tobytes())
+
+
+def read_header(path, offset=0):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(HEADER.size)
+    if len(data) < HEADER.size or data[:4] != MAGIC:
+        raise MazeFileError(f"{path}: not a maze file")
+    (_, version, encoding, rows, cols, seed, flags,
+     sx, sy, ex, ey, count, body_offset, size) = HEADER.unpack(data)
+    if version > VERSION:
+        raise MazeFileError(f"{path}: format version {version} is newer than {VERSION}")
+    if encoding not in ENCODINGS.values() or size != body_size(rows, cols, encoding):
+        raise MazeFileError(f"{path}: bad body description")
+    return MazeHeader(version, encoding, rows, cols, seed if flags & FLAG_HAS_SEED else None,
+                      (sx, sy) if sx >= 0 else None, (ex, ey) if ex >= 0 else None,
+                      count, body_offset, size)
+
+
+def read_entities(path, header, offset=0):
+    entities = []
+    with open(path, "rb") as f:
+        f.seek(offset + HEADER.size)
+        table = f.read(header.entity_count * ENTITY.size)
+    for kind, x, y, name in ENTITY.iter_unpack(table):
+        if kind == KIND_WAYPOINT:
+            if entities and entities[-1][1] == "patrol":
+                entities[-1][4].append((x, y))
+            continue
+        type_name = name.rstrip(b"\0").decode(errors="replace")
+        if type_name not in TYPE_CODES:
+            raise MazeFileError(f"{path}: unknown entity type {type_name!r}")
+        entities.append((kind, type_name, x, y, []))
+    return [tuple(e) for e in entities]
+
+
+def read_maze(path, offset=0):
+    """
+    Opens a maze file (or a maze record starting at offset inside a bigger file,
+    e.g. a level pack) and returns a MazeLevel. A bytes body is memory-mapped
+    read-only and used as Maze.grid directly: nothing is read until cells are touched,
+    and processes opening the same file share its pages. Mutating the maze goes through
+    Maze.own_grid, which copies first.
+    """
+    header = read_header(path, offset)
+    if header.encoding == ENCODING_BYTES:
+        grid = np.memmap(path, dtype=np.uint8, mode="r", offset=offset + header.body_offset,
+                         shape=(header.rows, header.cols))
+    else:
+        packed = np.memmap(path, dtype=np.uint8, mode="r", offset=offset + header.body_offset,
+                           shape=(header.rows, (header.cols + 7) // 8))
+        grid = np.asarray(np.unpackbits(packed, axis=1, count=header.cols))
+    maze = Maze.from_grid(grid, header.seed)
+    return MazeLevel(maze, header.spawn, header.exit, read_entities(path, header, offset))
+
+
+def world_entities(world):
+    """
+    The uncollected entities of a World as entity-table tuples.
+    """
+    store = world.entities
+    entities = []
+    enemies = iter(world.enemies)
+    for slot in range(len(store)):
+        kind = store.kinds[slot]
+        waypoints = getattr(next(enemies), "waypoints", None) if kind == KIND_ENEMY else None
+        if kind != KIND_ENEMY and store.flags[slot] & FLAG_COLLECTED:
+            continue
+        entities.append((kind, store.type_name(slot), store.xs[slot], store.ys[slot], waypoints))
+    return entities
+
+
+# -------------- TEXT / PNG --------------
+
+def to_text(level):
+    rows = [["#" if cell else "." for cell in row] for row in np.asarray(level.maze.grid).tolist()]
+    symbols = {value: key for key, value in TEXT_ENTITIES.items()}
+    for kind, type_name, x, y, _ in level.entities:
+        rows[y][x] = symbols.get((kind, type_name), "?")
+    if level.spawn:
+        rows[level.spawn[1]][level.spawn[0]] = TEXT_SPAWN
+    if level.exit:
+        rows[level.exit[1]][level.exit[0]] = TEXT_EXIT
+    header = f"; seed={level.maze.seed}\n" if level.maze.seed is not None else ""
+    return header + "\n".join("".join(row) for row in rows) + "\n"
+
+
+def from_text(text):
+    seed = None
+    lines = []
+    for line in text.splitlines():
+        if line.startswith(";"):
+            if line.startswith("; seed="):
+                seed = int(line.split("=", 1)[1])
+            continue
+        if line:
+            lines.append(line)
+    rows, cols = len(lines), max(len(line) for line in lines)
+    grid = np.ones((rows, cols), dtype=np.uint8)
+    spawn = exit = None
+    entities = []
+    for y, line in enumerate(lines):
+        for x, ch in enumerate(line):
+            grid[y, x] = TEXT_CELLS.get(ch, 0)
+            if ch in TEXT_ENTITIES:
+                kind, type_name = TEXT_ENTITIES[ch]
+                entities.append((kind, type_name, x, y, None))
+            elif ch == TEXT_SPAWN:
+                spawn = (x, y)
+            elif ch == TEXT_EXIT:
+                exit = (x, y)
+    return MazeLevel(Maze.from_grid(grid, seed), spawn, exit, entities)
+
+
+def write_png_grid(path, grid):
+    from modules.raster import write_png
+    pixels = np.repeat(((1 - np.asarray(grid, dtype=np.uint8)) * 255)[:, :, None], 3, axis=2)
+    write_png(path, pixels)
+
+
+def read_png_grid(path):
+    """
+    Reads a non-interlaced 8-bit grey/RGB/RGBA PNG; dark pixels are walls.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise MazeFileError(f"{path}: not a PNG file")
+    pos, idat, header = 8, [], None
+    while pos + 8 <= len(data):
+        length, tag = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        if tag == b"IHDR" and len(chunk) == 13:
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif tag == b"IDAT":
+            if header is None:
+                raise MazeFileError(f"{path}: IDAT before IHDR")
+            idat.append(chunk)
+        pos += 12 + length
+    if header is None or not idat:
+        raise MazeFileError(f"{path}: missing IHDR or IDAT chunk")
+    width, height, depth, color, _, _, interlace = header
+    channels = {0: 1, 2: 3, 4: 2, 6: 4}.get(color)
+    if depth != 8 or channels is None or interlace:
+        raise MazeFileError(f"{path}: only 8-bit non-interlaced grey/RGB(A) PNGs are supported")
+    stride = width * channels
+    try:
+        raw = np.frombuffer(zlib.decompress(b"".join(idat)), dtype=np.uint8)
+    except zlib.error as e:
+        raise MazeFileError(f"{path}: bad image data ({e})") from None
+    if raw.size != height * (stride + 1):
+        raise MazeFileError(f"{path}: image data does not match the {width}x{height} header")
+    raw = raw.reshape(height, stride + 1)
+    image = np.zeros((height, stride), dtype=np.uint8)
+    prev = np.zeros(stride, dtype=np.uint8)
+    for y in range(height):
+        kind, line = raw[y, 0], raw[y, 1:]
+        if kind > 4:
+            raise MazeFileError(f"{path}: unknown filter type {kind} in row {y}")
+        if kind == 0:
+            row = line.copy()
+        elif kind == 1:
+            # Sub: running sum per channel
+            row = np.cumsum(line.reshape(width, channels), axis=0, dtype=np.uint64).astype(np.uint8).reshape(-1)
+        elif kind == 2:
+            row = line + prev
+        else:
+            # Average/Paeth: each byte depends on the one decoded to its left, so this
+            # stays a per-byte loop on plain ints. A slow path for PNGs from other
+            # tools; write_png only uses filter 0.
+            out, up = [0] * channels, [0] * channels + prev.tolist()
+            for i, value in enumerate(line.tolist()):
+                a, b, c = out[i], up[i + channels], up[i]
+                if kind == 3:
+                    predictor = (a + b) >> 1
+                else:
+                    p = a + b - c
+                    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                    predictor = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+                out.append((value + predictor) & 0xFF)
+            row = np.array(out[channels:], dtype=np.uint8)
+        image[y] = row
+        prev = row
+    grey = image.reshape(height, width, channels)[:, :, :min(channels, 3)].mean(axis=2)
+    return (grey < 128).astype(np.uint8)
+
+
+def load_any(path):
+    if path.endswith(".txt"):
+        with open(path) as f:
+            return from_text(f.read())
+    if path.endswith(".png"):
+        return MazeLevel(Maze.from_grid(read_png_grid(path)), None, None, [])
+    return read_maze(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert and inspect binary maze files.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="convert between .mzb, .txt and .png")
+    convert.add_argument("src")
+    convert.add_argument("dst")
+    convert.add_argument("--encoding", choices=sorted(ENCODINGS), default="bytes")
+    generate = sub.add_parser("generate", help="generate a maze straight to a file")
+    generate.add_argument("dst")
+    generate.add_argument("--rows", type=int, default=21)
+    generate.add_argument("--cols", type=int, default=21)
+    generate.add_argument("--seed", type=int, default=None)
+    generate.add_argument("--encoding", choices=sorted(ENCODINGS), default="bytes")
+    info = sub.add_parser("info", help="print a maze file's header")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        header = read_header(args.path)
+        for field, value in header._asdict().items():
+            print(f"{field}: {value}")
+    elif args.command == "generate":
+        maze = Maze(args.rows, args.cols, seed=args.seed)
+        write_maze(args.dst, maze, (1, 1), (maze.cols - 2, maze.rows - 2), encoding=args.encoding)
+    else:
+        level = load_any(args.src)
+        if args.dst.endswith(".txt"):
+            with open(args.dst, "w") as f:
+                f.write(to_text(level))
+        elif args.dst.endswith(".png"):
+            write_png_grid(args.dst, level.maze.grid)
+        else:
+            write_maze(args.dst, level.maze, level.spawn, level.exit, level.entities, args.encoding)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
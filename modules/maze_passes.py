@@ -0,0 +1,97 @@
+# modules/maze_passes.py
+
+import numpy as np
+
+# (dx, dy) of the four grid neighbours
+NEIGHBOURS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+def open_neighbour_counts(grid):
+    """
+    Number of open (0) 4-neighbours of every cell, for the whole grid at once.
+    Equivalent to convolving the open mask with a cross-shaped kernel. Leading
+    axes are batch axes, so a (B, rows, cols) stack of grids works too.
+    """
+    grid = np.asarray(grid)
+    open_cells = np.pad(grid == 0, [(0, 0)] * (grid.ndim - 2) + [(1, 1), (1, 1)]).astype(np.uint8)
+    return (open_cells[..., 1:-1, 2:] + open_cells[..., 1:-1, :-2] +
+            open_cells[..., 2:, 1:-1] + open_cells[..., :-2, 1:-1])
+
+
+def interior_mask(grid):
+    mask = np.zeros(grid.shape, dtype=bool)
+    mask[1:-1, 1:-1] = True
+    return mask
+
+
+def carve_loops(grid, count, rng):
+    """
+    Opens `count` interior walls that touch at least two path cells, creating loops.
+    All candidates are found in one pass and the walls are picked without replacement,
+    so exactly min(count, candidates) passages are carved.
+    Carving only adds open cells, so no picked wall stops being a candidate.
+    Returns the number of walls carved.
+    """
+    candidates = np.flatnonzero((grid == 1) & interior_mask(grid) &
+                                (open_neighbour_counts(grid) >= 2))
+    count = min(count, len(candidates))
+    if count > 0:
+        chosen = rng.choice(candidates, size=count, replace=False)
+        grid.reshape(-1)[chosen] = 0
+    return count
+
+
+def remove_dead_ends(grid, fraction, rng):
+    """
+    Braids the maze: for a random `fraction` of dead ends, knocks out one adjacent
+    wall that has a path cell beyond it. The four directions are tried in one
+    random order shared by every dead end, so the wall opened may be ahead or to a side.
+    Returns the number of walls carved.
+    """
+    rows, cols = grid.shape
+    dead_ends = (grid == 0) & (open_neighbour_counts(grid) == 1)
+    dead_ends &= rng.random(grid.shape) < fraction
+    chosen = np.zeros(grid.shape, dtype=bool)
+    handled = np.zeros(grid.shape, dtype=bool)
+
+    # Try directions in a random order; each dead end uses the first one that works
+    for i in rng.permutation(len(NEIGHBOURS)):
+        dx, dy = NEIGHBOURS[i]
+        # wall at (y+dy, x+dx), open cell at (y+2dy, x+2dx), wall must stay off the border
+        ok = np.zeros(grid.shape, dtype=bool)
+        ys = slice(max(0, -2*dy), rows - max(0, 2*dy))
+        xs = slice(max(0, -2*dx), cols - max(0, 2*dx))
+        wall = grid[ys.start + dy:ys.stop + dy, xs.start + dx:xs.stop + dx] == 1
+        beyond = grid[ys.start + 2*dy:ys.stop + 2*dy, xs.start + 2*dx:xs.stop + 2*dx] == 0
+        ok[ys, xs] = wall & beyond
+        ok &= dead_ends & ~handled
+        handled |= ok
+        shifted = np.zeros(grid.shape, dtype=bool)
+        src = ok[max(0, -dy):rows - max(0, dy), max(0, -dx):cols - max(0, dx)]
+        shifted[max(0, dy):rows - max(0, -dy), max(0, dx):cols - max(0, -dx)] = src
+        chosen |= shifted
+
+    chosen &= interior_mask(grid)
+    grid[chosen] = 0
+    return int(chosen.sum())
+
+
+def insert_rooms(grid, count, rng, min_size=3, max_size=7):
+    """
+    Clears `count` rectangular rooms (odd-aligned so they line up with DFS corridors).
+    Returns the number of rooms inserted.
+    """
+    rows, cols = grid.shape
+    max_w = min(max_size, cols - 2)
+    max_h = min(max_size, rows - 2)
+    if max_w < min_size or max_h < min_size:
+        return 0
+    widths = rng.integers(min_size, max_w + 1, size=count) | 1
+    heights = rng.integers(min_size, max_h + 1, size=count) | 1
+    inserted = 0
+    for w, h in zip(np.minimum(widths, max_w), np.minimum(heights, max_h)):
+        x = 1 + 2*rng.integers(0, max(1, (cols - 1 - w) // 2))
+        y = 1 + 2*rng.integers(0, max(1, (rows - 1 - h) // 2))
+        grid[y:min(y + h, rows - 1), x:min(x + w, cols - 1)] = 0
+        inserted += 1
+    return inserted
@@ -0,0 +1,281 @@
+# modules/memory_profile.py
+
+import argparse
+import gc
+import sys
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+
+import numpy as np
+
+from modules.maze import Maze
+from modules.enemy import Enemy
+from modules.collectible import Collectible
+from modules.powerup import PowerUp
+from modules.world import World, WorldSnapshot
+
+# Object types counted at every level boundary, by report name
+TRACKED_TYPES = {"enemies": Enemy, "collectibles": Collectible, "powerups": PowerUp,
+                 "mazes": Maze, "snapshots": WorldSnapshot}
+
+# State at one level boundary: traced bytes, live object counts (plus "grids",
+# the distinct grid buffers those objects hold) and the tracemalloc snapshot
+Boundary = namedtuple("Boundary", ["level", "frame", "traced", "counts", "snapshot"])
+
+
+def live_counts():
+    """
+    Live instances of every TRACKED_TYPES type (subclasses included), and the
+    number of distinct maze grid buffers they reference.
+    """
+    gc.collect()
+    counts = dict.fromkeys(TRACKED_TYPES, 0)
+    grids = set()
+    for obj in gc.get_objects():
+        for name, cls in TRACKED_TYPES.items():
+            if isinstance(obj, cls):
+                counts[name] += 1
+                grid = getattr(obj, "grid", None)
+                if isinstance(grid, np.ndarray):
+                    # Copy-on-write shares buffers: count the owner, not the view
+                    grids.add(id(grid.base if grid.base is not None else grid))
+                break
+    counts["grids"] = len(grids)
+    return counts
+
+
+class MemoryMonitor:
+    """
+    Memory instrumentation for long sessions.
+    - check(world) notices level boundaries (every new level makes a new
+      world.level_start) and records traced memory, live entity / grid object
+      counts and a tracemalloc snapshot there.
+    - measure(name) wraps one subsystem's work in a frame; with frame() it gives
+      per-subsystem bytes allocated per frame. tracemalloc's peak is process-wide,
+      so measured sections are serialised by a lock when several threads measure
+      (e.g. the sim tick and the render); allocations of unmeasured threads still
+      count towards whichever section is running.
+    - leaks() flags whatever kept growing across the last `window` boundaries.
+    """
+
+    def __init__(self, window=5, min_growth=16 * 1024, stack_depth=1, keep_snapshots=2):
+        """
+        :param window: Level transitions a metric must grow across to be flagged
+        :param min_growth: Bytes traced memory must grow over the window to be flagged
+        :param stack_depth: tracemalloc frames per trace; 1 is enough for per-line
+                            reports and deeper stacks slow everything down a lot
+        :param keep_snapshots: tracemalloc snapshots kept (the first and latest are
+                               always compared; snapshots are large)
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(stack_depth)
+        self.window = window
+        self.min_growth = min_growth
+        self.keep_snapshots = keep_snapshots
+        self.boundaries = []
+        self.level_start = None
+        self.frames = 0
+        # name -> [calls, peak bytes summed, net bytes summed]
+        self.subsystems = {}
+        self.measuring = threading.Lock()
+
+    # -------------- LEVEL BOUNDARIES --------------
+
+    def check(self, world):
+        """
+        Records a boundary if world started a level since the last call. Cheap otherwise.
+        """
+        if world.level_start is self.level_start:
+            return False
+        self.level_start = world.level_start
+        self.record(world.current_level)
+        return True
+
+    def record(self, level):
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        self.boundaries.append(Boundary(level, self.frames, tracemalloc.get_traced_memory()[0],
+                                        live_counts(), snapshot))
+        # Drop the middle snapshots; first and latest are what growth() compares
+        with_snapshots = [i for i, b in enumerate(self.boundaries) if b.snapshot is not None]
+        while len(with_snapshots) > max(2, self.keep_snapshots):
+            i = with_snapshots.pop(1)
+            self.boundaries[i] = self.boundaries[i]._replace(snapshot=None)
+
+    def leaks(self):
+        """
+        {metric: (value at window start, value now)} for every metric that grew at
+        each of the last window transitions or, for traced bytes, never fell back to
+        its starting value and grew by at least min_growth.
+        """
+        if len(self.boundaries) <= self.window:
+            return {}
+        recent = self.boundaries[-self.window - 1:]
+        flagged = {}
+        traced = [b.traced for b in recent]
+        if min(traced[1:]) > traced[0] and traced[-1] - traced[0] >= self.min_growth:
+            flagged["traced bytes"] = (traced[0], traced[-1])
+        for name in recent[0].counts:
+            values = [b.counts[name] for b in recent]
+            if all(b > a for a, b in zip(values, values[1:])):
+                flagged[name] = (values[0], values[-1])
+        return flagged
+
+    def growth(self, top=10):
+        """
+        The source lines whose traced memory grew most between the first and the
+        latest boundary snapshot.
+        """
+        snapshots = [b.snapshot for b in self.boundaries if b.snapshot is not None]
+        if len(snapshots) < 2:
+            return []
+        stats = snapshots[-1].compare_to(snapshots[0], "lineno")
+        return [s for s in stats if s.size_diff > 0][:top]
+
+    # -------------- PER-FRAME ALLOCATION --------------
+
+    def frame(self):
+        self.frames += 1
+
+    def measure(self, name):
+        return _Measure(self, name)
+
+    def allocation_rates(self):
+        """
+        {subsystem: (peak bytes allocated per frame, net bytes kept per frame)}.
+        """
+        frames = max(1, self.frames)
+        return {name: (peak / frames, net / frames)
+                for name, (_, peak, net) in self.subsystems.items()}
+
+    # -------------- REPORT --------------
+
+    def report(self, top=10):
+        lines = []
+        if self.subsystems:
+            lines.append(f"Allocation per frame over {self.frames} frames:")
+            for name, (peak, net) in sorted(self.allocation_rates().items(), key=lambda kv: -kv[1][0]):
+                lines.append(f"  {name:>10}: {peak/1024:9.1f} KiB allocated  {net:+9.1f} B kept")
+        if self.boundaries:
+            lines.append(f"Level boundaries ({len(self.boundaries)}):")
+            names = list(self.boundaries[0].counts)
+            lines.append("  level   frame   traced KiB  " + "  ".join(f"{n:>12}" for n in names))
+            for b in self.boundaries:
+                lines.append(f"  {b.level:5d}  {b.frame:6d}  {b.traced/1024:11.1f}  " +
+                             "  ".join(f"{b.counts[n]:12d}" for n in names))
+        leaks = self.leaks()
+        if leaks:
+            lines.append(f"Growth across the last {self.window} level transitions:")
+            for name, (first, last) in leaks.items():
+                lines.append(f"  {name}: {first} -> {last}")
+            for stat in self.growth(top):
+                lines.append(f"  {stat}")
+        elif len(self.boundaries) > self.window:
+            lines.append(f"No growth across the last {self.window} level transitions")
+        return "\n".join(lines)
+
+
+class _Measure:
+    def __init__(self, monitor, name):
+        self.monitor = monitor
+        self.name = name
+
+    def __enter__(self):
+        self.monitor.measuring.acquire()
+        tracemalloc.reset_peak()
+        self.start = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc):
+        current, peak = tracemalloc.get_traced_memory()
+        stats = self.monitor.subsystems.setdefault(self.name, [0, 0, 0])
+        stats[0] += 1
+        stats[1] += peak - self.start
+        stats[2] += current - self.start
+        self.monitor.measuring.release()
+        return False
+
+
+# -------------- SOAK BENCHMARK --------------
+
+# Where --inject-leak keeps its references
+_leaked = []
+
+
+def soak(levels, rows=21, cols=21, seed=0, software=True, window=5, inject_leak=False,
+         max_frames_per_level=5000):
+    """
+    Plays levels back to back headlessly: the player walks the shortest path to
+    each exit (invisible, so enemies can't end the run), the world ticks at 60 Hz,
+    a snapshot is published every frame as the sim thread does, and the software
+    renderer draws every frame. Returns the MemoryMonitor.
+    """
+    from modules.pathfinding import bfs_path, flatten_grid
+    from modules.damage import DamageRenderer
+
+    monitor = MemoryMonitor(window=window)
+    world = World(rows, cols, seed=seed, history_size=120, verbose=False)
+    world.maze.scale_x, world.maze.scale_y = 800 / cols, 540 / rows
+    damage = DamageRenderer(800, 600, 800 / cols, 540 / rows) if software else None
+    monitor.check(world)
+    path = []
+    level_frames = 0
+    while len(monitor.boundaries) <= levels:
+        world.is_invisible = True
+        world.invisible_until = float("inf")
+        with monitor.measure("input"):
+            if not path:
+                start = world.player.y*world.maze.cols + world.player.x
+                goal = world.exit_y*world.maze.cols + world.exit_x
+                path = bfs_path(flatten_grid(world.maze), world.maze.cols, start, goal) or []
+            if path:
+                cell = path.pop(0)
+                world.move_player(cell % world.maze.cols - world.player.x,
+                                  cell // world.maze.cols - world.player.y)
+        with monitor.measure("sim"):
+            world.update(1 / 60)
+            world.drain_events()
+        with monitor.measure("snapshot"):
+            world.snapshot()
+        if damage is not None:
+            with monitor.measure("render"):
+                damage.render(world)
+        monitor.frame()
+        level_frames += 1
+        if monitor.check(world):
+            path = []
+            level_frames = 0
+            if inject_leak:
+                _leaked.append(list(world.enemies))
+        elif level_frames > max_frames_per_level:
+            raise RuntimeError(f"level {world.current_level} not finished in {max_frames_per_level} frames")
+    return monitor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless soak test: play many levels and look for memory growth.")
+    parser.add_argument("--levels", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=21)
+    parser.add_argument("--cols", type=int, default=21)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--window", type=int, default=5,
+                        help="level transitions a metric must keep growing over to be flagged")
+    parser.add_argument("--no-render", action="store_true", help="skip the software renderer")
+    parser.add_argument("--inject-leak", action="store_true",
+                        help="keep every level's enemies alive, to check the detector")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    monitor = soak(args.levels, args.rows, args.cols, args.seed, not args.no_render,
+                   args.window, args.inject_leak)
+    print(f"Played {args.levels} levels ({monitor.frames} frames) in {time.perf_counter() - start:.1f}s")
+    print(monitor.report())
+    return 1 if monitor.leaks() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# modules/pathfinding.py
+
+from array import array
+from collections import deque
+
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+def flatten_grid(maze):
+    """
+    Returns the maze grid as a flat bytearray indexed by y*cols + x
+    (1 = wall, 0 = path). Indexing a flat buffer is much cheaper than grid[y][x].
+    """
+    return bytearray(maze.grid.tobytes())
+
+
+def bfs_path(walls, cols, start, goal):
+    """
+    Breadth-first search over a flat wall buffer.
+    start/goal are flat indices. Returns the list of flat indices
+    from the cell after start up to and including goal, or None if unreachable.
+    """
+    if start == goal:
+        return []
+    size = len(walls)
+    came_from = {start: -1}
+    frontier = deque([start])
+
+    while frontier:
+        current = frontier.popleft()
+        cx = current % cols
+        for n in (current - 1 if cx > 0 else -1,
+                  current + 1 if cx < cols - 1 else -1,
+                  current - cols,
+                  current + cols):
+            if n < 0 or n >= size or walls[n] or n in came_from:
+                continue
+            came_from[n] = current
+            if n == goal:
+                path = []
+                while n != start:
+                    path.append(n)
+                    n = came_from[n]
+                path.reverse()
+                return path
+            frontier.append(n)
+    return None
+
+
+def distance_field(walls, cols, source):
+    """
+    BFS distances from source (flat index) to every cell, as an array of ints;
+    walls and unreachable cells are -1.
+    """
+    size = len(walls)
+    dist = array('i', [-1]) * size
+    dist[source] = 0
+    frontier = deque([source])
+
+    while frontier:
+        current = frontier.popleft()
+        d = dist[current] + 1
+        cx = current % cols
+        for n in (current - 1 if cx > 0 else -1,
+                  current + 1 if cx < cols - 1 else -1,
+                  current - cols,
+                  current + cols):
+            if 0 <= n < size and not walls[n] and dist[n] < 0:
+                dist[n] = d
+                frontier.append(n)
+    return dist
@@ -1,57 +1,109 @@
 # modules/patrolling_enemy.py
 
+import math
+from array import array
 from modules.enemy import Enemy
-import time
+from modules.pathfinding import flatten_grid, bfs_path
+
+# Compiled routes keyed by (maze layout, waypoints); oldest entries are evicted first
+_route_cache = {}
+ROUTE_CACHE_SIZE = 64
+
+
+def compile_patrol_route(maze, waypoints):
+    """
+    Compiles a looping list of waypoints into a cell-by-cell route.
+    Consecutive waypoints are joined with BFS paths, so the route never crosses walls.
+    Returns (route, stops): route is an array of flat cell indices (y*cols + x)
+    forming a closed loop, stops is a frozenset of route positions that are waypoints.
+    """
+    key = (maze.layout_key(), tuple(waypoints))
+    cached = _route_cache.get(key)
+    if cached is not None:
+        return cached
+
+    walls = flatten_grid(maze)
+    cols = maze.cols
+    points = [y*cols + x for x, y in waypoints
+              if 0 <= x < maze.cols and 0 <= y < maze.rows and not walls[y*cols + x]]
+
+    route = array('i')
+    stops = set()
+    if points:
+        route.append(points[0])
+        stops.add(0)
+        current = points[0]
+        # Walk every leg including the one back to the first waypoint
+        for target in points[1:] + points[:1]:
+            leg = bfs_path(walls, cols, current, target)
+            if leg is None:
+                # Unreachable waypoint: skip it and keep going from here
+                continue
+            route.extend(leg)
+            stops.add(len(route) - 1)
+            current = target
+        # The closing leg ends on the start cell, which is already route[0]
+        if len(route) > 1 and route[-1] == route[0]:
+            route.pop()
+            stops.discard(len(route))
+
+    result = (route, frozenset(stops))
+    if len(_route_cache) >= ROUTE_CACHE_SIZE:
+        del _route_cache[next(iter(_route_cache))]
+    _route_cache[key] = result
+    return result
+
 
 class PatrollingEnemy(Enemy):
     """
-    Moves along a fixed list of waypoints in a loop or back-and-forth,
-    ignoring BFS chase logic.
+    Moves along a fixed list of waypoints in a loop,
+    ignoring BFS chase logic. The loop is compiled once at spawn,
+    so each patrol step is just an index increment.
     """
 
-    def __init__(self, x, y, maze, waypoints=None, wait_time=0.0):
-        super().__init__(x, y, maze)
+    __slots__ = ("waypoints", "wait_time", "stop_ticks", "wait_ticks",
+                 "route", "route_stops", "route_index")
+    type_name = "patrol"
+
+    def __init__(self, x, y, maze, waypoints=None, wait_time=0.0, rng=None, store=None):
+        super().__init__(x, y, maze, rng, store)
         self.waypoints = waypoints if waypoints else []
-        self.waypoint_index = 0
-        self.direction_forward = True
         self.wait_time = wait_time
-        self.last_reach_time = 0.0
+        # Number of moves to hold position at each waypoint
+        self.stop_ticks = int(math.ceil(wait_time / self.speed)) if self.speed > 0 else 0
+        self.wait_ticks = 0
+
+        self.route, self.route_stops = compile_patrol_route(maze, self.waypoints)
+        start = y*maze.cols + x
+        self.route_index = self.route.index(start) if start in self.route else 0
+
+    def get_state(self):
+        return super().get_state() + (self.route_index, self.wait_ticks)
 
-    def update_path(self, px, py):
+    def set_state(self, state):
+        super().set_state(state[:5])
+        self.route_index, self.wait_ticks = state[5:]
+
+    def update_path(self, px, py, sight_radius=None):
         # ignore BFS, do patrol
         self.do_patrol()
 
     def do_patrol(self):
-        if not self.waypoints:
+        if len(self.route) < 2:
+            return
+
+        # waiting at a waypoint
+        if self.wait_ticks > 0:
+            self.wait_ticks -= 1
             return
 
-        tx, ty = self.waypoints[self.waypoint_index]
-        if self.x == tx and self.y == ty:
-            # waiting
-            if time.time() - self.last_reach_time < self.wait_time:
-                return
-            else:
-                self.last_reach_time = time.time()
-                if self.direction_forward:
-                    self.waypoint_index += 1
-                    if self.waypoint_index >= len(self.waypoints):
-                        # loop
-                        self.waypoint_index = 0
-                else:
-                    # ping-pong approach if you like
-                    # or keep it looping
-                    pass
-
-        tx, ty = self.waypoints[self.waypoint_index]
-        dx = tx - self.x
-        dy = ty - self.y
-        if dx != 0:
-            dx = 1 if dx>0 else -1
-        if dy != 0:
-            dy = 1 if dy>0 else -1
-        nx = self.x + dx
-        ny = self.y + dy
-        if 0<=nx<self.maze.cols and 0<=ny<self.maze.rows:
-            if self.maze.grid[ny][nx] == 0:
-                self.x = nx
-                self.y = ny
+        self.route_index += 1
+        if self.route_index >= len(self.route):
+            # loop
+            self.route_index = 0
+        cell = self.route[self.route_index]
+        self.x = cell % self.maze.cols
+        self.y = cell // self.maze.cols
+
+        if self.route_index in self.route_stops:
+            self.wait_ticks = self.stop_ticks
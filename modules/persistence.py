@@ -0,0 +1,119 @@
+# modules/persistence.py
+
+import json
+import os
+import threading
+import time
+
+SAVE_VERSION = 2
+
+
+class SaveManager:
+    """
+    Writes save data on a background thread so saving never blocks a frame.
+    Saves issued in quick succession are coalesced: only the latest data is written.
+    Every write goes to a temp file first and is then swapped in with os.replace,
+    so a crash mid-write leaves the previous save intact.
+    """
+
+    def __init__(self, path="savegame.json", coalesce_delay=0.2):
+        """
+        :param path: Where the save file lives
+        :param coalesce_delay: Seconds to wait for further saves before writing
+        """
+        self.path = path
+        self.coalesce_delay = coalesce_delay
+        self._pending = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._closed = False
+        self._thread = None
+
+    def save(self, data):
+        """
+        Queues data (a JSON-serialisable dict) to be written. Returns immediately.
+        The caller must not mutate data afterwards.
+        """
+        payload = dict(data)
+        payload["version"] = SAVE_VERSION
+        with self._lock:
+            self._pending = payload
+            self._idle.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def load(self):
+        """
+        Returns the saved dict, or None if there is no usable save.
+        Version 1 saves ({"highest_level": n}) are upgraded on the fly.
+        """
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Could not read save file {self.path}: {e}")
+            return None
+
+        if not isinstance(data, dict):
+            print(f"Ignoring malformed save file {self.path}")
+            return None
+        version = data.get("version", 1)
+        if version > SAVE_VERSION:
+            print(f"Save file {self.path} is from a newer version ({version})")
+            return None
+        if version == 1:
+            data = {"version": SAVE_VERSION,
+                    "highest_level": data.get("highest_level", 1),
+                    "session": None}
+        return data
+
+    def flush(self, timeout=None):
+        """
+        Blocks until every queued save has been written. Returns False on timeout.
+        """
+        return self._idle.wait(timeout)
+
+    def close(self, timeout=2.0):
+        """
+        Writes any pending save and stops the writer thread.
+        """
+        self.flush(timeout)
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            if self._closed:
+                return
+            # Give a burst of saves a moment to settle, then write the latest one
+            if self.coalesce_delay > 0:
+                time.sleep(self.coalesce_delay)
+            with self._lock:
+                self._wakeup.clear()
+                payload = self._pending
+                self._pending = None
+            if payload is not None:
+                try:
+                    self._write(payload)
+                except (OSError, TypeError, ValueError) as e:
+                    print(f"Saving to {self.path} failed: {e}")
+            with self._lock:
+                if self._pending is None:
+                    self._idle.set()
+
+    def _write(self, payload):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
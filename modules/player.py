@@ -1,7 +1,6 @@
 # modules/player.py
 
-from OpenGL.GL import *
-from modules.utils import midpoint_circle, midpoint_line
+from modules.assets import shape
 
 class Player:
     """
@@ -17,6 +16,7 @@ class Player:
         """
         If is_invisible is True, draw the player in gold color. Otherwise green.
         """
+        from OpenGL.GL import glColor3f, glBegin, glEnd, glVertex2f, GL_POINTS
         gl_cx = (self.x - maze_cols/2)*scale_x
         gl_cy = (maze_rows/2 - self.y)*scale_y
 
@@ -30,7 +30,7 @@ class Player:
             inner_color = (0.0, 0.7, 0.0)
 
         # Outer circle
-        outer_pts = midpoint_circle(0, 0, radius)
+        outer_pts = shape("circle", radius)
         glColor3f(*outer_color)
         glBegin(GL_POINTS)
         for px, py in outer_pts:
@@ -38,7 +38,7 @@ class Player:
         glEnd()
 
         # Inner circle
-        inner_pts = midpoint_circle(0, 0, radius-2)
+        inner_pts = shape("circle", radius-2)
         glColor3f(*inner_color)
         glBegin(GL_POINTS)
         for px, py in inner_pts:
@@ -46,10 +46,7 @@ class Player:
         glEnd()
 
         # Visor line
-        visor_left = (-radius+2, 0)
-        visor_right = (radius-2, 0)
-        visor_line = midpoint_line(visor_left[0], visor_left[1],
-                                   visor_right[0], visor_right[1])
+        visor_line = shape("visor", radius)
         glColor3f(1.0, 1.0, 1.0)
         glBegin(GL_POINTS)
         for px, py in visor_line:
@@ -1,38 +1,80 @@
 # modules/powerup.py
 
-from OpenGL.GL import *
-from modules.utils import midpoint_circle
+from modules.utils import draw_points, sprite_points
+from modules.assets import shape
+from modules.entity_store import EntityStore, EntityHandle, KIND_POWERUP, FLAG_COLLECTED, TYPE_NAMES, type_code
 
-class PowerUp:
+POWER_COLORS = {
+    "speed": (0.5, 0.8, 1.0),  # Light blue
+    "invincibility": (1.0, 0.8, 0.0),  # Golden
+}
+FALLBACK_COLOR = (1.0, 0.5, 0.5)
+
+class PowerUp(EntityHandle):
     """
     Represents a special power-up in the Pixel Adventure Maze game.
     Examples: speed boost, invincibility, etc.
+    Its data lives in an EntityStore slot; pass the level's store to share it.
     """
 
-    def __init__(self, x, y, power_type="speed", collected=False):
-        self.x = x
-        self.y = y
-        self.power_type = power_type  # e.g. "speed", "invincibility"
-        self.collected = collected
+    __slots__ = ()
+
+    def __init__(self, x, y, power_type="speed", collected=False, store=None):
+        self.store = store if store is not None else EntityStore()
+        # power_type: e.g. "speed", "invincibility"
+        self.slot = self.store.add(KIND_POWERUP, power_type, x, y,
+                                   FLAG_COLLECTED if collected else 0)
+
+    @property
+    def power_type(self):
+        return TYPE_NAMES[self.store.types[self.slot]]
+
+    @power_type.setter
+    def power_type(self, value):
+        self.store.types[self.slot] = type_code(value)
+
+    @property
+    def collected(self):
+        return bool(self.store.flags[self.slot] & FLAG_COLLECTED)
+
+    @collected.setter
+    def collected(self, value):
+        if value:
+            self.store.flags[self.slot] |= FLAG_COLLECTED
+        else:
+            self.store.flags[self.slot] &= ~FLAG_COLLECTED & 0xFF
 
     def render(self, scale_x, scale_y, maze_cols, maze_rows, radius=5):
+        from OpenGL.GL import glColor3f, glBegin, glEnd, glVertex2f, GL_POINTS
         if self.collected:
             return
 
         gl_cx = (self.x - maze_cols / 2) * scale_x
         gl_cy = (maze_rows / 2 - self.y) * scale_y
 
-        circle_points = midpoint_circle(0, 0, radius)
+        circle_points = shape("circle", radius)
 
         # Pick color based on power_type
-        if self.power_type == "speed":
-            glColor3f(0.5, 0.8, 1.0)  # Light blue
-        elif self.power_type == "invincibility":
-            glColor3f(1.0, 0.8, 0.0)  # Golden
-        else:
-            glColor3f(1.0, 0.5, 0.5)  # Fallback color
+        glColor3f(*POWER_COLORS.get(self.power_type, FALLBACK_COLOR))
 
         glBegin(GL_POINTS)
         for px, py in circle_points:
             glVertex2f(gl_cx + px * scale_x / 10, gl_cy + py * scale_y / 10)
         glEnd()
+
+    @staticmethod
+    def render_batch(store, scale_x, scale_y, maze_cols, maze_rows, radius=5, fog=None):
+        """
+        Draws every uncollected power-up in store, one draw call per power type
+        (only those in view if a FogOfWar is given).
+        """
+        from OpenGL.GL import glColor3f
+        circle_points = shape("circle", radius)
+        for type_name in sorted({store.type_name(slot) for slot, kind in enumerate(store.kinds)
+                                 if kind == KIND_POWERUP}):
+            centers = store.positions(KIND_POWERUP, type_name, FLAG_COLLECTED)
+            if fog is not None:
+                centers = fog.filter(centers)
+            glColor3f(*POWER_COLORS.get(type_name, FALLBACK_COLOR))
+            draw_points(sprite_points(centers, circle_points,
+                                      scale_x, scale_y, maze_cols, maze_rows))
@@ -0,0 +1,287 @@
+# modules/raster.py
+
+import argparse
+import os
+import random
+import struct
+import time
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from modules.utils import midpoint_circles, midpoint_lines, spike_points
+from modules.maze import REMEMBERED_COLOR
+from modules.powerup import POWER_COLORS, FALLBACK_COLOR
+from modules.entity_store import KIND_ENEMY, KIND_GEM, KIND_POWERUP, FLAG_COLLECTED
+
+
+def rgb8(color):
+    return np.round(np.asarray(color[:3], dtype=np.float64) * 255).astype(np.uint8)
+
+
+class Framebuffer:
+    """
+    CPU stand-in for the GL window: a (height, width, 3) uint8 RGB image with the
+    same coordinate system as Game's gluOrtho2D projection (origin in the centre,
+    y up). Every draw is one vectorized scatter of GL_POINTS.
+    """
+
+    def __init__(self, width=800, height=600):
+        self.width = width
+        self.height = height
+        self.pixels = np.zeros((height, width, 3), dtype=np.uint8)
+        # Like glTranslatef, applied to every point drawn
+        self.offset = (0.0, 0.0)
+        # Optional (height, width) bool mask; like a scissor test, only True pixels are written
+        self.clip = None
+
+    def clear(self, color=(0, 0, 0)):
+        rgb = rgb8(color)
+        if rgb[0] == rgb[1] == rgb[2]:
+            # Grey (e.g. black) clears are a plain memset, much faster than a broadcast
+            self.pixels.fill(rgb[0])
+        else:
+            self.pixels[:] = rgb
+
+    def points(self, points, color):
+        """
+        Draws an (N, 2) array of GL coordinates in one colour. Each point fills the
+        pixel that contains it, as single-pixel GL_POINTS do; points off-screen are dropped.
+        """
+        if len(points) == 0:
+            return
+        pts = np.asarray(points, dtype=np.float32)
+        col = np.floor(pts[:, 0] + np.float32(self.offset[0] + self.width/2)).astype(np.intp)
+        row = self.height - 1 - np.floor(pts[:, 1] + np.float32(self.offset[1] + self.height/2)).astype(np.intp)
+        inside = (col >= 0) & (col < self.width) & (row >= 0) & (row < self.height)
+        row, col = row[inside], col[inside]
+        if self.clip is not None:
+            keep = self.clip[row, col]
+            row, col = row[keep], col[keep]
+        self.pixels[row, col] = rgb8(color)
+
+    def save_png(self, path):
+        write_png(path, self.pixels)
+
+
+def write_png(path, pixels):
+    """
+    Writes an RGB uint8 image as a PNG using only zlib (no imaging library needed).
+    """
+    height, width, _ = pixels.shape
+    raw = np.zeros((height, width*3 + 1), dtype=np.uint8)  # filter byte 0 per row
+    raw[:, 1:] = pixels.reshape(height, -1)
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data +
+                struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 1)))
+        f.write(chunk(b"IEND", b""))
+
+
+# -------------- CACHED SHAPES --------------
+
+@lru_cache(maxsize=None)
+def circle_shape(radius):
+    return midpoint_circles([(0, 0)], radius).astype(np.float64)
+
+
+@lru_cache(maxsize=None)
+def line_shape(x0, y0, x1, y1):
+    return midpoint_lines([(x0, y0, x1, y1)]).astype(np.float64)
+
+
+@lru_cache(maxsize=None)
+def spike_shape(radius):
+    return np.array(spike_points(radius), dtype=np.float64).reshape(-1, 2)
+
+
+def place(centers, shape, scale_x, scale_y, maze_cols, maze_rows):
+    """
+    GL coordinates of a sprite shape drawn at every grid cell in centers, computed
+    with the same expression as the per-object render methods
+    (gl_cx + px*scale_x/10), so each point lands on the same pixel.
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    gl_cx = (centers[:, 0] - maze_cols/2)*scale_x
+    gl_cy = (maze_rows/2 - centers[:, 1])*scale_y
+    out = np.empty((len(centers), len(shape), 2), dtype=np.float64)
+    out[:, :, 0] = gl_cx[:, None] + shape[None, :, 0]*scale_x/10
+    out[:, :, 1] = gl_cy[:, None] + shape[None, :, 1]*scale_y/10
+    return out.reshape(-1, 2)
+
+
+# -------------- SCENE --------------
+
+def draw_maze(fb, maze, scale_x, scale_y, fog=None):
+    """
+    Same points as Maze.render: both end cells of every pair of adjacent walls
+    (with a FogOfWar, walls in view plus explored ones dimmed).
+    """
+    cells = maze.wall_geometry().cells()
+    pts = np.empty((len(cells), 2), dtype=np.float64)
+    pts[:, 0] = (cells[:, 0] - maze.cols/2)*scale_x
+    pts[:, 1] = (maze.rows/2 - cells[:, 1])*scale_y
+    if fog is None:
+        fb.points(pts, (1.0, 1.0, 1.0))
+        return
+    lit = fog.lit[cells[:, 1], cells[:, 0]]
+    seen = fog.explored[cells[:, 1], cells[:, 0]]
+    fb.points(pts[seen & ~lit], REMEMBERED_COLOR)
+    fb.points(pts[lit], (1.0, 1.0, 1.0))
+
+
+@lru_cache(maxsize=None)
+def sprite_layers(sprite, variant=None, radius=None):
+    """
+    The (shape, colour) layers of a sprite in drawing order, as the render methods
+    draw them. variant is is_invisible for "player" and the power type for "powerup".
+    """
+    if sprite == "player":
+        radius = 10 if radius is None else radius
+        if variant:
+            outer_color, inner_color = (1.0, 0.84, 0.0), (0.85, 0.7, 0.0)
+        else:
+            outer_color, inner_color = (0.0, 1.0, 0.0), (0.0, 0.7, 0.0)
+        return ((circle_shape(radius), outer_color),
+                (circle_shape(radius - 2), inner_color),
+                (line_shape(-radius + 2, 0, radius - 2, 0), (1.0, 1.0, 1.0)))
+    if sprite == "enemy":
+        radius = 8 if radius is None else radius
+        return ((circle_shape(radius), (1.0, 0.0, 0.0)),
+                (spike_shape(radius), (1.0, 1.0, 0.0)),
+                (circle_shape(radius//3), (0.0, 0.0, 0.0)))
+    if sprite == "gem":
+        return ((circle_shape(5 if radius is None else radius), (1.0, 1.0, 0.0)),)
+    if sprite == "powerup":
+        return ((circle_shape(5 if radius is None else radius), POWER_COLORS.get(variant, FALLBACK_COLOR)),)
+    raise ValueError(f"unknown sprite {sprite!r}")
+
+
+def draw_sprite(fb, sprite, variant, centers, scale_x, scale_y, maze_cols, maze_rows, radius=None):
+    """
+    Draws one sprite at every cell in centers, layer by layer.
+    """
+    for shape, color in sprite_layers(sprite, variant, radius):
+        fb.points(place(centers, shape, scale_x, scale_y, maze_cols, maze_rows), color)
+
+
+def draw_player(fb, player, scale_x, scale_y, maze_cols, maze_rows, radius=10, is_invisible=False):
+    draw_sprite(fb, "player", bool(is_invisible), (player.x, player.y),
+                scale_x, scale_y, maze_cols, maze_rows, radius)
+
+
+def visible_positions(store, fog, *args):
+    centers = store.positions(*args)
+    return centers if fog is None else fog.filter(centers)
+
+
+def draw_enemies(fb, store, scale_x, scale_y, maze_cols, maze_rows, radius=8, fog=None):
+    # Enemies are drawn one after another, so layers interleave per enemy as in Enemy.render
+    for center in visible_positions(store, fog, KIND_ENEMY):
+        draw_sprite(fb, "enemy", None, center, scale_x, scale_y, maze_cols, maze_rows, radius)
+
+
+def draw_collectibles(fb, store, scale_x, scale_y, maze_cols, maze_rows, radius=5, fog=None):
+    centers = visible_positions(store, fog, KIND_GEM, None, FLAG_COLLECTED)
+    draw_sprite(fb, "gem", None, centers, scale_x, scale_y, maze_cols, maze_rows, radius)
+
+
+def draw_powerups(fb, store, scale_x, scale_y, maze_cols, maze_rows, radius=5, fog=None):
+    for type_name in sorted({store.type_name(slot) for slot, kind in enumerate(store.kinds)
+                             if kind == KIND_POWERUP}):
+        centers = visible_positions(store, fog, KIND_POWERUP, type_name, FLAG_COLLECTED)
+        draw_sprite(fb, "powerup", type_name, centers, scale_x, scale_y, maze_cols, maze_rows, radius)
+
+
+def exit_points(exit_x, exit_y, scale_x, scale_y, maze_cols, maze_rows, size=8):
+    gl_x = (exit_x - maze_cols/2)*scale_x
+    gl_y = (maze_rows/2 - exit_y)*scale_y
+    xs = np.arange(int(gl_x - size), int(gl_x + size) + 1)
+    ys = np.arange(int(gl_y - size), int(gl_y + size) + 1)
+    return np.stack(np.meshgrid(xs, ys, indexing="ij"), axis=-1).reshape(-1, 2)
+
+
+def draw_exit(fb, exit_x, exit_y, scale_x, scale_y, maze_cols, maze_rows, size=8):
+    fb.points(exit_points(exit_x, exit_y, scale_x, scale_y, maze_cols, maze_rows, size), (0.0, 0.0, 1.0))
+
+
+def draw_button(fb, button):
+    """
+    Button.render without the label (text needs GLUT's bitmap fonts).
+    """
+    x_min, x_max = int(button.x), int(button.x + button.width)
+    y_min, y_max = int(button.y - button.height), int(button.y)
+    xs, ys = np.arange(x_min, x_max), np.arange(y_min, y_max)
+    fb.points(np.stack(np.meshgrid(xs, ys, indexing="ij"), axis=-1).reshape(-1, 2), (0.2, 0.2, 0.2))
+    border = np.concatenate([line_shape(x_min, y_max, x_max, y_max), line_shape(x_min, y_min, x_max, y_min),
+                             line_shape(x_min, y_min, x_min, y_max), line_shape(x_max, y_min, x_max, y_max)])
+    fb.points(border, (1.0, 1.0, 1.0))
+
+
+def render_world(fb, world, scale_x, scale_y, reserved_ui_height=60.0, clear=True):
+    """
+    Draws the play area the way Game.render_game does (maze, player, enemies,
+    gems, power-ups, exit, in that order), without text and buttons.
+    """
+    if clear:
+        fb.clear()
+    cols, rows = world.maze.cols, world.maze.rows
+    fb.offset = (0.0, -reserved_ui_height/2)
+    fog = world.fog
+    draw_maze(fb, world.maze, scale_x, scale_y, fog)
+    draw_player(fb, world.player, scale_x, scale_y, cols, rows, radius=10, is_invisible=world.is_invisible)
+    draw_enemies(fb, world.entities, scale_x, scale_y, cols, rows, fog=fog)
+    draw_collectibles(fb, world.entities, scale_x, scale_y, cols, rows, fog=fog)
+    draw_powerups(fb, world.entities, scale_x, scale_y, cols, rows, fog=fog)
+    if fog is None or fog.explored[world.exit_y, world.exit_x]:
+        draw_exit(fb, world.exit_x, world.exit_y, scale_x, scale_y, cols, rows)
+    fb.offset = (0.0, 0.0)
+    return fb
+
+
+def main(argv=None):
+    from modules.world import World
+
+    parser = argparse.ArgumentParser(description="Render headless frames of a random playthrough.")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--out", default=None, help="directory for frame_NNNN.png files")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--rows", type=int, default=21)
+    parser.add_argument("--cols", type=int, default=21)
+    parser.add_argument("--fps", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    world = World(args.rows, args.cols, seed=args.seed, verbose=False)
+    reserved_ui_height = 60.0
+    scale_x = args.width / world.maze.cols
+    scale_y = (args.height - reserved_ui_height) / world.maze.rows
+    fb = Framebuffer(args.width, args.height)
+    rng = random.Random(args.seed)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+
+    render_seconds = 0.0
+    for frame in range(args.frames):
+        if rng.random() < 0.3:
+            world.move_player(*rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)]))
+        world.update(1.0 / args.fps)
+        if world.game_over:
+            world.restart()
+        start = time.perf_counter()
+        render_world(fb, world, scale_x, scale_y, reserved_ui_height)
+        render_seconds += time.perf_counter() - start
+        if args.out:
+            fb.save_png(os.path.join(args.out, f"frame_{frame:04d}.png"))
+    print(f"{args.frames} frames, {1000 * render_seconds / max(1, args.frames):.2f} ms per frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# modules/remote_world.py
+
+import json
+import socket
+
+from modules.maze import Maze
+from modules.player import Player
+from modules.enemy import Enemy
+from modules.collectible import Collectible
+from modules.powerup import PowerUp
+from modules.entity_store import EntityStore, KIND_ENEMY, KIND_GEM
+from modules.server import MOVES, encode, unpack_grid
+
+
+class RemoteWorld:
+    """
+    Thin-client stand-in for World: mirrors a session running on a GameServer.
+    It has the attributes the renderer reads (maze, player, enemies, entities, exit,
+    score, timers) and turns moves into input messages. The simulation itself only
+    runs on the server; update() just applies the states received since the last frame.
+    """
+
+    def __init__(self, address, session=None, seed=None):
+        """
+        :param address: (host, port) for TCP, or a path for a Unix socket
+        :param session: Id of a session to join; a new one is created if None
+        """
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.connect(address)
+        self.buffer = b""
+        # Input messages not yet accepted by the non-blocking socket
+        self.outgoing = bytearray()
+        self.session = None
+        self.enemy_move_interval = 0.5
+
+        self.maze = None
+        self.player = Player(1, 1)
+        self.entities = EntityStore()
+        # Darkness is a local-only mode
+        self.fog = None
+        self.enemies = []
+        self.current_level = 1
+        self.score = 0
+        self.level_time = 0.0
+        self.exit_x = self.exit_y = 0
+        self.is_invisible = False
+        self.speed_boost_active = False
+        self.game_over = False
+        self.events = []
+
+        self.send({"type": "join", "session": session, "seed": seed})
+        # Block until the first full state so the renderer always has a maze
+        while self.maze is None:
+            self.receive()
+        self.sock.setblocking(False)
+
+    def send(self, message):
+        self.outgoing += encode(message)
+        self.flush()
+
+    def flush(self):
+        """
+        Sends as much of the outgoing buffer as the socket takes without blocking;
+        the rest goes out on later calls.
+        """
+        while self.outgoing:
+            try:
+                sent = self.sock.send(self.outgoing)
+            except BlockingIOError:
+                return
+            del self.outgoing[:sent]
+
+    def send_input(self, action):
+        self.send({"type": "input", "action": action})
+
+    # -------------- STATE --------------
+
+    def receive(self):
+        try:
+            data = self.sock.recv(65536)
+        except BlockingIOError:
+            return
+        if not data:
+            raise ConnectionError("server closed the connection")
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split(b"\n")
+        for line in lines:
+            self.apply(json.loads(line))
+
+    def apply(self, message):
+        if message["type"] == "error":
+            print(f"Server error: {message['message']}")
+            return
+        if message["type"] == "full":
+            self.session = message["session"]
+            grid = unpack_grid(message["grid"], message["rows"], message["cols"])
+            scale = (self.maze.scale_x, self.maze.scale_y) if self.maze else (0.0, 0.0)
+            self.maze = Maze.from_grid(grid)
+            self.maze.scale_x, self.maze.scale_y = scale
+            self.entities.clear()
+            self.enemies = []
+            for kind, type_name, x, y, flags in message["entities"]:
+                if kind == KIND_ENEMY:
+                    # Enemies are only drawn here, and every kind draws the same way
+                    self.enemies.append(Enemy(x, y, self.maze, store=self.entities))
+                elif kind == KIND_GEM:
+                    Collectible(x, y, bool(flags), store=self.entities)
+                else:
+                    PowerUp(x, y, type_name, bool(flags), store=self.entities)
+        else:
+            for slot, x, y, flags in message.get("entities", ()):
+                self.entities.xs[slot] = x
+                self.entities.ys[slot] = y
+                self.entities.flags[slot] = flags
+
+        if "level" in message:
+            self.current_level = message["level"]
+        if "score" in message:
+            self.score = message["score"]
+        if "time" in message:
+            self.level_time = message["time"]
+        if "player" in message:
+            self.player.x, self.player.y = message["player"]
+        if "exit" in message:
+            self.exit_x, self.exit_y = message["exit"]
+        if "invisible" in message:
+            self.is_invisible = message["invisible"]
+        if "speed" in message:
+            self.speed_boost_active = message["speed"]
+        if "game_over" in message:
+            self.game_over = message["game_over"]
+        self.events.extend(tuple(event) for event in message.get("events", ()))
+
+    # -------------- WORLD INTERFACE --------------
+
+    def update(self, dt):
+        self.flush()
+        self.receive()
+
+    def move_player(self, dx, dy):
+        for action, move in MOVES.items():
+            if move == (dx, dy):
+                self.send_input(action)
+
+    def activate_invisibility(self, duration=3.0):
+        self.send_input("invisible")
+
+    def restart(self):
+        self.send_input("restart")
+
+    def retry_level(self):
+        self.send_input("retry")
+
+    def rewind(self, ticks=1):
+        self.send_input("rewind")
+        return True
+
+    def pause(self):
+        self.send({"type": "pause"})
+
+    def resume(self):
+        self.send({"type": "resume"})
+
+    def drain_events(self):
+        events = self.events
+        self.events = []
+        return events
+
+    def close(self):
+        try:
+            self.sock.setblocking(True)
+            self.send({"type": "leave"})
+        except OSError:
+            pass
+        self.sock.close()
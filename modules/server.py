@@ -0,0 +1,430 @@
+# modules/server.py
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from collections import deque
+
+import numpy as np
+
+from modules.world import World
+
+# Client -> server messages are JSON lines:
+#   {"type": "join", "session": id or null, "seed": int or null}
+#   {"type": "input", "action": one of ACTIONS}
+#   {"type": "pause"} / {"type": "resume"}: stop / restart the session's clock
+#   {"type": "leave"}
+# Server -> client messages are JSON lines too: a "full" state on join and whenever
+# the level changes, then one "delta" per tick with only what changed, and
+#   {"type": "error", "message": str} for requests that can't be handled.
+MOVES = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0)}
+ACTIONS = set(MOVES) | {"invisible", "restart", "retry", "rewind"}
+
+# Fields of the scalar part of a state message
+SCALARS = ("level", "score", "time", "player", "exit", "invisible", "speed", "game_over")
+
+# Longest accepted client line, and most unsent bytes a client may fall behind by
+MAX_LINE = 64 * 1024
+MAX_BUFFERED = 256 * 1024
+# Seconds a session whose clients all disconnected (without "leave") is kept for them to rejoin
+SESSION_GRACE = 60.0
+
+
+def pack_grid(grid):
+    """
+    Encodes a maze grid as a hex string of packed bits (one bit per cell).
+    """
+    return np.packbits(grid.reshape(-1)).tobytes().hex()
+
+
+def unpack_grid(data, rows, cols):
+    bits = np.unpackbits(np.frombuffer(bytes.fromhex(data), dtype=np.uint8))
+    return bits[:rows*cols].reshape(rows, cols)
+
+
+def encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+class Session:
+    """
+    One headless World plus the clients watching it.
+    Inputs are queued as they arrive and applied at the start of the next tick,
+    so every client sees the same order of events. A paused session, or one
+    with no clients, does not tick.
+    """
+
+    def __init__(self, session_id, rows, cols, seed=None):
+        self.id = session_id
+        self.world = World(rows, cols, seed=seed, verbose=False)
+        self.clients = set()
+        self.inputs = deque()
+        self.tick = 0
+        self.paused = False
+        # When the last client disconnected; None while anyone is connected
+        self.empty_since = None
+        # What was last broadcast; deltas are computed against it
+        self.sent_layout = None
+        self.sent_scalars = None
+        self.sent_entities = None
+
+    def apply_inputs(self):
+        world = self.world
+        while self.inputs:
+            action = self.inputs.popleft()
+            if action in MOVES:
+                world.move_player(*MOVES[action])
+            elif action == "invisible":
+                world.activate_invisibility(3)
+            elif action == "restart":
+                world.restart()
+            elif action == "retry":
+                world.retry_level()
+            elif action == "rewind":
+                world.rewind(max(1, int(3.0 / world.enemy_move_interval)))
+
+    def scalars(self):
+        world = self.world
+        return {
+            "level": world.current_level,
+            "score": world.score,
+            "time": int(world.level_time),
+            "player": [world.player.x, world.player.y],
+            "exit": [world.exit_x, world.exit_y],
+            "invisible": world.is_invisible,
+            "speed": world.speed_boost_active,
+            "game_over": world.game_over,
+        }
+
+    def full_state(self):
+        """
+        The whole visible state: maze, every entity and the scalars.
+        Also resets the delta baseline to this state.
+        """
+        world = self.world
+        store = world.entities
+        self.sent_layout = (world.maze.layout_key(), bytes(store.kinds), bytes(store.types))
+        self.sent_scalars = self.scalars()
+        self.sent_entities = store.copy()
+        return {
+            "type": "full",
+            "session": self.id,
+            "tick": self.tick,
+            "rows": world.maze.rows,
+            "cols": world.maze.cols,
+            "grid": pack_grid(world.maze.grid),
+            "entities": [[store.kinds[i], store.type_name(i), store.xs[i], store.ys[i], store.flags[i]]
+                         for i in range(len(store))],
+            **self.sent_scalars,
+        }
+
+    def delta_state(self, events):
+        """
+        Only what changed since the last broadcast: scalars that differ and
+        [slot, x, y, flags] for every entity whose position or flags moved.
+        Falls back to a full state when the level layout changed. Returns None
+        if nothing changed.
+        """
+        world = self.world
+        store = world.entities
+        layout = (world.maze.layout_key(), bytes(store.kinds), bytes(store.types))
+        if layout != self.sent_layout:
+            message = self.full_state()
+            message["events"] = events
+            return message
+
+        scalars = self.scalars()
+        changed = {key: value for key, value in scalars.items() if self.sent_scalars[key] != value}
+        old = self.sent_entities
+        moved = ((store.view(store.xs, np.int32) != old.view(old.xs, np.int32)) |
+                 (store.view(store.ys, np.int32) != old.view(old.ys, np.int32)) |
+                 (store.view(store.flags, np.uint8) != old.view(old.flags, np.uint8)))
+        slots = np.flatnonzero(moved).tolist()
+        if not changed and not slots and not events:
+            return None
+        self.sent_scalars = scalars
+        old.restore(store)
+        message = {"type": "delta", "tick": self.tick, **changed}
+        if slots:
+            message["entities"] = [[i, store.xs[i], store.ys[i], store.flags[i]] for i in slots]
+        if events:
+            message["events"] = events
+        return message
+
+    def step(self, dt):
+        """
+        Applies queued inputs, advances the world by dt and returns the message
+        to broadcast (or None).
+        """
+        self.tick += 1
+        self.apply_inputs()
+        self.world.update(dt)
+        events = [list(event) for event in self.world.drain_events()]
+        return self.delta_state(events)
+
+
+class GameServer:
+    """
+    Runs many Sessions in one asyncio loop. Every tick each session applies its
+    inputs, updates and broadcasts its delta to the clients that joined it.
+    """
+
+    def __init__(self, rows=21, cols=21, tick_rate=20, session_grace=SESSION_GRACE):
+        self.rows = rows
+        self.cols = cols
+        self.tick_rate = tick_rate
+        self.session_grace = session_grace
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.servers = []
+        self.tick_seconds = deque(maxlen=1000)
+        self.bytes_sent = 0
+        self.dropped_clients = 0
+        self.running = False
+
+    def new_session(self, seed=None):
+        session = Session(next(self.ids), self.rows, self.cols, seed)
+        self.sessions[session.id] = session
+        return session
+
+    async def start_tcp(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE)
+        self.servers.append(server)
+        return server
+
+    async def start_unix(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.handle_client, path, limit=MAX_LINE)
+        self.servers.append(server)
+        return server
+
+    def send(self, writer, data):
+        """
+        Queues data for one client. Ticks never wait on a client, so one that has
+        fallen more than MAX_BUFFERED bytes behind is dropped instead of letting its
+        backlog grow; it can join its session again and gets a full state.
+        """
+        if writer.is_closing():
+            return
+        backlog = writer.transport.get_write_buffer_size()
+        if backlog and backlog + len(data) > MAX_BUFFERED:
+            self.dropped_clients += 1
+            # abort() discards the backlog; close() would keep it until it is sent
+            writer.transport.abort()
+            return
+        writer.write(data)
+        self.bytes_sent += len(data)
+
+    async def handle_client(self, reader, writer):
+        session = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than MAX_LINE; the stream can't be resynchronised
+                    self.send(writer, encode({"type": "error", "message": "line too long"}))
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    message = None
+                if not isinstance(message, dict):
+                    self.send(writer, encode({"type": "error", "message": "expected a JSON object"}))
+                    continue
+                kind = message.get("type")
+                if kind == "join" and session is None:
+                    session_id, seed = message.get("session"), message.get("seed")
+                    if not all(value is None or type(value) is int for value in (session_id, seed)):
+                        self.send(writer, encode({"type": "error", "message": "bad join"}))
+                        continue
+                    session = self.sessions.get(session_id)
+                    if session is None:
+                        session = self.new_session(seed)
+                    session.clients.add(writer)
+                    session.empty_since = None
+                    # Worlds only change inside ticks, so the current state is the baseline
+                    full = session.full_state()
+                    data = encode(full)
+                    self.send(writer, data)
+                    await writer.drain()
+                elif kind == "input" and session is not None:
+                    action = message.get("action")
+                    if isinstance(action, str) and action in ACTIONS:
+                        session.inputs.append(action)
+                elif kind in ("pause", "resume") and session is not None:
+                    session.paused = kind == "pause"
+                    session.inputs.clear()
+                elif kind == "leave":
+                    if session is not None:
+                        session.clients.discard(writer)
+                        if not session.clients:
+                            self.sessions.pop(session.id, None)
+                        session = None
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if session is not None:
+                session.clients.discard(writer)
+                if not session.clients:
+                    # Lost connection: keep the game for a while so the client can rejoin
+                    session.empty_since = time.monotonic()
+            writer.close()
+
+    def tick(self, dt):
+        start = time.perf_counter()
+        now = time.monotonic()
+        for session in list(self.sessions.values()):
+            if not session.clients:
+                if session.empty_since is not None and now - session.empty_since > self.session_grace:
+                    self.sessions.pop(session.id, None)
+                continue
+            if session.paused:
+                continue
+            message = session.step(dt)
+            if message is not None:
+                data = encode(message)
+                for writer in session.clients:
+                    self.send(writer, data)
+        self.tick_seconds.append(time.perf_counter() - start)
+
+    async def run(self):
+        """
+        Fixed-rate tick loop; late ticks are not made up, the next one is scheduled
+        a full interval after the previous deadline.
+        """
+        self.running = True
+        interval = 1.0 / self.tick_rate
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while self.running:
+            self.tick(interval)
+            deadline = max(deadline + interval, loop.time())
+            await asyncio.sleep(deadline - loop.time())
+
+    async def close(self):
+        self.running = False
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+
+
+# -------------- SIMULATED CLIENTS --------------
+
+async def simulated_client(connect, seconds, actions_per_second=4.0, seed=None):
+    """
+    Joins a new session, sends random moves for `seconds` and reads every broadcast.
+    connect is a coroutine function returning (reader, writer).
+    Returns the number of messages received.
+    """
+    rng = random.Random(seed)
+    reader, writer = await connect()
+    writer.write(encode({"type": "join", "session": None, "seed": seed}))
+    received = 0
+
+    async def read():
+        nonlocal received
+        while await reader.readline():
+            received += 1
+
+    reading = asyncio.create_task(read())
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        action = rng.choice(list(MOVES)) if rng.random() > 0.05 else "restart"
+        writer.write(encode({"type": "input", "action": action}))
+        await writer.drain()
+        await asyncio.sleep(1.0 / actions_per_second)
+    writer.write(encode({"type": "leave"}))
+    await writer.drain()
+    await reading
+    writer.close()
+    return received
+
+
+async def run_benchmark(sessions, seconds, tick_rate, rows, cols, unix_path=None):
+    server = GameServer(rows, cols, tick_rate)
+    if unix_path:
+        await server.start_unix(unix_path)
+
+        def connect():
+            return asyncio.open_unix_connection(unix_path)
+    else:
+        tcp = await server.start_tcp("127.0.0.1", 0)
+        port = tcp.sockets[0].getsockname()[1]
+
+        def connect():
+            return asyncio.open_connection("127.0.0.1", port)
+
+    ticking = asyncio.create_task(server.run())
+    cpu_start = time.process_time()
+    received = await asyncio.gather(*(simulated_client(connect, seconds, seed=i)
+                                      for i in range(sessions)))
+    cpu = time.process_time() - cpu_start
+    await server.close()
+    await ticking
+    if unix_path and os.path.exists(unix_path):
+        os.unlink(unix_path)
+
+    ticks = sorted(server.tick_seconds)
+    mean_tick = sum(ticks) / len(ticks) if ticks else 0.0
+    budget = 1.0 / tick_rate
+    return {
+        "sessions": sessions,
+        "ticks": len(ticks),
+        "mean_tick_ms": mean_tick * 1000,
+        "p99_tick_ms": ticks[int(len(ticks) * 0.99) - 1] * 1000 if ticks else 0.0,
+        "messages": sum(received),
+        "kbytes_per_session_s": server.bytes_sent / 1024 / max(1, sessions) / seconds,
+        "dropped_clients": server.dropped_clients,
+        "cpu_s": cpu,
+        # Sessions one core could tick within the budget, counting only tick work
+        "sessions_per_core": sessions * budget / mean_tick if mean_tick else float("inf"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-session maze game server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--rows", type=int, default=21)
+    parser.add_argument("--cols", type=int, default=21)
+    parser.add_argument("--tick-rate", type=int, default=20)
+    parser.add_argument("--bench", type=int, default=0, metavar="SESSIONS",
+                        help="run a load benchmark with this many simulated clients")
+    parser.add_argument("--seconds", type=float, default=5.0, help="benchmark duration")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        report = asyncio.run(run_benchmark(args.bench, args.seconds, args.tick_rate,
+                                           args.rows, args.cols, args.unix))
+        for key, value in report.items():
+            print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+        return
+
+    async def serve():
+        server = GameServer(args.rows, args.cols, args.tick_rate)
+        if args.unix:
+            await server.start_unix(args.unix)
+            print(f"Serving on {args.unix}")
+        else:
+            await server.start_tcp(args.host, args.port)
+            print(f"Serving on {args.host}:{args.port}")
+        await server.run()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# modules/sim_thread.py
+
+import argparse
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import nullcontext
+
+from modules.world import World
+from modules.input_queue import apply_input
+
+# One published state: the tick it was taken at, an immutable WorldSnapshot, how
+# many input actions it includes (LatencyTracker.applied_count) and, in darkness
+# mode, a read-only copy of the fog's explored grid (None otherwise)
+Frame = namedtuple("Frame", ["tick", "snapshot", "inputs", "explored"])
+
+
+class SimThread:
+    """
+    Runs a World on its own thread at a fixed tick rate, independent of the frame rate.
+    Other threads never touch the World: they post commands, which the sim thread
+    applies between ticks, and read published snapshots.
+    After every tick (and every command) the sim thread writes a Frame into the back
+    slot of a two-slot buffer and then flips the front index. Frames are immutable
+    and the flip is a single reference store, so readers need no lock: they see either
+    the previous frame or the new one, never a half-written one.
+    """
+
+    def __init__(self, world, tick_rate=60, on_events=None, max_lag_ticks=5,
+                 inputs=None, latency=None, memory=None):
+        """
+        :param world: The World to simulate; owned by the sim thread once started
+        :param on_events: Called with each batch of world events, on the thread
+                          that calls dispatch()
+        :param max_lag_ticks: Ticks the loop may fall behind before it stops catching up
+        :param inputs: InputQueue drained at the start of every active tick
+        :param latency: LatencyTracker told about every input action applied
+        :param memory: MemoryMonitor (modules.memory_profile) that measures every
+                       active tick as "sim" and checks for a level boundary after it
+        """
+        self.world = world
+        self.inputs = inputs
+        self.latency = latency
+        self.memory = memory
+        self.dt = 1.0 / tick_rate
+        self.on_events = on_events
+        self.max_lag_ticks = max_lag_ticks
+        # When False the sim keeps applying commands but game time stands still
+        self.active = False
+
+        self.inbox = queue.SimpleQueue()
+        # (callback, argument) pairs for dispatch(); deque appends/pops are thread-safe
+        self.outbox = deque()
+        self.buffers = [None, None]
+        self.front = 0
+        # tick numbers published frames (commands publish too); ticks counts sim steps
+        self.tick = 0
+        self.ticks = 0
+        self.tick_seconds = deque(maxlen=600)
+        self.stopped = False
+        # Last published explored grid and the fog version it was copied at
+        self.explored = None
+        self.explored_version = None
+        self.publish()
+
+        # Render-side copy of the world, restored from the front frame (see view)
+        self.mirror = World(world.maze.rows, world.maze.cols, seed=world.maze.seed, history_size=0,
+                            verbose=False, darkness=world.fog is not None,
+                            sight_radius=world.sight_radius)
+        self.mirror.maze.scale_x, self.mirror.maze.scale_y = world.maze.scale_x, world.maze.scale_y
+        self.mirror_tick = -1
+        self.view_frame = self.latest()
+
+        self.thread = threading.Thread(target=self.run, name="sim", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    # -------------- CALLER SIDE --------------
+
+    def post(self, fn, *args, then=None):
+        """
+        Queues fn(world, *args) to run on the sim thread. If then is given,
+        dispatch() later calls then(result) on the caller's thread.
+        """
+        self.inbox.put((fn, args, then))
+
+    def latest(self):
+        """
+        The most recently published Frame.
+        """
+        return self.buffers[self.front]
+
+    def view(self):
+        """
+        A World that mirrors the latest frame, for rendering. It is only updated
+        by this call, so grab it once per frame and draw everything from it.
+        """
+        frame = self.latest()
+        if frame.tick != self.mirror_tick:
+            self.mirror.restore(frame.snapshot)
+            if frame.explored is not None and self.mirror.fog is not None:
+                # The mirror only looks from rendered frames; the sim saw every tick
+                self.mirror.fog.adopt_explored(frame.explored)
+            self.mirror_tick = frame.tick
+        self.view_frame = frame
+        return self.mirror
+
+    def dispatch(self):
+        """
+        Runs the callbacks of finished commands and hands new world events to
+        on_events. Call from the thread that posts commands (e.g. once per frame).
+        """
+        while self.outbox:
+            callback, arg = self.outbox.popleft()
+            if isinstance(arg, BaseException):
+                raise arg
+            callback(arg)
+
+    def close(self):
+        """
+        Stops the loop after it has applied everything already posted.
+        """
+        self.stopped = True
+        self.inbox.put(None)
+        if self.thread.is_alive():
+            self.thread.join()
+        else:
+            self.apply_commands()
+        self.dispatch()
+
+    # -------------- SIM SIDE --------------
+
+    def publish(self):
+        back = 1 - self.front
+        inputs = self.latency.applied_count if self.latency is not None else 0
+        fog = self.world.fog
+        if fog is not None and fog.version != self.explored_version:
+            # Copied only when the fog changed; frames share it otherwise
+            self.explored = fog.explored.copy()
+            self.explored.flags.writeable = False
+            self.explored_version = fog.version
+        self.buffers[back] = Frame(self.tick, self.world.snapshot(), inputs, self.explored)
+        self.front = back
+
+    def apply(self, command):
+        fn, args, then = command
+        try:
+            result = fn(self.world, *args)
+        except Exception as e:
+            self.outbox.append((None, e))
+            return
+        if then is not None:
+            self.outbox.append((then, result))
+
+    def apply_commands(self):
+        applied = False
+        while True:
+            try:
+                command = self.inbox.get_nowait()
+            except queue.Empty:
+                return applied
+            if command is not None:
+                self.apply(command)
+                applied = True
+
+    def collect_events(self):
+        events = self.world.drain_events()
+        if events and self.on_events is not None:
+            self.outbox.append((self.on_events, events))
+
+    def apply_inputs(self):
+        for action, origin in self.inputs.drain():
+            apply_input(self.world, action)
+            if self.latency is not None:
+                self.latency.applied(origin)
+
+    def step(self):
+        """
+        One tick: pending commands, then queued input and dt of game time if active,
+        then publish.
+        """
+        start = time.perf_counter()
+        self.apply_commands()
+        if self.active:
+            with self.memory.measure("sim") if self.memory is not None else nullcontext():
+                if self.inputs is not None:
+                    self.apply_inputs()
+                self.world.update(self.dt)
+        self.collect_events()
+        if self.memory is not None:
+            self.memory.check(self.world)
+        self.tick += 1
+        self.ticks += 1
+        self.publish()
+        self.tick_seconds.append(time.perf_counter() - start)
+
+    def run(self):
+        next_tick = time.perf_counter()
+        while not self.stopped:
+            self.step()
+            next_tick += self.dt
+            # Wait for the next tick, but apply commands as they arrive so input
+            # doesn't sit in the queue for up to a tick
+            while True:
+                remaining = next_tick - time.perf_counter()
+                if remaining <= 0 or self.stopped:
+                    break
+                try:
+                    command = self.inbox.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if command is None:
+                    continue
+                self.apply(command)
+                self.apply_commands()
+                self.collect_events()
+                self.tick += 1
+                self.publish()
+            if time.perf_counter() - next_tick > self.max_lag_ticks * self.dt:
+                # Too far behind (e.g. a stall): drop the backlog instead of fast-forwarding
+                next_tick = time.perf_counter()
+        self.apply_commands()
+        self.collect_events()
+        self.tick += 1
+        self.publish()
+
+
+def main(argv=None):
+    from modules.raster import Framebuffer, render_world
+    parser = argparse.ArgumentParser(description="Run the threaded sim against a software render loop.")
+    parser.add_argument("--rows", type=int, default=21)
+    parser.add_argument("--cols", type=int, default=21)
+    parser.add_argument("--tick-rate", type=int, default=60)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    world = World(args.rows, args.cols, seed=args.seed, verbose=False)
+    sim = SimThread(world, args.tick_rate, on_events=lambda events: None)
+    sim.active = True
+    sim.start()
+    fb = Framebuffer(800, 600)
+    scale_x, scale_y = 800 / world.maze.cols, 540 / world.maze.rows
+    moves = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+    frames = 0
+    gaps = []
+    start = last = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        sim.post(World.move_player, *moves[frames % 4])
+        render_world(fb, sim.view(), scale_x, scale_y)
+        sim.dispatch()
+        frames += 1
+        time.sleep(max(0.0, 1 / args.fps - (time.perf_counter() - last)))
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+    elapsed = time.perf_counter() - start
+    sim.close()
+    ticks = sorted(sim.tick_seconds)
+    print(f"{sim.ticks / elapsed:.1f} ticks/s (target {args.tick_rate}), "
+          f"{sim.tick / elapsed:.1f} published states/s, "
+          f"{frames / elapsed:.1f} frames/s (target {args.fps})")
+    print(f"longest frame gap {max(gaps)*1000:.1f} ms, "
+          f"p99 tick {ticks[int(len(ticks)*0.99)]*1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# modules/solver.py
+
+import argparse
+import heapq
+import itertools
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.world import World
+from modules.pathfinding import flatten_grid, distance_field
+
+# path: list of (x, y) cells after the start (or actions for timed search), None if unsolved
+SolveResult = namedtuple("SolveResult", ["strategy", "path", "length", "nodes", "seconds"])
+
+MOVES = [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# Above this many gems the exact Held-Karp plan gets too slow; fall back to 2-opt
+MAX_EXACT_GEMS = 12
+
+
+def cells_to_xy(path, cols):
+    return [(cell % cols, cell // cols) for cell in path]
+
+
+def solve_exit_bfs(world):
+    """
+    Shortest path from the player to the exit with plain BFS, ignoring enemies.
+    """
+    start_time = time.perf_counter()
+    walls = flatten_grid(world.maze)
+    cols = world.maze.cols
+    start = world.player.y*cols + world.player.x
+    goal = world.exit_y*cols + world.exit_x
+
+    came_from = {start: -1}
+    frontier = deque([start])
+    nodes = 0
+    while frontier:
+        current = frontier.popleft()
+        nodes += 1
+        if current == goal:
+            break
+        cx = current % cols
+        for n in (current - 1 if cx > 0 else -1, current + 1 if cx < cols - 1 else -1,
+                  current - cols, current + cols):
+            if 0 <= n < len(walls) and not walls[n] and n not in came_from:
+                came_from[n] = current
+                frontier.append(n)
+
+    path = None
+    if goal in came_from:
+        path = []
+        n = goal
+        while n != start:
+            path.append(n)
+            n = came_from[n]
+        path = cells_to_xy(path[::-1], cols)
+    return SolveResult("bfs", path, len(path) if path is not None else -1,
+                       nodes, time.perf_counter() - start_time)
+
+
+def solve_exit_astar(world):
+    """
+    Shortest path from the player to the exit with A* (Manhattan heuristic), ignoring enemies.
+    """
+    start_time = time.perf_counter()
+    walls = flatten_grid(world.maze)
+    cols = world.maze.cols
+    start = world.player.y*cols + world.player.x
+    goal = world.exit_y*cols + world.exit_x
+    gx, gy = world.exit_x, world.exit_y
+
+    frontier = [(0, start)]
+    came_from = {start: -1}
+    cost = {start: 0}
+    nodes = 0
+    while frontier:
+        _, current = heapq.heappop(frontier)
+        nodes += 1
+        if current == goal:
+            break
+        cx = current % cols
+        for n in (current - 1 if cx > 0 else -1, current + 1 if cx < cols - 1 else -1,
+                  current - cols, current + cols):
+            if n < 0 or n >= len(walls) or walls[n]:
+                continue
+            new_cost = cost[current] + 1
+            if n not in cost or new_cost < cost[n]:
+                cost[n] = new_cost
+                came_from[n] = current
+                priority = new_cost + abs(gx - n % cols) + abs(gy - n // cols)
+                heapq.heappush(frontier, (priority, n))
+
+    path = None
+    if goal in came_from:
+        path = []
+        n = goal
+        while n != start:
+            path.append(n)
+            n = came_from[n]
+        path = cells_to_xy(path[::-1], cols)
+    return SolveResult("astar", path, len(path) if path is not None else -1,
+                       nodes, time.perf_counter() - start_time)
+
+
+def search_copy(world):
+    """
+    A quiet World of its own in the state of world, for searches that step the
+    simulation: finishing the level there starts a new level (replacing the
+    maze, level_start and history), which must not happen to the caller's world.
+    """
+    maze = world.maze
+    copy = World(maze.rows, maze.cols, seed=maze.seed, history_size=0, verbose=False,
+                 darkness=world.fog is not None, sight_radius=world.sight_radius,
+                 cooperative=world.planner is not None)
+    copy.enemy_move_interval = world.enemy_move_interval
+    # The next level must come from the same place as in the real game
+    copy.level_source = world.level_source
+    copy.restore(world.snapshot())
+    return copy
+
+
+def solve_exit_timed(world, seconds_per_move=0.25, max_nodes=50000, weight=2.0):
+    """
+    Time-expanded A* to the exit that avoids enemies.
+    Each node is a world snapshot; children take one of five player actions
+    (stay or a step) and then advance the world by seconds_per_move, so enemy
+    positions are simulated, not guessed.
+    Nodes are ordered by moves so far + weight * maze distance to the exit
+    (weight > 1 trades optimality for far fewer expansions; the question is usually
+    "is there a route in time", not "what is the best one"), and merged on
+    (player cell, entity positions and phases, collected flags).
+    Returns a SolveResult whose path is the list of (dx, dy) actions, one per move.
+    The search runs on a search_copy, so world is left as it was.
+    """
+    start_time = time.perf_counter()
+    world = search_copy(world)
+    origin = world.snapshot()
+    level = world.current_level
+    cols = world.maze.cols
+    to_exit = distance_field(flatten_grid(world.maze), cols, world.exit_y*cols + world.exit_x)
+
+    def key():
+        # Positions alone are not enough: a patroller passes a cell in both directions,
+        # and enemies are only due to move at certain phases of the clock
+        now = world.time
+        phases = tuple(round(min(now - en.last_move_time, en.speed), 3) for en in world.enemies)
+        patrols = tuple((en.route_index, en.wait_ticks) for en in world.enemies
+                        if hasattr(en, "route_index"))
+        return (world.player.x, world.player.y, bytes(world.entities.xs),
+                bytes(world.entities.ys), bytes(world.entities.flags), patrols, phases,
+                round(min(now - world.last_enemy_move_time, world.enemy_move_interval), 3))
+
+    seen = {key()}
+    counter = itertools.count()
+    start_h = to_exit[world.player.y*cols + world.player.x]
+    frontier = [(weight*start_h, 0, next(counter), origin, ())]
+    nodes = 0
+    found = None
+    while frontier and nodes < max_nodes and found is None:
+        _, _, _, snap, actions = heapq.heappop(frontier)
+        for dx, dy in MOVES:
+            nodes += 1
+            world.restore(snap)
+            world.events = []
+            if dx or dy:
+                world.move_player(dx, dy)
+            if world.current_level != level:
+                found = actions + ((dx, dy),)
+                break
+            world.update(seconds_per_move)
+            if world.game_over:
+                continue
+            k = key()
+            if k in seen:
+                continue
+            seen.add(k)
+            g = len(actions) + 1
+            h = to_exit[world.player.y*cols + world.player.x]
+            # Ties go to the deeper node
+            heapq.heappush(frontier, (g + weight*h, -g, next(counter),
+                                      world.snapshot(), actions + ((dx, dy),)))
+
+    return SolveResult("timed", list(found) if found is not None else None,
+                       len(found) if found is not None else -1,
+                       nodes, time.perf_counter() - start_time)
+
+
+def plan_gems(world):
+    """
+    Shortest tour from the player through every uncollected gem and then to the exit,
+    using maze distances (one BFS distance field per point of interest).
+    Exact Held-Karp DP up to MAX_EXACT_GEMS gems, nearest neighbour + 2-opt above that.
+    Returns a SolveResult whose path is the gem visiting order as (x, y) cells.
+    """
+    start_time = time.perf_counter()
+    walls = flatten_grid(world.maze)
+    cols = world.maze.cols
+    gems = [(c.x, c.y) for c in world.collectibles if not c.collected]
+    points = [(world.player.x, world.player.y)] + gems + [(world.exit_x, world.exit_y)]
+    fields = [distance_field(walls, cols, y*cols + x) for x, y in points]
+    dist = [[fields[i][y*cols + x] for x, y in points] for i in range(len(points))]
+    nodes = len(points)
+
+    n = len(gems)
+    exit_index = n + 1
+    if any(d < 0 for d in dist[0]):
+        return SolveResult("gems", None, -1, nodes, time.perf_counter() - start_time)
+
+    if n == 0:
+        order, length = [], dist[0][exit_index]
+    elif n <= MAX_EXACT_GEMS:
+        # best[mask][i]: shortest walk from the start covering mask, ending at gem i
+        inf = float("inf")
+        best = [[inf]*n for _ in range(1 << n)]
+        parent = [[-1]*n for _ in range(1 << n)]
+        for i in range(n):
+            best[1 << i][i] = dist[0][i + 1]
+        for mask in range(1, 1 << n):
+            row = best[mask]
+            for i in range(n):
+                if row[i] == inf:
+                    continue
+                nodes += 1
+                for j in range(n):
+                    if mask & (1 << j):
+                        continue
+                    cand = row[i] + dist[i + 1][j + 1]
+                    nmask = mask | (1 << j)
+                    if cand < best[nmask][j]:
+                        best[nmask][j] = cand
+                        parent[nmask][j] = i
+        full = (1 << n) - 1
+        last = min(range(n), key=lambda i: best[full][i] + dist[i + 1][exit_index])
+        length = best[full][last] + dist[last + 1][exit_index]
+        order = []
+        mask = full
+        while last >= 0:
+            order.append(last)
+            mask, last = mask ^ (1 << last), parent[mask][last]
+        order.reverse()
+    else:
+        order, length, nodes = tour_2opt(dist, n, nodes)
+
+    return SolveResult("gems", [gems[i] for i in order], length,
+                       nodes, time.perf_counter() - start_time)
+
+
+def tour_2opt(dist, n, nodes):
+    """
+    Nearest-neighbour tour over gems 0..n-1 (point i+1 in dist), improved with 2-opt.
+    """
+    exit_index = n + 1
+    order = []
+    left = set(range(n))
+    current = 0
+    while left:
+        nxt = min(left, key=lambda j: dist[current][j + 1])
+        order.append(nxt)
+        left.discard(nxt)
+        current = nxt + 1
+
+    def tour_length(o):
+        stops = [0] + [i + 1 for i in o] + [exit_index]
+        return sum(dist[a][b] for a, b in zip(stops, stops[1:]))
+
+    length = tour_length(order)
+    improved = True
+    while improved:
+        improved = False
+        for i, j in itertools.combinations(range(n), 2):
+            nodes += 1
+            cand = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+            cand_length = tour_length(cand)
+            if cand_length < length:
+                order, length, improved = cand, cand_length, True
+    return order, length, nodes
+
+
+def check_level(seed, rows=21, cols=21, seconds_per_move=0.25, timed=True, max_nodes=50000):
+    """
+    Builds the level for seed and reports whether it is winnable within level_time:
+    exit reachable, all gems collectible on the way, and (if timed) a route that
+    survives the simulated enemies. seconds_per_move is the assumed player pace.
+    """
+    world = World(rows, cols, seed=seed, verbose=False)
+    results = [solve_exit_bfs(world), solve_exit_astar(world), plan_gems(world)]
+    if timed:
+        results.append(solve_exit_timed(world, seconds_per_move, max_nodes))
+    by_name = {r.strategy: r for r in results}
+
+    gems = by_name["gems"]
+    winnable = (by_name["bfs"].path is not None and gems.path is not None and
+                gems.length*seconds_per_move <= world.level_time)
+    if timed:
+        timed_result = by_name["timed"]
+        winnable = winnable and (timed_result.path is not None and
+                                 timed_result.length*seconds_per_move <= world.level_time)
+    return {
+        "seed": seed,
+        "winnable": winnable,
+        "exit_length": by_name["bfs"].length,
+        "gem_tour_length": gems.length,
+        "stats": {r.strategy: (r.nodes, r.seconds) for r in results},
+    }
+
+
+def check_seeds(seeds, rows=21, cols=21, workers=None, timed=True, max_nodes=50000):
+    """
+    Runs check_level over many seeds in a process pool. Returns the reports in seed order.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(check_level, seed, rows, cols, timed=timed, max_nodes=max_nodes)
+                   for seed in seeds]
+        return [f.result() for f in futures]
+
+
+def summarize(reports):
+    """
+    Per-strategy mean node count and wall time, plus the seeds that failed.
+    """
+    totals = {}
+    for report in reports:
+        for name, (nodes, seconds) in report["stats"].items():
+            n, s, count = totals.get(name, (0, 0.0, 0))
+            totals[name] = (n + nodes, s + seconds, count + 1)
+    lines = []
+    for name, (nodes, seconds, count) in sorted(totals.items()):
+        lines.append(f"{name:>6}: {nodes/count:10.1f} nodes  {seconds/count*1000:8.3f} ms")
+    rejected = [r["seed"] for r in reports if not r["winnable"]]
+    return lines, rejected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check generated levels are winnable.")
+    parser.add_argument("--seeds", type=int, default=100, help="number of seeds to check")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=21)
+    parser.add_argument("--cols", type=int, default=21)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-timed", action="store_true", help="skip the enemy-aware search")
+    parser.add_argument("--max-nodes", type=int, default=50000,
+                        help="node budget of the enemy-aware search per level")
+    args = parser.parse_args(argv)
+
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    start = time.perf_counter()
+    reports = check_seeds(seeds, args.rows, args.cols, args.workers, not args.no_timed, args.max_nodes)
+    lines, rejected = summarize(reports)
+    print(f"Checked {len(reports)} levels in {time.perf_counter() - start:.2f}s")
+    for line in lines:
+        print(line)
+    print(f"Unwinnable seeds ({len(rejected)}): {rejected}")
+
+
+if __name__ == "__main__":
+    main()
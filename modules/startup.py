@@ -0,0 +1,115 @@
+# modules/startup.py
+
+import time
+
+# Taken when this module is first imported; main.py imports it before anything else
+_STARTED = time.perf_counter()
+
+import os
+import sys
+
+
+class StartupTimer:
+    """
+    Wall time of each startup phase. mark(name) closes the phase that ran since
+    the previous mark on the main thread; record() adds work done off the main
+    thread, which is reported separately since it overlaps the other phases.
+    """
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.last = self.start
+        self.phases = []
+        self.background = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def record(self, name, seconds):
+        self.background.append((name, seconds))
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def report(self):
+        lines = [f"{name:>20}: {seconds*1000:8.1f} ms" for name, seconds in self.phases]
+        lines.append(f"{'total':>20}: {(self.last - self.start)*1000:8.1f} ms")
+        lines += [f"{name + ' (bg)':>20}: {seconds*1000:8.1f} ms" for name, seconds in self.background]
+        return "\n".join(lines)
+
+
+timer = StartupTimer(_STARTED)
+
+
+# -------------- BENCHMARK --------------
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_process(code, runs):
+    """
+    Median wall time in seconds of a fresh interpreter running code from the repo root.
+    """
+    import statistics
+    import subprocess
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def first_frame_ms(runs):
+    """
+    Median time to the first menu frame reported by main.py --first-frame-exit,
+    or None when there is no display to open a window on.
+    """
+    import statistics
+    import subprocess
+    if not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+        return None
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "main.py", "--first-frame-exit"], cwd=ROOT,
+                             check=True, capture_output=True, text=True).stdout
+        for line in out.splitlines():
+            if line.strip().startswith("first menu frame:"):
+                samples.append(float(line.split(":")[1].split()[0]))
+    return statistics.median(samples) if samples else None
+
+
+def main(argv=None):
+    # The timer above is imported first thing by the game, so the benchmark's
+    # own imports stay in here
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark cold start and guard it against a budget.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="fail if importing the game takes longer than this")
+    args = parser.parse_args(argv)
+
+    results = {
+        "python": time_process("pass", args.runs),
+        "import main": time_process("import main", args.runs),
+        "import world": time_process("import modules.world", args.runs),
+        "build world": time_process("from modules.world import World; World(verbose=False)", args.runs),
+    }
+    for name, seconds in results.items():
+        print(f"{name:>14}: {seconds*1000:8.1f} ms")
+    frame = first_frame_ms(args.runs)
+    print(f"{'first frame':>14}: " + (f"{frame:8.1f} ms" if frame is not None else "(no display)"))
+
+    if args.budget_ms is not None:
+        spent = (results["import main"] - results["python"]) * 1000
+        if spent > args.budget_ms:
+            print(f"Importing the game took {spent:.1f} ms, over the {args.budget_ms:.1f} ms budget")
+            return 1
+        print(f"Importing the game took {spent:.1f} ms, within the {args.budget_ms:.1f} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+# modules/text.py
+
+import ctypes
+import sys
+
+from OpenGL.GL import *
+from modules.assets import font as cached_font, HELVETICA_18, HELVETICA_12
+
+# GLUT names of the fonts, for when a font isn't in the cache
+GLUT_FONTS = {HELVETICA_18: "GLUT_BITMAP_HELVETICA_18", HELVETICA_12: "GLUT_BITMAP_HELVETICA_12"}
+
+_glut = None
+
+
+def glut():
+    """
+    The GLUT module, imported and initialised on first use. Only needed when a
+    font can't be drawn from the glyph cache.
+    """
+    global _glut
+    if _glut is None:
+        from OpenGL import GLUT
+        GLUT.glutInit(sys.argv[:1])
+        _glut = GLUT
+    return _glut
+
+
+def render_text(x, y, text, font, color=(1.0, 1.0, 1.0)):
+    """
+    Renders bitmap text at (x, y). font is HELVETICA_18 or HELVETICA_12; glyphs are
+    drawn with glBitmap the way glutBitmapCharacter does.
+    """
+    glColor3f(*color)
+    glRasterPos2f(x, y)
+    f = cached_font(font)
+    if f is None:
+        g = glut()
+        handle = getattr(g, GLUT_FONTS[font])
+        for char in text:
+            g.glutBitmapCharacter(handle, ord(char))
+        return
+    glPushClientAttrib(GL_CLIENT_PIXEL_STORE_BIT)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    for char in text:
+        glyph = f.glyphs.get(ord(char))
+        if glyph is not None:
+            width, bits = glyph
+            glBitmap(width, f.height, f.xorig, f.yorig, width, 0.0, bits)
+    glPopClientAttrib()
+
+
+def text_width(text, font):
+    """
+    Width of text in pixels, as glutBitmapLength would report it.
+    """
+    f = cached_font(font)
+    if f is None:
+        g = glut()
+        buffer = ctypes.create_string_buffer(text.encode())
+        return g.glutBitmapLength(getattr(g, GLUT_FONTS[font]),
+                                  ctypes.cast(buffer, ctypes.POINTER(ctypes.c_ubyte)))
+    return f.width(text)
@@ -1,16 +1,54 @@
 # modules/utils.py
 
-from OpenGL.GL import *
-from OpenGL.GLUT import *
+import math
 
-def render_text(x, y, text, font, color=(1.0, 1.0, 1.0)):
+# numpy and OpenGL are imported inside the functions that need them: this module
+# is on the path to the first menu frame and to every headless tool
+
+def draw_points(points):
     """
-    Renders bitmap text at (x, y).
+    Draws an (N, 2) array of GL coordinates as GL_POINTS in a single call.
     """
-    glColor3f(*color)
-    glRasterPos2f(x, y)
-    for char in text:
-        glutBitmapCharacter(font, ord(char))
+    import numpy as np
+    from OpenGL.GL import (glEnableClientState, glVertexPointer, glDrawArrays,
+                           glDisableClientState, GL_VERTEX_ARRAY, GL_FLOAT, GL_POINTS)
+    if len(points) == 0:
+        return
+    verts = np.ascontiguousarray(points, dtype=np.float32)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, verts)
+    glDrawArrays(GL_POINTS, 0, len(verts))
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+def draw_lines(vertices):
+    """
+    Draws an (2N, 2) array of GL coordinates as N GL_LINES segments in a single call.
+    """
+    import numpy as np
+    from OpenGL.GL import (glEnableClientState, glVertexPointer, glDrawArrays,
+                           glDisableClientState, GL_VERTEX_ARRAY, GL_FLOAT, GL_LINES)
+    if len(vertices) == 0:
+        return
+    verts = np.ascontiguousarray(vertices, dtype=np.float32)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, verts)
+    glDrawArrays(GL_LINES, 0, len(verts))
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+def sprite_points(centers, offsets, scale_x, scale_y, maze_cols, maze_rows):
+    """
+    Places one sprite shape at many grid cells at once.
+    centers: (N, 2) grid positions; offsets: (M, 2) shape points in sprite units
+    (one unit = a tenth of a cell). Returns an (N*M, 2) array of GL coordinates.
+    """
+    import numpy as np
+    centers = np.asarray(centers, dtype=np.float32).reshape(-1, 2)
+    offsets = np.asarray(offsets, dtype=np.float32).reshape(-1, 2)
+    gl_centers = np.empty_like(centers)
+    gl_centers[:, 0] = (centers[:, 0] - maze_cols/2)*scale_x
+    gl_centers[:, 1] = (maze_rows/2 - centers[:, 1])*scale_y
+    gl_offsets = offsets * np.array([scale_x/10, scale_y/10], dtype=np.float32)
+    return (gl_centers[:, None, :] + gl_offsets[None, :, :]).reshape(-1, 2)
 
 def midpoint_circle(cx, cy, radius):
     """
@@ -83,3 +121,171 @@ def midpoint_line(x0, y0, x1, y1):
     return points
 
 
+def midpoint_lines(segments, return_counts=False):
+    """
+    Batch midpoint_line: segments is an (N, 4) array of integer (x0, y0, x1, y1).
+    Returns one (P, 2) int32 array holding every segment's points, in the same
+    order as calling midpoint_line on each segment in turn (and with
+    return_counts, the number of points of each segment).
+    Along the major axis point k is at start + k*step. The scalar error term
+    stays in [0, d_major) after each step, so the minor coordinate has moved
+    ceil((2*k*d_minor - d_major) / (2*d_major)) times, which needs no loop.
+    """
+    import numpy as np
+    seg = np.asarray(segments, dtype=np.int64).reshape(-1, 4)
+    x0, y0, x1, y1 = seg.T
+    dx, dy = np.abs(x1 - x0), np.abs(y1 - y0)
+    sx = np.where(x0 > x1, -1, 1)
+    sy = np.where(y0 > y1, -1, 1)
+    x_major = dy <= dx
+    major = np.where(x_major, dx, dy)
+    minor = np.where(x_major, dy, dx)
+    counts = major + 1
+
+    starts = np.cumsum(counts) - counts
+    k = np.arange(counts.sum()) - np.repeat(starts, counts)
+    major_k = np.repeat(major, counts)
+    # ceil(a / b) as -((-a) // b); a single-point segment (major 0) never moves
+    steps = -((major_k - 2*k*np.repeat(minor, counts)) // np.maximum(2*major_k, 1))
+    along = np.repeat(x_major, counts)
+    points = np.empty((len(k), 2), dtype=np.int32)
+    points[:, 0] = np.repeat(x0, counts) + np.repeat(sx, counts)*np.where(along, k, steps)
+    points[:, 1] = np.repeat(y0, counts) + np.repeat(sy, counts)*np.where(along, steps, k)
+    if return_counts:
+        return points, counts
+    return points
+
+def midpoint_circles(centers, radii):
+    """
+    Batch midpoint_circle: centers is an (N, 2) integer array, radii a scalar or
+    N integers. Returns one (P, 2) int32 array of every circle's points, in the
+    order midpoint_circle gives them circle by circle.
+    The scalar decision variable is x*x - x + (y+1)**2 - r*r, so for each y
+    it keeps the largest x with x*x - x + y*y <= r*r; that is computed for every
+    y at once, and the loop's stopping rule becomes a mask.
+    """
+    import numpy as np
+    centers = np.asarray(centers, dtype=np.int64).reshape(-1, 2)
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.int64), (len(centers),))
+    r = np.maximum(radii, 0)
+
+    # Candidate octant rows y = 1..r of every circle
+    owner = np.repeat(np.arange(len(r)), r)
+    y = np.arange(r.sum()) - np.repeat(np.cumsum(r) - r, r) + 1
+    rr = r[owner]
+
+    def column(y):
+        # Largest x with x*x - x <= rr*rr - y*y, i.e. (1 + isqrt(4*(rr*rr - y*y) + 1)) // 2
+        n = 4*(rr*rr - y*y) + 1
+        root = np.sqrt(n.astype(np.float64)).astype(np.int64)
+        root -= root*root > n
+        root += (root + 1)*(root + 1) <= n
+        return (1 + root) // 2
+
+    x = column(y)
+    x_prev = np.where(y == 1, rr, column(y - 1))
+    emitted = (x >= y) & (x_prev > y - 1)
+    # x only shrinks as y grows, so once a row fails every later row fails too:
+    # the mask is a prefix of each circle's rows, exactly what the loop emits
+    owner, x, y = owner[emitted], x[emitted], y[emitted]
+
+    axis = (r > 0) * 4
+    rows = np.bincount(owner, minlength=len(r))
+    sizes = axis + 8*rows
+    starts = np.cumsum(sizes) - sizes
+    points = np.empty((sizes.sum(), 2), dtype=np.int64)
+
+    has_axis = np.flatnonzero(r > 0)
+    cx, cy, ra = centers[has_axis, 0], centers[has_axis, 1], r[has_axis]
+    for i, (ax, ay) in enumerate([(cx, cy + ra), (cx, cy - ra), (cx + ra, cy), (cx - ra, cy)]):
+        points[starts[has_axis] + i, 0] = ax
+        points[starts[has_axis] + i, 1] = ay
+
+    j = np.arange(len(owner)) - np.repeat(np.cumsum(rows) - rows, rows)
+    base = starts[owner] + axis[owner] + 8*j
+    cx, cy = centers[owner, 0], centers[owner, 1]
+    octants = [(cx + x, cy + y), (cx - x, cy + y), (cx + x, cy - y), (cx - x, cy - y),
+               (cx + y, cy + x), (cx - y, cy + x), (cx + y, cy - x), (cx - y, cy - x)]
+    for i, (ox, oy) in enumerate(octants):
+        points[base + i, 0] = ox
+        points[base + i, 1] = oy
+    return points.astype(np.int32)
+
+
+def spike_points(radius):
+    """
+    Points of the eight spikes, in sprite units around (0, 0): a short midpoint line
+    towards every 45 degrees, thickened with a radius-1 circle at each point.
+    """
+    ends = []
+    for angle_deg in range(0, 360, 45):
+        rad = math.radians(angle_deg)
+        ends.append((0, 0, int(radius*math.cos(rad)), int(radius*math.sin(rad))))
+    return [tuple(p) for p in midpoint_circles(midpoint_lines(ends), 1).tolist()]
+
+
+# -------------- SELF-CHECK --------------
+
+def check_batch(cases, seed=0, span=200):
+    """
+    Compares midpoint_lines / midpoint_circles with the scalar versions on random
+    batches (including single points, zero and negative radii, every octant).
+    Returns the number of points compared; raises AssertionError on a mismatch.
+    """
+    import random
+    import numpy as np
+    rng = random.Random(seed)
+    compared = 0
+    for _ in range(cases):
+        segments = [tuple(rng.randint(-span, span) for _ in range(4)) for _ in range(rng.randint(0, 8))]
+        if rng.random() < 0.2:
+            x, y = rng.randint(-span, span), rng.randint(-span, span)
+            segments.append((x, y, x, y))
+        expected = [p for segment in segments for p in midpoint_line(*segment)]
+        got = midpoint_lines(np.array(segments, dtype=np.int64).reshape(-1, 4))
+        assert got.tolist() == [list(p) for p in expected], f"midpoint_lines differs on {segments}"
+
+        centers = [(rng.randint(-span, span), rng.randint(-span, span)) for _ in range(rng.randint(0, 8))]
+        radii = [rng.randint(-2, span) for _ in centers]
+        expected_c = [p for (x, y), r in zip(centers, radii) for p in midpoint_circle(x, y, r)]
+        got_c = midpoint_circles(np.array(centers, dtype=np.int64).reshape(-1, 2), np.array(radii, dtype=np.int64))
+        assert got_c.tolist() == [list(p) for p in expected_c], f"midpoint_circles differs on {centers} {radii}"
+        compared += len(expected) + len(expected_c)
+    return compared
+
+
+def main(argv=None):
+    import argparse
+    import random
+    import time
+    parser = argparse.ArgumentParser(description="Check the batch rasterizers against the scalar ones and time them.")
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=5000, help="segments / circles per timed batch")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    compared = check_batch(args.cases, args.seed)
+    print(f"{args.cases} random batches identical ({compared} points) in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(args.seed)
+    segments = [tuple(rng.randint(-400, 400) for _ in range(4)) for _ in range(args.count)]
+    centers = [(rng.randint(-400, 400), rng.randint(-300, 300)) for _ in range(args.count)]
+    radii = [rng.randint(1, 12) for _ in range(args.count)]
+    timings = [
+        ("lines", lambda: [midpoint_line(*s) for s in segments], lambda: midpoint_lines(segments)),
+        ("circles", lambda: [midpoint_circle(x, y, r) for (x, y), r in zip(centers, radii)],
+         lambda: midpoint_circles(centers, radii)),
+    ]
+    for name, scalar, batch in timings:
+        t0 = time.perf_counter()
+        scalar()
+        t1 = time.perf_counter()
+        points = batch()
+        t2 = time.perf_counter()
+        print(f"{args.count} {name} ({len(points)} points): scalar {(t1 - t0)*1000:.1f} ms, "
+              f"batch {(t2 - t1)*1000:.1f} ms ({(t1 - t0)/(t2 - t1):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# modules/visibility.py
+
+import argparse
+import random
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from modules.pathfinding import flatten_grid
+
+# (xx, xy, yx, yy) transforms mapping octant 0 onto the other seven
+OCTANTS = [(1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+           (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1)]
+
+
+def shadowcast(walls, cols, rows, ox, oy, radius):
+    """
+    Cells in line of sight of (ox, oy) within radius, by recursive shadowcasting:
+    each octant is scanned row by row outwards, and a wall narrows the slope
+    interval of the rows behind it instead of every cell casting its own ray.
+    Walls that are seen are included. Returns a set of flat indices (y*cols + x).
+    """
+    visible = {oy*cols + ox}
+    r2 = radius*radius
+
+    def cast(row, start, end, xx, xy, yx, yy):
+        if start < end:
+            return
+        new_start = start
+        for j in range(row, radius + 1):
+            blocked = False
+            dy = -j
+            for dx in range(-j, 1):
+                # Slopes of the cell's left and right edges as seen from the origin
+                left = (dx - 0.5) / (dy + 0.5)
+                right = (dx + 0.5) / (dy - 0.5)
+                if start < right:
+                    continue
+                if end > left:
+                    break
+                x = ox + dx*xx + dy*xy
+                y = oy + dx*yx + dy*yy
+                inside = 0 <= x < cols and 0 <= y < rows
+                cell = y*cols + x
+                wall = not inside or walls[cell]
+                if inside and dx*dx + dy*dy <= r2:
+                    visible.add(cell)
+                if blocked:
+                    if wall:
+                        new_start = right
+                        continue
+                    blocked = False
+                    start = new_start
+                elif wall and j < radius:
+                    blocked = True
+                    cast(j + 1, start, left, xx, xy, yx, yy)
+                    new_start = right
+            if blocked:
+                break
+
+    for octant in OCTANTS:
+        cast(1, 1.0, 0.0, *octant)
+    return visible
+
+
+def raycast(walls, cols, rows, ox, oy, radius):
+    """
+    Naive field of view: one Bresenham ray to every cell of the radius box,
+    stopping at the first wall. Only kept as the benchmark baseline.
+    """
+    visible = {oy*cols + ox}
+    r2 = radius*radius
+    for ty in range(oy - radius, oy + radius + 1):
+        for tx in range(ox - radius, ox + radius + 1):
+            if (tx - ox)**2 + (ty - oy)**2 > r2:
+                continue
+            x, y = ox, oy
+            dx, dy = abs(tx - ox), -abs(ty - oy)
+            sx, sy = (1 if tx > ox else -1), (1 if ty > oy else -1)
+            err = dx + dy
+            while (x, y) != (tx, ty):
+                e2 = 2*err
+                if e2 >= dy:
+                    err += dy
+                    x += sx
+                if e2 <= dx:
+                    err += dx
+                    y += sy
+                if not (0 <= x < cols and 0 <= y < rows):
+                    break
+                visible.add(y*cols + x)
+                if walls[y*cols + x]:
+                    break
+    return visible
+
+
+class Visibility:
+    """
+    Field-of-view queries on one maze layout. Walls don't move while a layout
+    is current, so the FOV of a (cell, radius) never changes and is cached;
+    the cache is LRU-bounded because enemies look from many different cells.
+    """
+
+    def __init__(self, maze, max_entries=8192):
+        self.cols = maze.cols
+        self.rows = maze.rows
+        self.walls = flatten_grid(maze)
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def fov(self, x, y, radius):
+        """
+        frozenset of flat indices visible from (x, y) within radius.
+        """
+        key = (y*self.cols + x, radius)
+        cells = self.cache.get(key)
+        if cells is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return cells
+        self.misses += 1
+        cells = frozenset(shadowcast(self.walls, self.cols, self.rows, x, y, radius))
+        self.cache[key] = cells
+        if len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+        return cells
+
+    def can_see(self, x, y, tx, ty, radius):
+        """
+        Whether (tx, ty) is in the field of view of (x, y).
+        """
+        if (tx - x)**2 + (ty - y)**2 > radius*radius:
+            return False
+        return ty*self.cols + tx in self.fov(x, y, radius)
+
+
+# One cached Visibility per live maze object, rebuilt when its layout changes
+_visibility = weakref.WeakKeyDictionary()
+
+
+def visibility_for(maze):
+    """
+    Returns the Visibility of maze's current layout, building it on first use.
+    """
+    key = maze.layout_key()
+    cached = _visibility.get(maze)
+    if cached is None or cached[0] != key:
+        cached = (key, Visibility(maze))
+        _visibility[maze] = cached
+    return cached[1]
+
+
+class FogOfWar:
+    """
+    What the player sees in darkness mode: the cells currently in view (lit)
+    and every cell seen so far on this level (explored), as (rows, cols) bool
+    grids. Only the cells entering or leaving view are touched per move.
+    version changes whenever either grid does, so renderers can cache on it.
+    """
+
+    def __init__(self, maze, radius=6):
+        self.radius = radius
+        self.version = 0
+        self.reset(maze)
+
+    def reset(self, maze):
+        """
+        Starts a new level on maze: nothing explored, nothing in view.
+        """
+        self.maze = maze
+        self.layout = maze.layout_key()
+        self.explored = np.zeros((maze.rows, maze.cols), dtype=bool)
+        self.lit = np.zeros((maze.rows, maze.cols), dtype=bool)
+        self.visible = frozenset()
+        self.origin = None
+        self.cache = {}
+        self.version += 1
+
+    def look(self, x, y):
+        """
+        Updates the view for the player standing at (x, y).
+        """
+        if self.maze.layout_key() != self.layout:
+            # Walls changed under us: keep what was explored, recompute the view
+            self.layout = self.maze.layout_key()
+            self.origin = None
+        if (x, y) == self.origin:
+            return
+        visible = visibility_for(self.maze).fov(x, y, self.radius)
+        if self.visible:
+            self.lit.flat[np.fromiter(self.visible, dtype=np.intp, count=len(self.visible))] = False
+        cells = np.fromiter(visible, dtype=np.intp, count=len(visible))
+        self.lit.flat[cells] = True
+        self.explored.flat[cells] = True
+        self.visible = visible
+        self.origin = (x, y)
+        self.cache = {}
+        self.version += 1
+
+    def adopt_explored(self, explored):
+        """
+        Takes over the explored cells of another FogOfWar of the same maze (e.g. the
+        one the sim thread updates), which may have seen positions this one never looked from.
+        """
+        np.copyto(self.explored, explored)
+        self.explored |= self.lit
+        self.cache = {}
+        self.version += 1
+
+    def is_visible(self, x, y):
+        return y*self.maze.cols + x in self.visible
+
+    def filter(self, centers):
+        """
+        The rows of an (N, 2) array of (x, y) cells that are in view.
+        """
+        centers = np.asarray(centers)
+        if not len(centers):
+            return centers
+        return centers[self.lit[centers[:, 1], centers[:, 0]]]
+
+    def wall_vertices(self, scale_x, scale_y):
+        """
+        (lit, remembered) float32 vertex arrays of the wall points Maze.render draws:
+        walls in view, and walls explored earlier but out of view now.
+        """
+        key = (scale_x, scale_y)
+        if key not in self.cache:
+            geometry = self.maze.wall_geometry()
+            cells = geometry.cells()
+            verts = geometry.vertices(scale_x, scale_y)
+            lit = self.lit[cells[:, 1], cells[:, 0]]
+            seen = self.explored[cells[:, 1], cells[:, 0]]
+            self.cache[key] = (verts[lit], verts[seen & ~lit])
+        return self.cache[key]
+
+
+def benchmark(maze, radius, queries, seed=0):
+    """
+    Mean ms per FOV query for naive ray casting, uncached shadowcasting and the
+    cache on repeat queries, over the same random open cells.
+    """
+    rng = random.Random(seed)
+    ys, xs = np.nonzero(np.asarray(maze.grid) == 0)
+    picks = [rng.randrange(len(xs)) for _ in range(queries)]
+    origins = [(int(xs[i]), int(ys[i])) for i in picks]
+    walls = flatten_grid(maze)
+    results = {}
+
+    start = time.perf_counter()
+    for x, y in origins:
+        raycast(walls, maze.cols, maze.rows, x, y, radius)
+    results["raycast"] = (time.perf_counter() - start) / queries * 1000
+
+    start = time.perf_counter()
+    sizes = [len(shadowcast(walls, maze.cols, maze.rows, x, y, radius)) for x, y in origins]
+    results["shadowcast"] = (time.perf_counter() - start) / queries * 1000
+
+    vis = Visibility(maze)
+    for x, y in origins:
+        vis.fov(x, y, radius)
+    start = time.perf_counter()
+    for x, y in origins:
+        vis.fov(x, y, radius)
+    results["cached"] = (time.perf_counter() - start) / queries * 1000
+    return results, sum(sizes) / queries
+
+
+def main(argv=None):
+    from modules.maze import Maze
+    parser = argparse.ArgumentParser(description="Benchmark field-of-view queries.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[51, 201, 1001],
+                        help="maze rows and columns (odd)")
+    parser.add_argument("--radius", type=int, nargs="+", default=[6, 12])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for size in args.sizes:
+        maze = Maze(size, size, extra_passages=size // 4, seed=args.seed)
+        for radius in args.radius:
+            results, cells = benchmark(maze, radius, args.queries, args.seed)
+            print(f"{size}x{size} radius {radius:2d} ({cells:.0f} cells in view): " +
+                  "  ".join(f"{name} {ms:.4f} ms" for name, ms in results.items()))
+
+
+if __name__ == "__main__":
+    main()
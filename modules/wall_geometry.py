@@ -0,0 +1,139 @@
+# modules/wall_geometry.py
+
+import numpy as np
+
+
+def line_runs(walls):
+    """
+    Maximal runs of two or more consecutive wall cells along the last axis of a
+    2-D bool array. Returns (line, start, end) index arrays, end inclusive, in
+    line-major order.
+    """
+    lines = walls.shape[0]
+    padded = np.zeros((lines, walls.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = walls
+    step = np.diff(padded, axis=1)
+    line, start = np.nonzero(step == 1)
+    _, stop = np.nonzero(step == -1)
+    end = stop - 1
+    keep = end > start
+    return line[keep], start[keep], end[keep]
+
+
+def pair_cells(walls):
+    """
+    Cells that have a wall neighbour further along the last axis or are that neighbour,
+    i.e. the cells covered by runs along that axis.
+    """
+    pairs = walls[:, :-1] & walls[:, 1:]
+    mask = np.zeros(walls.shape, dtype=bool)
+    mask[:, :-1] |= pairs
+    mask[:, 1:] |= pairs
+    return mask
+
+
+class WallGeometry:
+    """
+    The maze walls as maximal horizontal and vertical runs instead of one
+    midpoint_line per adjacent pair of wall cells. A run covers the same cells
+    as the pairs it replaces, so drawing each covered cell once (points) gives
+    exactly what Maze.render drew, with no vertex repeated. Runs can also be
+    drawn as GL_LINES segments, two vertices per run.
+    Rows and columns are kept separately, so a changed cell only rescans its
+    own row and column.
+    """
+
+    def __init__(self, grid, key=None):
+        """
+        :param grid: (rows, cols) array of 1 (wall) / 0 (path), kept by reference
+        :param key: Layout key the geometry was built for (see Maze.layout_key)
+        """
+        self.grid = grid
+        self.key = key
+        self.rebuild()
+
+    def rebuild(self):
+        walls = self.grid.astype(bool)
+        rows, cols = walls.shape
+        self.row_runs = self.split_runs(walls, rows)
+        self.col_runs = self.split_runs(walls.T, cols)
+        self.row_mask = pair_cells(walls)
+        self.col_mask = pair_cells(walls.T).T.copy()
+        self.cache = {}
+
+    @staticmethod
+    def split_runs(walls, lines):
+        # One (K, 2) array of [start, end] runs per line
+        line, start, end = line_runs(walls)
+        runs = np.stack([start, end], axis=1)
+        return np.split(runs, np.searchsorted(line, np.arange(1, lines)))
+
+    def update_cell(self, x, y, grid=None):
+        """
+        Re-scans row y and column x after grid[y, x] changed. Pass grid if the
+        maze replaced its array (e.g. a copy-on-write copy).
+        """
+        if grid is not None:
+            self.grid = grid
+        row = self.grid[y:y + 1].astype(bool)
+        col = self.grid[:, x:x + 1].T.astype(bool)
+        self.row_runs[y] = self.split_runs(row, 1)[0]
+        self.col_runs[x] = self.split_runs(col, 1)[0]
+        self.row_mask[y] = pair_cells(row)[0]
+        self.col_mask[:, x] = pair_cells(col)[0]
+        self.cache = {}
+
+    # -------------- OUTPUT --------------
+
+    def cells(self):
+        """
+        (N, 2) array of (x, y) for every wall cell covered by a run, each once.
+        """
+        if "cells" not in self.cache:
+            ys, xs = np.nonzero(self.row_mask | self.col_mask)
+            self.cache["cells"] = np.stack([xs, ys], axis=1)
+        return self.cache["cells"]
+
+    def segments(self):
+        """
+        (M, 2, 2) array of run endpoints [[x0, y0], [x1, y1]] in grid cells.
+        """
+        if "segments" not in self.cache:
+            parts = [np.zeros((0, 2, 2), dtype=np.int64)]
+            for y, runs in enumerate(self.row_runs):
+                if len(runs):
+                    seg = np.empty((len(runs), 2, 2), dtype=np.int64)
+                    seg[:, :, 0] = runs
+                    seg[:, :, 1] = y
+                    parts.append(seg)
+            for x, runs in enumerate(self.col_runs):
+                if len(runs):
+                    seg = np.empty((len(runs), 2, 2), dtype=np.int64)
+                    seg[:, :, 0] = x
+                    seg[:, :, 1] = runs
+                    parts.append(seg)
+            self.cache["segments"] = np.concatenate(parts)
+        return self.cache["segments"]
+
+    def vertices(self, scale_x, scale_y, mode="points"):
+        """
+        float32 GL coordinates ready for glDrawArrays: one vertex per covered cell
+        for mode "points", or two per run for mode "lines". Cached per scale.
+        """
+        key = (mode, scale_x, scale_y)
+        if key not in self.cache:
+            rows, cols = self.grid.shape
+            cells = self.cells() if mode == "points" else self.segments().reshape(-1, 2)
+            verts = np.empty((len(cells), 2), dtype=np.float32)
+            verts[:, 0] = (cells[:, 0] - cols / 2) * scale_x
+            verts[:, 1] = (rows / 2 - cells[:, 1]) * scale_y
+            self.cache[key] = verts
+        return self.cache[key]
+
+    def vertex_counts(self):
+        """
+        Vertices per frame: the old per-pair drawing, merged points and merged lines.
+        """
+        walls = self.grid.astype(bool)
+        pairs = int((walls[:, :-1] & walls[:, 1:]).sum() + (walls[:-1, :] & walls[1:, :]).sum())
+        return {"pairs": 2 * pairs, "points": len(self.cells()), "lines": 2 * len(self.segments())}
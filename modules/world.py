@@ -0,0 +1,594 @@
+# modules/world.py
+
+import random
+from collections import deque, namedtuple
+
+import numpy as np
+
+from modules.maze import Maze
+from modules.player import Player
+from modules.enemy import Enemy
+from modules.chaser_enemy import ChaserEnemy
+from modules.patrolling_enemy import PatrollingEnemy
+from modules.collectible import Collectible
+from modules.powerup import PowerUp
+from modules.free_cells import FreeCellIndex
+from modules.visibility import FogOfWar
+from modules.cooperative import CooperativePlanner
+from modules.entity_store import EntityStore, KIND_ENEMY, KIND_GEM, KIND_POWERUP, FLAG_COLLECTED
+
+ENEMY_KINDS = {"enemy": Enemy, "chaser": ChaserEnemy, "patrol": PatrollingEnemy}
+
+# An immutable capture of the whole world. The maze grid is shared with the live
+# maze (copy-on-write) and entity arrays are copied in bulk, so taking a snapshot
+# costs a few memcpys plus one tuple per enemy.
+WorldSnapshot = namedtuple("WorldSnapshot", [
+    "time", "level", "score", "level_time",
+    "grid", "seed", "extra_carved", "passes",
+    "player", "exit",
+    "is_invisible", "invisible_until",
+    "speed_boost_active", "speed_boost_until",
+    "last_enemy_move_time",
+    "entities", "enemies",
+    "rng_state", "game_over",
+])
+
+
+def enemy_kind(enemy):
+    return enemy.type_name
+
+
+class World:
+    """
+    The game state and rules of Pixel Adventure Maze, without any window or GL.
+    Time only moves when update(dt) is called, and all randomness comes from
+    self.rng (seeded from the maze), so a level plays out the same way from the same seed.
+    """
+
+    def __init__(self, maze_rows=21, maze_cols=21, level=1, seed=None,
+                 history_size=120, verbose=True, darkness=False, sight_radius=6, cooperative=False):
+        """
+        :param level: Starting level number
+        :param seed: Seed of the first level; random if None
+        :param history_size: How many per-tick snapshots to keep for rewinding (0 disables rewind)
+        :param verbose: Print gameplay messages
+        :param darkness: Fog-of-war mode: the player only sees (and enemies only chase)
+                         within sight_radius cells of line of sight
+        :param cooperative: Enemies chase with a shared CooperativePlanner instead of
+                            independent A*, so they don't pile onto the same cells
+        """
+        self.verbose = verbose
+        self.time = 0.0
+        self.current_level = level
+        self.score = 0
+        self.level_time = 60.0
+        self.game_over = False
+
+        self.maze = Maze(maze_rows, maze_cols, extra_passages=2, seed=seed)
+        self.rng = random.Random()
+        self.player = Player(x=1, y=1)
+        # Positions, flags and timers of every entity; the lists below hold handles into it
+        self.entities = EntityStore()
+        self.enemies = []
+        self.collectibles = []
+        self.powerups = []
+        self.exit_x = self.maze.cols - 2
+        self.exit_y = self.maze.rows - 2
+        self.free_cells = None
+
+        self.is_invisible = False
+        self.invisible_until = 0.0
+        self.speed_boost_active = False
+        self.speed_boost_until = 0.0
+
+        self.last_enemy_move_time = 0.0
+        self.enemy_move_interval = 0.5
+
+        # Things that happened since the owner last drained them, e.g. ("gem", x, y)
+        self.events = []
+        self.history = deque(maxlen=history_size)
+        self.level_start = None
+        # Optional callable level number -> MazeLevel (e.g. LevelPack.load) used
+        # instead of generating new levels
+        self.level_source = None
+        self.sight_radius = sight_radius
+        self.fog = FogOfWar(self.maze, sight_radius) if darkness else None
+        self.planner = CooperativePlanner() if cooperative else None
+
+        self.setup_level()
+
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    # -------------- LEVEL SETUP --------------
+
+    def start_level(self, seed=None):
+        """
+        Generates a fresh maze (from seed if given) and spawns everything on it.
+        With a level_source and no seed, the level is loaded from the source instead.
+        """
+        if self.level_source is not None and seed is None:
+            self.load_level(self.level_source(self.current_level))
+            return
+        self.maze.generate_maze(seed)
+        self.maze.carve_extra_paths(2)
+        self.setup_level()
+
+    def setup_level(self):
+        """
+        Spawns everything on the current maze and records the level-start checkpoint.
+        """
+        self.rng = random.Random(self.maze.seed)
+        self.initialize_entities()
+        self.reset_fog()
+        self.game_over = False
+        self.history.clear()
+        self.level_start = self.snapshot()
+
+    def reset_fog(self):
+        if self.fog is not None:
+            self.fog.reset(self.maze)
+            self.fog.look(self.player.x, self.player.y)
+
+    def load_level(self, level):
+        """
+        Plays a level read by maze_file.read_maze: its maze, plus its spawn, exit and
+        entities where the file provides them (anything missing is placed as usual).
+        """
+        level.maze.scale_x, level.maze.scale_y = self.maze.scale_x, self.maze.scale_y
+        self.maze = level.maze
+        self.rng = random.Random(self.maze.seed)
+        self.initialize_entities()
+        if level.spawn:
+            self.player.x, self.player.y = level.spawn
+        if level.exit:
+            self.exit_x, self.exit_y = level.exit
+        if level.entities:
+            self.entities.clear()
+            self.enemies = []
+            self.collectibles = []
+            self.powerups = []
+            for kind, type_name, x, y, waypoints in level.entities:
+                if kind == KIND_ENEMY:
+                    self.enemies.append(self.make_enemy(type_name, x, y, waypoints, wait_time=1.0))
+                elif kind == KIND_GEM:
+                    self.collectibles.append(Collectible(x, y, store=self.entities))
+                elif kind == KIND_POWERUP:
+                    self.powerups.append(PowerUp(x, y, type_name, store=self.entities))
+        # Cells of the generated spawn, exit and entities the file replaced are free again
+        self.rebuild_free_cells()
+        self.reset_fog()
+        self.game_over = False
+        self.history.clear()
+        self.level_start = self.snapshot()
+
+    def rebuild_free_cells(self):
+        """
+        Rebuilds the free-cell index from where the player, exit and entities are now.
+        """
+        self.free_cells = FreeCellIndex(self.maze, self.rng)
+        self.free_cells.occupy(self.player.x, self.player.y)
+        self.free_cells.occupy(self.exit_x, self.exit_y)
+        for item in self.enemies + self.collectibles + self.powerups:
+            self.free_cells.occupy(item.x, item.y)
+
+    def restart(self):
+        self.score = 0
+        self.current_level = 1
+        self.start_level()
+
+    def random_path_cell(self):
+        """
+        Returns a (x, y) that is a valid path cell (grid[y, x]==0),
+        in the interior (1..cols-2, 1..rows-2), and not taken by a pickup, the exit or the player.
+        """
+        return self.free_cells.sample()
+
+    def initialize_entities(self):
+        """
+        Resets the level timer, spawns enemies, collectibles, power-ups, and exit.
+        Spawn cells come from a FreeCellIndex, so setup never loops on rejected samples.
+        """
+        self.level_time = 60.0
+        self.free_cells = FreeCellIndex(self.maze, self.rng)
+
+        # Reset player
+        self.player.x = 1
+        self.player.y = 1
+        self.free_cells.occupy(1, 1)
+
+        self.entities.clear()
+        self.enemies = []
+        self.collectibles = []
+        self.powerups = []
+
+        # Normal enemies on valid path cells
+        num_normal_enemies = 1
+        for _ in range(num_normal_enemies):
+            x, y = self.free_cells.take()
+            self.enemies.append(Enemy(x, y, self.maze, self.rng, self.entities))
+
+        # Patrolling enemy with random route
+        route = [self.free_cells.take()]
+        route_size = 4
+        for _ in range(route_size - 1):
+            route.append(self.random_path_cell())
+        patroller = PatrollingEnemy(route[0][0], route[0][1],
+                                    self.maze,
+                                    waypoints=route,
+                                    wait_time=1.0,
+                                    rng=self.rng,
+                                    store=self.entities)
+        self.enemies.append(patroller)
+
+        # spawn some collectibles (avoid border, walls)
+        self.spawn_collectibles(num=4)
+
+        # spawn powerups on free path cells
+        for power_type in ("speed", "invincibility"):
+            px, py = self.free_cells.take()
+            self.powerups.append(PowerUp(px, py, power_type, store=self.entities))
+
+        # place exit far from enemies
+        self.place_exit_far_from_enemies()
+
+    def place_exit_far_from_enemies(self, dist_thresh=8):
+        cell = self.free_cells.take_far_from(((en.x, en.y) for en in self.enemies), dist_thresh)
+        if cell is None:
+            # fallback
+            cell = (self.maze.cols - 2, self.maze.rows - 2)
+        self.exit_x, self.exit_y = cell
+
+    def spawn_collectibles(self, num=4):
+        # Taken cells leave the index, so gems never overlap each other
+        for _ in range(min(num, len(self.free_cells))):
+            x, y = self.free_cells.take()
+            self.collectibles.append(Collectible(x, y, store=self.entities))
+
+    # -------------- RULES --------------
+
+    def kill_player(self, reason):
+        self.game_over = True
+        self.events.append(("game_over", reason))
+        self.log(reason)
+
+    def update(self, dt):
+        """
+        Advances the world by dt seconds: level timer, power-up expiry and enemy moves.
+        """
+        if self.game_over:
+            return
+        self.time += dt
+        now = self.time
+        self.level_time -= dt
+        if self.level_time <= 0:
+            self.kill_player("Time ran out!")
+            return
+
+        # End invisibility if time is up
+        if self.is_invisible and now >= self.invisible_until:
+            self.is_invisible = False
+            self.log("Invisibility ended!")
+
+        # speed boost check
+        if self.speed_boost_active and now >= self.speed_boost_until:
+            self.speed_boost_active = False
+            self.log("Speed boost ended!")
+
+        # update enemies
+        if now - self.last_enemy_move_time >= self.enemy_move_interval:
+            if self.history.maxlen:
+                self.history.append(self.snapshot())
+            self.update_enemies()
+            self.last_enemy_move_time = now
+
+    def update_enemies(self):
+        now = self.time
+        enemies = self.enemies
+        if self.planner is not None and any(now - en.last_move_time >= en.speed for en in enemies):
+            # A planner round is one enemy move, not one call: calls in which
+            # nobody moves would age every plan without anyone following it.
+            # Enemies plan in priority order, each around the ones before it
+            self.planner.begin_tick(self.maze, enemies, self.player.x, self.player.y)
+            enemies = self.planner.order(enemies)
+        for en in enemies:
+            en.planner = self.planner
+            if now - en.last_move_time >= en.speed:
+                en.update_path(self.player.x, self.player.y,
+                               self.sight_radius if self.fog is not None else None)
+                if hasattr(en, "move_towards_player"):
+                    en.move_towards_player()
+                en.last_move_time = now
+
+            # If the player is NOT invisible, we can kill them
+            if not self.is_invisible:
+                if en.x == self.player.x and en.y == self.player.y:
+                    self.kill_player("Collision with enemy! Game Over.")
+                    return
+
+    def activate_invisibility(self, duration=3.0):
+        self.is_invisible = True
+        self.invisible_until = self.time + duration
+        self.log(f"Invisibility activated for {duration:g}s!")
+
+    def move_player(self, dx, dy):
+        if self.game_over:
+            return
+        steps = 2 if self.speed_boost_active else 1
+        for _ in range(steps):
+            nx = self.player.x + dx
+            ny = self.player.y + dy
+            # Bound checks
+            if nx < 0 or nx >= self.maze.cols or ny < 0 or ny >= self.maze.rows:
+                return
+            # Wall checks
+            if self.maze.grid[ny, nx] == 1:
+                return
+
+            self.player.x = nx
+            self.player.y = ny
+            if self.fog is not None:
+                self.fog.look(nx, ny)
+
+            # Collect collectibles
+            for _ in self.entities.collect_at(nx, ny, KIND_GEM):
+                self.score += 10
+                self.events.append(("gem", nx, ny))
+                self.log(f"Collected gem: ({nx},{ny}), Score={self.score}")
+
+            # Collect powerups
+            for slot in self.entities.collect_at(nx, ny, KIND_POWERUP):
+                power_type = self.entities.type_name(slot)
+                self.events.append(("powerup", power_type))
+                self.log(f"Power-up: {power_type}")
+                if power_type == "speed":
+                    self.speed_boost_active = True
+                    self.speed_boost_until = self.time + 5
+                elif power_type == "invincibility":
+                    self.is_invisible = True
+                    self.invisible_until = self.time + 5
+                    self.log("Invincibility power-up! Invisible for 5s")
+
+            # Check exit
+            if self.player.x == self.exit_x and self.player.y == self.exit_y:
+                self.current_level += 1
+                self.events.append(("level_complete", self.current_level))
+                self.log(f"Level complete! Now level {self.current_level}")
+                self.start_level()
+                break
+
+            # If not invisible, check collision with enemies
+            if not self.is_invisible and self.entities.occupied(nx, ny, KIND_ENEMY):
+                self.kill_player("Collision with enemy! Game Over.")
+                return
+
+    def drain_events(self):
+        events = self.events
+        self.events = []
+        return events
+
+    # -------------- SNAPSHOTS --------------
+
+    def snapshot(self):
+        """
+        Captures the world as an immutable WorldSnapshot. Cheap enough to call every tick:
+        the maze grid is shared rather than copied.
+        """
+        return WorldSnapshot(
+            time=self.time,
+            level=self.current_level,
+            score=self.score,
+            level_time=self.level_time,
+            grid=self.maze.share_grid(),
+            seed=self.maze.seed,
+            extra_carved=self.maze.extra_carved,
+            passes=tuple(self.maze.passes),
+            player=(self.player.x, self.player.y),
+            exit=(self.exit_x, self.exit_y),
+            is_invisible=self.is_invisible,
+            invisible_until=self.invisible_until,
+            speed_boost_active=self.speed_boost_active,
+            speed_boost_until=self.speed_boost_until,
+            last_enemy_move_time=self.last_enemy_move_time,
+            entities=self.entities.copy(),
+            enemies=tuple((enemy_kind(en), getattr(en, "waypoints", None),
+                           getattr(en, "wait_time", 0.0), en.get_state())
+                          for en in self.enemies),
+            rng_state=self.rng.getstate(),
+            game_over=self.game_over,
+        )
+
+    def restore(self, snap):
+        """
+        Puts the world back into the state captured by snapshot().
+        Entities are updated in place when the same kinds are still present.
+        """
+        self.time = snap.time
+        self.current_level = snap.level
+        self.score = snap.score
+        self.level_time = snap.level_time
+        layout_changed = self.maze.grid is not snap.grid
+        if layout_changed:
+            self.maze.adopt_grid(snap.grid, snap.seed, snap.extra_carved, snap.passes)
+        self.player.x, self.player.y = snap.player
+        self.exit_x, self.exit_y = snap.exit
+        self.is_invisible = snap.is_invisible
+        self.invisible_until = snap.invisible_until
+        self.speed_boost_active = snap.speed_boost_active
+        self.speed_boost_until = snap.speed_boost_until
+        self.last_enemy_move_time = snap.last_enemy_move_time
+        self.rng.setstate(snap.rng_state)
+        self.game_over = snap.game_over
+
+        # Patrol routes are compiled per layout, so a different maze means new handles
+        same_entities = (not layout_changed and self.entities.same_layout(snap.entities) and
+                         all(getattr(en, "waypoints", None) == waypoints
+                             for en, (_, waypoints, _, _) in zip(self.enemies, snap.enemies)))
+        if not same_entities:
+            self.rebuild_entities(snap)
+        self.entities.restore(snap.entities)
+        for en, (_, _, _, state) in zip(self.enemies, snap.enemies):
+            en.set_state(state)
+        if self.fog is not None:
+            if self.fog.maze is not self.maze or layout_changed:
+                self.fog.reset(self.maze)
+            self.fog.look(self.player.x, self.player.y)
+
+    def rebuild_entities(self, snap):
+        """
+        Recreates the handle lists so their slots line up with snap.entities.
+        """
+        self.entities.clear()
+        self.enemies = []
+        self.collectibles = []
+        self.powerups = []
+        enemy_states = iter(snap.enemies)
+        for slot, kind in enumerate(snap.entities.kinds):
+            x, y = snap.entities.xs[slot], snap.entities.ys[slot]
+            if kind == KIND_ENEMY:
+                en_kind, waypoints, wait_time, _ = next(enemy_states)
+                self.enemies.append(self.make_enemy(en_kind, x, y, waypoints, wait_time))
+            elif kind == KIND_GEM:
+                self.collectibles.append(Collectible(x, y, store=self.entities))
+            elif kind == KIND_POWERUP:
+                self.powerups.append(PowerUp(x, y, snap.entities.type_name(slot), store=self.entities))
+
+    def make_enemy(self, kind, x, y, waypoints=None, wait_time=0.0):
+        if kind == "patrol":
+            return PatrollingEnemy(x, y, self.maze, waypoints=waypoints,
+                                   wait_time=wait_time, rng=self.rng, store=self.entities)
+        return ENEMY_KINDS[kind](x, y, self.maze, self.rng, self.entities)
+
+    def retry_level(self):
+        """
+        Restores the state from the start of the current level.
+        """
+        self.restore(self.level_start)
+        self.history.clear()
+
+    def rewind(self, ticks=1):
+        """
+        Steps back the given number of enemy ticks. Returns False if there is no history.
+        """
+        if not self.history:
+            return False
+        ticks = min(ticks, len(self.history))
+        for _ in range(ticks - 1):
+            self.history.pop()
+        self.restore(self.history.pop())
+        return True
+
+    # -------------- SAVE DATA --------------
+
+    def to_dict(self):
+        """
+        Plain, JSON-friendly description of the session: the current state plus,
+        under "level_start", the state the level started in (for retry_level).
+        The maze is stored as its rows of "#" (wall) and "." (path), so levels from
+        files and packs and post-processed mazes load back exactly; timers are
+        stored as seconds remaining.
+        """
+        session = snapshot_dict(self.snapshot())
+        session["level_start"] = snapshot_dict(self.level_start)
+        return session
+
+    def load_dict(self, session):
+        """
+        Rebuilds the level from a dict produced by to_dict(). Saves without a
+        level_start retry from the saved state.
+        """
+        self.history.clear()
+        level_start = None
+        if session.get("level_start"):
+            self.load_state(session["level_start"])
+            level_start = self.snapshot()
+        self.load_state(session)
+        self.level_start = level_start if level_start is not None else self.snapshot()
+
+    def load_state(self, state):
+        """
+        Puts the world into one state dict of the to_dict() format.
+        """
+        self.current_level = state["level"]
+        self.score = state["score"]
+        if "grid" in state:
+            grid = np.array([[cell == "#" for cell in row] for row in state["grid"]], dtype=np.uint8)
+            maze = Maze.from_grid(grid, state["seed"])
+            maze.extra_carved = state["extra_passages"]
+            maze.passes = [tuple(p) for p in state.get("passes", [])]
+            maze.scale_x, maze.scale_y = self.maze.scale_x, self.maze.scale_y
+            self.maze = maze
+        else:
+            # Older saves only have the seed of a generated level
+            self.maze.generate_maze(state["seed"])
+            self.maze.carve_extra_paths(state["extra_passages"])
+        self.rng = random.Random(self.maze.seed)
+        self.level_time = state["level_time"]
+        self.player.x, self.player.y = state["player"]
+        self.exit_x, self.exit_y = state["exit"]
+
+        self.is_invisible = state["invisible_left"] > 0
+        self.invisible_until = self.time + state["invisible_left"]
+        self.speed_boost_active = state["speed_boost_left"] > 0
+        self.speed_boost_until = self.time + state["speed_boost_left"]
+
+        self.entities.clear()
+        self.enemies = []
+        for en_state in state["enemies"]:
+            en = self.make_enemy(en_state["kind"], en_state["x"], en_state["y"],
+                                 [tuple(w) for w in en_state.get("waypoints", [])],
+                                 en_state.get("wait_time", 0.0))
+            en.path = [tuple(p) for p in en_state["path"]]
+            en.path_index = en_state["path_index"]
+            if en_state["kind"] == "patrol":
+                en.route_index = en_state["route_index"]
+                en.wait_ticks = en_state["wait_ticks"]
+            en.last_move_time = self.time
+            self.enemies.append(en)
+        self.collectibles = [Collectible(x, y, collected, store=self.entities)
+                             for x, y, collected in state["collectibles"]]
+        self.powerups = [PowerUp(x, y, kind, collected, store=self.entities)
+                         for x, y, kind, collected in state["powerups"]]
+        self.rebuild_free_cells()
+        self.reset_fog()
+        self.game_over = False
+
+
+def snapshot_dict(snap):
+    """
+    The to_dict() description of one WorldSnapshot.
+    """
+    enemies = []
+    for kind, waypoints, wait_time, state in snap.enemies:
+        x, y, path, path_index = state[:4]
+        en_state = {"kind": kind, "x": x, "y": y,
+                    "path": [list(p) for p in path], "path_index": path_index}
+        if kind == "patrol":
+            en_state.update(waypoints=[list(w) for w in waypoints or ()], wait_time=wait_time,
+                            route_index=state[5], wait_ticks=state[6])
+        enemies.append(en_state)
+    store = snap.entities
+    gems, powerups = [], []
+    for slot, kind in enumerate(store.kinds):
+        collected = bool(store.flags[slot] & FLAG_COLLECTED)
+        if kind == KIND_GEM:
+            gems.append([store.xs[slot], store.ys[slot], collected])
+        elif kind == KIND_POWERUP:
+            powerups.append([store.xs[slot], store.ys[slot], store.type_name(slot), collected])
+    return {
+        "level": snap.level,
+        "seed": snap.seed,
+        "extra_passages": snap.extra_carved,
+        "passes": [list(p) for p in snap.passes],
+        "grid": ["".join("#" if cell else "." for cell in row) for row in snap.grid.tolist()],
+        "score": snap.score,
+        "level_time": snap.level_time,
+        "player": list(snap.player),
+        "exit": list(snap.exit),
+        "invisible_left": max(0.0, snap.invisible_until - snap.time) if snap.is_invisible else 0.0,
+        "speed_boost_left": max(0.0, snap.speed_boost_until - snap.time) if snap.speed_boost_active else 0.0,
+        "enemies": enemies,
+        "collectibles": gems,
+        "powerups": powerups,
+    }